@@ -0,0 +1,78 @@
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+bench_load_cache.py compares the time needed to import the WP5 databases and
+the upstream BoM files by parsing the .xlsx/.csv sources (cold cache) against
+reading them back from the on-disk cache of wp5.load.cache (warm cache).
+
+Examples
+--------
+$ python benchmarks/bench_load_cache.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+mod_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, mod_path)
+
+from wp5.load import cache
+from wp5.load import load_vessel_data, load_equipment_data, load_port_data
+from wp5.load.wp_bom import load_WP1_BoM, load_WP2_BoM
+from wp5.load.wp_bom import load_WP3_BoM, load_WP4_BoM
+from wp5.load.wp_bom import load_WP6_BoM
+
+
+def database_file(file):
+    """
+    shortcut function to load files from the database folder
+    """
+    return os.path.join(mod_path, 'databases', file)
+
+
+LOADS = [('vessels', load_vessel_data,
+          (database_file("Vessel_Database_python.xlsx"),)),
+         ('equipments', load_equipment_data,
+          (database_file("Equipment_Database_python.xlsx"),)),
+         ('ports', load_port_data,
+          (database_file("Ports_Database2_python.xlsx"),)),
+         ('WP1', load_WP1_BoM, (database_file("WP1_BoM.xlsx"),
+                                database_file("VianaCastelo.csv"))),
+         ('WP2', load_WP2_BoM, (database_file("WP2_BoM.xlsx"),)),
+         ('WP3', load_WP3_BoM, (database_file("WP3_BoM.xlsx"),)),
+         ('WP4', load_WP4_BoM, (database_file("WP4_BoM.csv"),)),
+         ('WP6', load_WP6_BoM, (database_file("WP6_BoM.xlsx"),))]
+
+
+def run(repeat=5):
+    cache_dir = tempfile.mkdtemp(prefix='wp5_bench_')
+    cache.set_cache_dir(cache_dir)
+    try:
+        print('%-12s %12s %12s %9s' % ('source', 'cold [ms]', 'warm [ms]',
+                                       'speed-up'))
+        total_cold = total_warm = 0.0
+        for name, func, args in LOADS:
+            cold = []
+            for _ in range(repeat):
+                cache.clear_cache(cache_dir)
+                cold.append(timeit.timeit(lambda: func(*args), number=1))
+            func(*args)
+            warm = timeit.repeat(lambda: func(*args), number=1, repeat=repeat)
+            cold_ms = 1000 * min(cold)
+            warm_ms = 1000 * min(warm)
+            total_cold += cold_ms
+            total_warm += warm_ms
+            print('%-12s %12.1f %12.1f %8.1fx' % (name, cold_ms, warm_ms,
+                                                  cold_ms / warm_ms))
+        print('%-12s %12.1f %12.1f %8.1fx' % ('total', total_cold, total_warm,
+                                              total_cold / total_warm))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,99 @@
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+bench_weather_windows.py times the weather window computation on the full
+VianaCastelo.csv met-ocean record, comparing the vectorized weather_windows
+against a loop over the records building the windows with Python lists, as
+the former nested weatherWindow() of the schedule functions did, and the
+lookup of the same windows in a WindowCache, as done for every solution of a
+logistic phase sharing the same operational limit conditions. A sweep over
+random (Hs, wind speed) limits compares weather_windows with the lookup of a
+precomputed persistence surface.
+
+Examples
+--------
+$ python benchmarks/bench_weather_windows.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+mod_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, mod_path)
+
+from wp5.load.metocean import MetoceanFrame, open_metocean
+from wp5.performance.schedule.persistence import PersistenceSurface
+from wp5.performance.schedule.weather import WindowCache, weather_windows
+
+OLC = {'maxHs': 2.5, 'maxTp': 0, 'maxWs': 10., 'maxCs': 0}
+NB_SWEEP = 200
+
+
+def database_file(file):
+    """shortcut function to load files from the database folder"""
+    return os.path.join(mod_path, 'databases', file)
+
+
+def loop_windows(met_ocean, olc):
+    """Loop over the met-ocean records with Python lists"""
+    time_step = 3
+    Hs_bin = list(map(float, met_ocean.waveHs <= olc['maxHs']))
+    Ws_bin = list(map(float, met_ocean.windSpeed <= olc['maxWs']))
+    WW_bin = [hs * ws for hs, ws in zip(Hs_bin, Ws_bin)]
+    start = []
+    duration = []
+    for step, workable in enumerate(WW_bin):
+        if workable == 1:
+            if step == 0 or WW_bin[step - 1] == 0:
+                start.append(step * time_step)
+                duration.append(0)
+            duration[-1] += time_step
+    return {'start': start, 'duration': duration}
+
+
+def run(repeat=3):
+    metocean = MetoceanFrame(open_metocean(database_file('VianaCastelo.csv')))
+    ww = weather_windows(metocean, OLC)
+    reference = loop_windows(metocean, OLC)
+    assert np.array_equal(ww['start'], reference['start'])
+    assert np.array_equal(ww['duration'], reference['duration'])
+
+    loop = min(timeit.repeat(lambda: loop_windows(metocean, OLC), number=1,
+                             repeat=repeat))
+    vect = min(timeit.repeat(lambda: weather_windows(metocean, OLC),
+                             number=1, repeat=repeat))
+    window_cache = WindowCache()
+    window_cache.windows(metocean, OLC)
+    cached = min(timeit.repeat(lambda: window_cache.windows(metocean, OLC),
+                               number=1, repeat=repeat))
+    print('%d met-ocean records, %d weather windows' % (len(metocean),
+                                                         len(ww)))
+    print('loop       %10.2f ms' % (1000 * loop))
+    print('vectorized %10.2f ms  (%.0fx)' % (1000 * vect, loop / vect))
+    print('cached     %10.2f ms  (%.0fx)' % (1000 * cached, loop / cached))
+
+    rng = np.random.RandomState(0)
+    sweep = [{'maxHs': hs, 'maxWs': ws} for hs, ws in
+             zip(rng.uniform(1., 4., NB_SWEEP), rng.uniform(5., 25., NB_SWEEP))]
+    start = timeit.default_timer()
+    for olc in sweep:
+        weather_windows(metocean, olc)
+    direct = timeit.default_timer() - start
+    start = timeit.default_timer()
+    surface = PersistenceSurface.build(metocean)
+    build = timeit.default_timer() - start
+    start = timeit.default_timer()
+    for olc in sweep:
+        surface.windows(metocean, olc)
+    lookup = timeit.default_timer() - start
+    print('sweep of %d limits: direct %.2f ms, surface %.2f ms '
+          '(+ %.2f ms to build)' % (NB_SWEEP, 1000 * direct, 1000 * lookup,
+                                    1000 * build))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,84 @@
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+bench_wp4_feas.py times the feasibility function of the driven pile foundation
+installation for an array of 5,000 devices with 6 foundations each, comparing
+the vectorized wp4_feas against the former loop over devices and foundations.
+
+Examples
+--------
+$ python benchmarks/bench_wp4_feas.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+mod_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, mod_path)
+
+from wp5.feasibility.wp4 import wp4_feas
+
+NB_DEVICES = 5000
+NB_FOUNDATIONS = 6
+
+
+def synthetic_bom(nb_devices=NB_DEVICES, nb_found=NB_FOUNDATIONS, seed=0):
+    """Builds WP2 and WP4 data sets with one row per device"""
+    rand = np.random.RandomState(seed)
+    wp4 = {'device': ['device%03d' % dev for dev in range(nb_devices)],
+           'foundation type': 'pile',
+           'quantity': rand.randint(1, nb_found + 1, nb_devices)}
+    for x in range(nb_found):
+        wp4["diameter foundation %d [m]" % x] = rand.uniform(1, 4, nb_devices)
+        wp4["length foundation %d [m]" % x] = rand.uniform(20, 130, nb_devices)
+        wp4["weight foundation %d [kg]" % x] = rand.uniform(4e3, 2e5, nb_devices)
+    wp2 = {'NumOFunits': pd.DataFrame({'Number Units': [nb_devices]})}
+    return wp2, pd.DataFrame(wp4)
+
+
+def loop_feas(wp2_outputs, wp4_outputs):
+    """Loop over devices and foundations, as implemented before vectorization"""
+    load_u = []
+    area_u = []
+    diam_u = []
+    for dev in range(int(wp2_outputs['NumOFunits'].values.flat[0])):
+        load_u_f = []
+        area_u_f = []
+        diam_u_f = []
+        for x in range(wp4_outputs['quantity'].iloc[dev]):
+            key1 = "diameter foundation " + str(x) + " [m]"
+            key2 = "length foundation " + str(x) + " [m]"
+            key3 = "weight foundation " + str(x) + " [kg]"
+            load_u_f.append(wp4_outputs[key1].iloc[dev] * wp4_outputs[key2].iloc[dev] / wp4_outputs[key3].iloc[dev])
+            area_u_f.append(wp4_outputs[key1].iloc[dev] * wp4_outputs[key2].iloc[dev])
+            diam_u_f.append(wp4_outputs[key1].iloc[dev])
+        load_u.append(max(load_u_f))
+        area_u.append(sum(area_u_f))
+        diam_u.append(max(diam_u_f))
+    return max(load_u), max(area_u), max(diam_u)
+
+
+def run(repeat=3):
+    wp2, wp4 = synthetic_bom()
+    feas_e, feas_v = wp4_feas(None, 'F_driven', wp2, wp4)
+    reference = loop_feas(wp2, wp4)
+    vectorized = (feas_v['Crane Barge'][0][2], feas_v['Crane Barge'][1][2],
+                  feas_e['Hammer'][0][2])
+    assert np.allclose(reference, vectorized)
+
+    loop = min(timeit.repeat(lambda: loop_feas(wp2, wp4), number=1,
+                             repeat=repeat))
+    vect = min(timeit.repeat(lambda: wp4_feas(None, 'F_driven', wp2, wp4),
+                             number=1, repeat=repeat))
+    print('%d devices x %d foundations' % (NB_DEVICES, NB_FOUNDATIONS))
+    print('loop       %10.2f ms' % (1000 * loop))
+    print('vectorized %10.2f ms  (%.0fx)' % (1000 * vect, loop / vect))
+
+
+if __name__ == "__main__":
+    run()
@@ -77,10 +77,7 @@ See also: ...
 
 from os import path
 
-from wp5.load import load_vessel_data, load_equipment_data, load_port_data
-from wp5.load.wp_bom import load_WP1_BoM, load_WP2_BoM
-from wp5.load.wp_bom import load_WP3_BoM, load_WP4_BoM
-from wp5.load.wp_bom import load_WP6_BoM
+from wp5.load.inputs import load_inputs
 from wp5.logistics.operations import logOp_init
 from wp5.logistics.phase import logPhase_install_init, logPhase_OM_init
 from wp5.installation import planning, select_port
@@ -88,6 +85,7 @@ from wp5.feasibility.glob import glob_feas
 from wp5.feasibility.wp6 import wp6_feas
 from wp5.selection.select_ve import select_e, select_v
 from wp5.selection.match import compatibility_ve, compatibility_ve_om
+from wp5.performance.schedule.durations import OM_DURATIONS
 from wp5.performance.schedule.schedule import sched
 from wp5.performance.schedule.schedule_om import sched_om
 from wp5.performance.economic.eco import cost
@@ -108,16 +106,26 @@ def database_file(file):
 """
 Main function to run work package 5
 """
-vessels = load_vessel_data(database_file("Vessel_Database_python.xlsx"))
-equipments = load_equipment_data(database_file("Equipment_Database_python.xlsx"))
-ports = load_port_data(database_file("Ports_Database2_python.xlsx"))
-
-user_inputs = load_WP1_BoM(database_file("WP1_BoM.xlsx"),
-                           database_file("VianaCastelo.csv"))
-wp2_outputs = load_WP2_BoM(database_file("WP2_BoM.xlsx"))
-wp3_outputs = load_WP3_BoM(database_file("WP3_BoM.xlsx"))
-wp4_outputs = load_WP4_BoM(database_file("WP4_BoM.csv"))
-wp6_outputs = load_WP6_BoM(database_file("WP6_BoM.xlsx"))
+# the databases and upstream data sets are independent and loaded in parallel
+inputs = load_inputs(database_file("Vessel_Database_python.xlsx"),
+                     database_file("Equipment_Database_python.xlsx"),
+                     database_file("Ports_Database2_python.xlsx"),
+                     database_file("WP1_BoM.xlsx"),
+                     database_file("VianaCastelo.csv"),
+                     database_file("WP2_BoM.xlsx"),
+                     database_file("WP3_BoM.xlsx"),
+                     database_file("WP4_BoM.csv"),
+                     database_file("WP6_BoM.xlsx"))
+
+vessels = inputs['vessels']
+equipments = inputs['equipments']
+ports = inputs['ports']
+
+user_inputs = inputs['user_inputs']
+wp2_outputs = inputs['wp2_outputs']
+wp3_outputs = inputs['wp3_outputs']
+wp4_outputs = inputs['wp4_outputs']
+wp6_outputs = inputs['wp6_outputs']
 
 """
 ### Initialise logistic operations and logistic phases
@@ -126,10 +134,14 @@ logOp = logOp_init()
 
 logPhase_OM = logPhase_OM_init(logOp, vessels, equipments)
 
+# (latitude, longitude) [deg] of the project site, off Viana do Castelo where
+# the met-ocean data were recorded, until it is given by the end-user
+site = (41.7, -9.0)
+
 """
 ### Compute the logistic phase solutions
 """
-OM_port = select_port.OM_port(wp6_outputs, ports)
+OM_port = select_port.OM_port(wp6_outputs, ports, site)
 
 om = {'phase': logPhase_OM,
       'port': OM_port,
@@ -155,13 +167,15 @@ om['eq_select'], log_phase = select_e(om, log_phase)
 om['ve_select'], log_phase = select_v(om, log_phase)
 
 # matching requirements for combinations of port/vessel(s)/equipment
-om['combi_select'], log_phase = compatibility_ve_om(om, log_phase)
+om['combi_select'], log_phase = compatibility_ve_om(
+    om, log_phase, duration_model=OM_DURATIONS,
+    context={'wp6_outputs': wp6_outputs})
 #log_phase = compatibility_ve(install, log_phase)
 #
 ## schedule assessment of the different operation sequence
-om['scheduled'], log_phase = sched_om(om, log_phase, user_inputs, wp6_outputs)
+log_phase = sched_om(om, log_phase, user_inputs, wp6_outputs, site=site)
 
-# cost assessment of the different operation sequenc
+# cost assessment of the different operation sequenc, ranked solutions
 om['cost'], log_phase = cost(om, log_phase)
 ## TO DO
 
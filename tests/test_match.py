@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the enumeration of the vessel and equipment solutions: the pruned
+top-k search has to keep the same solutions as a full enumeration ranked
+afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+from wp5.logistics import EquipmentType, VesselType
+from wp5.logistics.operations import logOp_init
+from wp5.logistics.phase import DefPhase, LogPhase
+from wp5.performance.schedule.durations import INSTALLATION_DURATIONS
+from wp5.selection.match import (compatibility_ve, day_rates,
+                                 enumerate_solutions)
+
+
+def vessel_type(rs, name, nb_rows):
+    rates = rs.uniform(1000., 9000., nb_rows)
+    return VesselType(name, pd.DataFrame({'Op min Day Rate': rates,
+                                          'Op max Day Rate': rates * 1.2,
+                                          'Transit speed [m/s]': 5.}))
+
+
+def equipment_type(rs, name, nb_rows):
+    return EquipmentType(name, pd.DataFrame({
+        'hammer day rate': rs.uniform(100., 900., nb_rows),
+        'supervisor day rate': 50.}))
+
+
+def logistic_phase(seed=1):
+    rs = np.random.RandomState(seed)
+    log_op = logOp_init()
+    ops = [op for op in log_op.values() if op.id in (10, 14, 15, 31)]
+    log_phase = LogPhase(1, 'test phase')
+    for seq in range(3):
+        op_ve = log_phase.op_ve[seq] = DefPhase(seq, 'test sequence')
+        op_ve.op_sequence = ops[:2 + seq]
+        op_ve.ve_combination[0] = {
+            'vessel': [(1, vessel_type(rs, 'CLV', 12)),
+                       (2, vessel_type(rs, 'Tug', 6))],
+            'equipment': [(1, equipment_type(rs, 'hammer', 4), 0)]}
+        op_ve.ve_combination[1] = {
+            'vessel': [(1, vessel_type(rs, 'JUP', 20))],
+            'equipment': [(0, 0, 0)]}
+    return log_phase
+
+
+def ranks(solutions):
+    return sorted((solution.lower_bound, solution.day_rate)
+                  for solution in solutions)
+
+
+def test_full_enumeration():
+    log_phase = logistic_phase()
+    solutions = list(enumerate_solutions(log_phase))
+    assert len(solutions) == 3 * (12 * 6 * 4 + 20)
+    for seq in range(3):
+        rows = set()
+        for nr_seq, solution in solutions:
+            if nr_seq != seq:
+                continue
+            key = (solution.combination,) + tuple(
+                (nr, solution.sol_ves[nr].name) for nr in solution.sol_ves) + \
+                tuple((nr, solution.sol_eq[nr].name) for nr in solution.sol_eq)
+            rows.add(key)
+            combination = log_phase.op_ve[seq].ve_combination[
+                solution.combination]
+            expected = sum(day_rates(entry[1].panda.loc[[row.name]])[0] *
+                           entry[0] for entry, row in
+                           zip(combination['vessel'],
+                               [solution.sol_ves[nr]
+                                for nr in sorted(solution.sol_ves)]))
+            expected += sum(day_rates(entry[1].panda.loc[[row.name]])[0] *
+                            entry[0] for entry, row in
+                            zip(combination['equipment'],
+                                [solution.sol_eq[nr]
+                                 for nr in sorted(solution.sol_eq)]))
+            assert np.isclose(solution.day_rate, expected)
+            assert solution.lower_bound == 0.
+        # every solution is enumerated once
+        assert len(rows) == 12 * 6 * 4 + 20
+
+
+def test_top_k_matches_full_enumeration():
+    for k in (1, 7, 50, 1000):
+        log_phase = logistic_phase()
+        everything = list(enumerate_solutions(
+            log_phase, duration_model=INSTALLATION_DURATIONS))
+        sol, log_phase = compatibility_ve(
+            None, log_phase, k=k, duration_model=INSTALLATION_DURATIONS)
+        nb_kept = 0
+        for seq in range(3):
+            expected = ranks(solution for nr_seq, solution in everything
+                             if nr_seq == seq)[:k]
+            kept = log_phase.op_ve[seq].sol
+            assert sorted(kept) == list(range(len(kept)))
+            got = [(kept[nr].lower_bound, kept[nr].day_rate)
+                   for nr in sorted(kept)]
+            np.testing.assert_allclose(got, expected)
+            nb_kept += len(kept)
+        assert len(sol) == nb_kept
+
+
+def test_pruning_yields_fewer_solutions():
+    log_phase = logistic_phase()
+    pruned = list(enumerate_solutions(log_phase, k=5))
+    assert len(pruned) < len(list(enumerate_solutions(log_phase)))
+    # the k best of each sequence are among the ones yielded
+    for seq in range(3):
+        full = ranks(solution for nr_seq, solution in
+                     enumerate_solutions(log_phase) if nr_seq == seq)[:5]
+        yielded = ranks(solution for nr_seq, solution in pruned
+                        if nr_seq == seq)[:5]
+        np.testing.assert_allclose(yielded, full)
+
+
+def test_min_sea_time_ranks_on_first_vessel():
+    log_phase = logistic_phase()
+    solutions = list(enumerate_solutions(log_phase, min_sea_time={0: 48.}))
+    for seq, solution in solutions:
+        if seq != 0:
+            assert solution.lower_bound == 0.
+            continue
+        rate = day_rates(solution.sol_ves[0].to_frame().T)[0]
+        assert np.isclose(solution.lower_bound, rate * 2.)
+
+
+def test_infeasible_slot():
+    log_phase = logistic_phase()
+    # no feasible barge: the first combination gives no solution
+    for seq in range(3):
+        combination = log_phase.op_ve[seq].ve_combination[0]
+        combination['vessel'][1] = (2, VesselType('Tug', pd.DataFrame(
+            columns=['Op min Day Rate', 'Op max Day Rate'])))
+    solutions = list(enumerate_solutions(log_phase, k=3))
+    assert solutions
+    assert all(solution.combination == 1 for _, solution in solutions)
+    # no feasible vessel at all: no solution
+    for seq in range(3):
+        del log_phase.op_ve[seq].ve_combination[1]
+    sol, log_phase = compatibility_ve(None, log_phase, k=3)
+    assert sol == {}
+    assert all(log_phase.op_ve[seq].sol == {} for seq in range(3))
+
+
+def test_missing_day_rates_ranked_last():
+    rs = np.random.RandomState(0)
+    vessels = vessel_type(rs, 'JUP', 10)
+    vessels.panda.loc[[2, 5], ['Op min Day Rate', 'Op max Day Rate']] = np.nan
+    vessels.panda.loc[7, 'Op max Day Rate'] = np.nan
+    rates = day_rates(vessels.panda)
+    assert np.isinf(rates[[2, 5]]).all()
+    assert rates[7] == vessels.panda.loc[7, 'Op min Day Rate']
+    log_phase = LogPhase(1, 'test phase')
+    log_phase.op_ve[0] = DefPhase(0, 'test sequence')
+    log_phase.op_ve[0].ve_combination[0] = {'vessel': [(1, vessels)],
+                                           'equipment': [(0, 0, 0)]}
+    solutions = [solution for _, solution in enumerate_solutions(log_phase)]
+    assert [solution.sol_ves[0].name for solution in solutions[-2:]] == [2, 5]
+    sol, log_phase = compatibility_ve(None, log_phase, k=8)
+    assert set(solution.sol_ves[0].name for solution in sol.values()) == \
+        set(range(10)) - set([2, 5])
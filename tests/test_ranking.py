@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the ranking of the solutions: the incremental Pareto archive and the
+bounded top-k heap against a comparison of all the solutions.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wp5.logistics.phase import DefPhase, LogPhase, VE_solutions
+from wp5.performance.ranking import (OBJECTIVES, ParetoArchive, TopK,
+                                     rank_solutions)
+
+
+def dominates(first, second):
+    return all(a <= b for a, b in zip(first, second)) and \
+        any(a < b for a, b in zip(first, second))
+
+
+def non_dominated(values):
+    front = []
+    for pos, value in enumerate(values):
+        if any(dominates(other, value) for other in values):
+            continue
+        # of equal values, the first submitted is kept
+        if any(tuple(values[other]) == tuple(value) for other in front):
+            continue
+        front.append(pos)
+    return front
+
+
+def test_pareto_archive_matches_scan():
+    for seed in range(10):
+        rs = np.random.RandomState(seed)
+        # integer values give many ties and equal solutions
+        values = [tuple(row) for row in
+                  rs.randint(0, 8, (200, 3)).astype(float)]
+        archive = ParetoArchive()
+        for pos, value in enumerate(values):
+            archive.add(pos, value)
+        front = non_dominated(values)
+        assert sorted(item for _, item in archive.ranked()) == front
+        ranked = archive.ranked(objective=1)
+        keys = [(value[1], value[0], value[2]) for value, _ in ranked]
+        assert keys == sorted(keys)
+        assert len(archive) == len(front)
+
+
+def test_pareto_archive_add():
+    archive = ParetoArchive(2)
+    assert archive.add('a', (2., 2.))
+    assert not archive.add('b', (2., 2.))
+    assert not archive.add('c', (3., 2.))
+    assert archive.add('d', (1., 3.))
+    assert archive.add('e', (1., 1.))
+    assert [item for _, item in archive.ranked()] == ['e']
+
+
+def test_top_k_matches_sort():
+    rs = np.random.RandomState(0)
+    values = [tuple(row) for row in rs.randint(0, 20, (300, 3)).astype(float)]
+    for k in (1, 5, 50, 400):
+        for objective in range(3):
+            top = TopK(k, objective)
+            for pos, value in enumerate(values):
+                top.add(pos, value)
+            # ties keep the first submitted
+            expected = sorted(range(len(values)),
+                              key=lambda pos: (values[pos][objective], pos))
+            assert [item for _, item in top.ranked()] == expected[:k]
+            assert len(top) == min(k, len(values))
+
+
+def logistic_phase(objectives):
+    log_phase = LogPhase(1, 'test phase')
+    log_phase.op_ve[0] = DefPhase(0, 'test sequence')
+    for nr_sol, (cost, duration, waiting) in enumerate(objectives):
+        solution = VE_solutions(nr_sol)
+        solution.combination = 0
+        solution.sol_ves[0] = pd.Series({'Vessel type': 'CLV'},
+                                        name='V%d' % nr_sol)
+        solution.schedule = {'preparation': 0., 'waiting time': waiting,
+                             'sea time': duration - waiting}
+        solution.cost = {'vessel': cost, 'equipment': 0., 'port cost': 0.}
+        log_phase.op_ve[0].sol[nr_sol] = solution
+    return log_phase
+
+
+def test_rank_solutions():
+    log_phase = logistic_phase([(10., 3., 1.), (8., 6., 1.), (12., 6., 2.),
+                                (8., 4., 0.)])
+    ranking = rank_solutions(log_phase)
+    assert list(ranking.solution) == [3, 0]
+    assert list(ranking['rank']) == [0, 1]
+    assert list(ranking.vessels) == [('V3',), ('V0',)]
+    ranking = rank_solutions(log_phase, 'topk', k=3, objective='waiting time')
+    assert list(ranking.solution) == [3, 0, 1]
+    assert list(ranking.columns[4:7]) == list(OBJECTIVES)
+    with pytest.raises(ValueError):
+        rank_solutions(log_phase, 'best')
+
+
+def test_rank_solutions_sinks_nan():
+    log_phase = logistic_phase([(np.nan, 1., 0.), (10., 5., 1.),
+                                (20., 6., 2.)])
+    # the solution without cost is not dominated on the duration
+    ranking = rank_solutions(log_phase)
+    assert list(ranking.solution) == [1, 0]
+    assert np.isnan(ranking['total cost'].iloc[1])
+    ranking = rank_solutions(log_phase, 'topk', k=2)
+    assert list(ranking.solution) == [1, 2]
+    ranking = rank_solutions(log_phase, 'topk', k=3)
+    assert list(ranking.solution) == [1, 2, 0]
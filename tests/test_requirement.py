@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the requirement compiler: the numpy masks, the positions answered by
+the sorted indexes of a vessel type and the SQL WHERE clauses have to select
+the same rows.
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from wp5.load.sql import WP5Database, _write_table
+from wp5.logistics import VesselType
+from wp5.selection.requirement import (AllOf, AnyOf, Condition, Not,
+                                       compile_requirements)
+
+
+def vessel_table(nb_rows=200, seed=0):
+    rs = np.random.RandomState(seed)
+    deck = rs.uniform(0., 100., nb_rows).round(1)
+    deck[rs.rand(nb_rows) < 0.1] = np.nan
+    crane = rs.randint(0, 500, nb_rows).astype(float).astype(object)
+    crane[rs.rand(nb_rows) < 0.1] = 'n/a'
+    panda = pd.DataFrame({'Deck space [m2]': deck,
+                          'Crane weight [t]': crane,
+                          'Vessel type': rs.choice(['CLV', 'JUP', 'Tug'],
+                                                   nb_rows),
+                          'DP': rs.randint(0, 3, nb_rows)},
+                         index=['V%03d' % nr for nr in range(nb_rows)])
+    panda.index.name = 'Name'
+    return panda
+
+
+def requirements():
+    deck = Condition('Deck space [m2]', 'sup', 40.)
+    crane = Condition('Crane weight [t]', 'inf', 250.)
+    crane_range = Condition('Crane weight [t]', 'range', (100., 300.))
+    dp = Condition('DP', 'eq', 2)
+    kind = Condition('Vessel type', 'in', ['CLV', 'Tug'])
+    jup = Condition('Vessel type', 'eq', 'JUP')
+    return [deck, crane, crane_range, dp, kind, jup, Not(deck), Not(crane),
+            deck & crane, deck | crane_range, ~(dp | kind),
+            AllOf([deck, AnyOf([jup, Not(crane_range)])]),
+            AnyOf([]), AllOf([]), Not(AnyOf([deck, dp])),
+            compile_requirements([['Deck space [m2]', 'range', (10., 60.)],
+                                  ['Crane weight [t]', 'sup', 50.]])]
+
+
+def test_numpy_mask_matches_scalar_rules():
+    panda = vessel_table()
+    deck = panda['Deck space [m2]'].values
+    crane = pd.to_numeric(panda['Crane weight [t]'], errors='coerce').values
+    with np.errstate(invalid='ignore'):
+        expected = (deck >= 40.) & ((panda['Vessel type'] == 'JUP').values |
+                                    ~((crane >= 100.) & (crane <= 300.)))
+    req = AllOf([Condition('Deck space [m2]', 'sup', 40.),
+                 AnyOf([Condition('Vessel type', 'eq', 'JUP'),
+                        Not(Condition('Crane weight [t]', 'range',
+                                      (100., 300.)))])])
+    np.testing.assert_array_equal(req.mask(panda), expected)
+    # missing values and text never satisfy a numeric condition
+    assert not Condition('Deck space [m2]', 'sup', 0.).mask(panda)[
+        np.isnan(deck)].any()
+    assert not Condition('Crane weight [t]', 'inf', 1e9).mask(panda)[
+        np.isnan(crane)].any()
+
+
+def test_compositions_flatten():
+    deck = Condition('Deck space [m2]', 'sup', 40.)
+    dp = Condition('DP', 'eq', 2)
+    kind = Condition('Vessel type', 'in', ['Tug', 'CLV', 'Tug'])
+    assert (deck & dp & kind).requirements == [deck, dp, kind]
+    assert kind.value == ('CLV', 'Tug')
+    assert compile_requirements([['DP', 'eq', 2]]) == dp
+    assert (deck | dp).key() == AnyOf([deck, dp]).key()
+
+
+def test_indexed_positions_match_mask():
+    panda = vessel_table()
+    vessel_type = VesselType('CLV', panda)
+    for req in requirements():
+        np.testing.assert_array_equal(req.indexed_positions(vessel_type),
+                                      np.flatnonzero(req.mask(panda)),
+                                      err_msg=repr(req))
+
+
+def test_sql_matches_mask(tmpdir):
+    panda = vessel_table()
+    db_path = os.path.join(str(tmpdir), 'wp5.db')
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute('CREATE TABLE wp5_tables (name TEXT, index_name TEXT)')
+        _write_table(conn, 'vessels', panda, ['Deck space [m2]'],
+                     prefix=['Vessel type'])
+    conn.close()
+    database = WP5Database(db_path)
+    for req in requirements():
+        assert database.query_labels('vessels', req) == \
+            list(panda.index[req.mask(panda)]), repr(req)
+    rows = database.query('vessels', Condition('DP', 'eq', 2))
+    assert rows.index.name == 'Name'
+    assert list(rows.index) == list(panda.index[panda.DP == 2])
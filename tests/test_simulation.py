@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the discrete-event simulation of an installation plan: shared
+vessels, dependencies between the logistic phases and phases without weather
+window.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wp5.installation.simulation import (PhaseTask, dependencies,
+                                         simulate)
+from wp5.performance.schedule.weather import WindowCache, weather_windows
+
+
+def metocean(nb_records=24 * 120, seed=0):
+    rs = np.random.RandomState(seed)
+    dates = pd.date_range('2001-01-01', periods=nb_records, freq='h')
+    # storms of a few days every other week
+    wave_hs = 1. + 0.8 * np.sin(np.arange(nb_records) * 2 * np.pi / 336.) + \
+        rs.uniform(0., 0.6, nb_records)
+    return pd.DataFrame({'year': dates.year, 'month': dates.month,
+                         'day': dates.day, 'hour': dates.hour,
+                         'waveHs': wave_hs,
+                         'windSpeed': rs.uniform(0., 14., nb_records)})
+
+
+def run(install_seq, tasks, data, start=0.):
+    return simulate(install_seq, tasks, data, start,
+                    window_cache=WindowCache())
+
+
+def test_dependencies():
+    install_seq = {0: ['A', 'B'], 1: [{'C': 'A'}, {'D': ('B', 'C')}],
+                   2: ['E']}
+    depends, order = dependencies(install_seq)
+    assert order == ['A', 'B', 'C', 'D', 'E']
+    assert depends == {'A': (), 'B': (), 'C': ('A',), 'D': ('B', 'C'),
+                       'E': ('C', 'D')}
+
+
+def test_unknown_phases():
+    with pytest.raises(ValueError):
+        run({0: ['A', 'B']}, {'A': PhaseTask('A', 1.)}, metocean())
+    with pytest.raises(ValueError):
+        run({0: [{'A': 'X'}]}, {'A': PhaseTask('A', 1.)}, metocean())
+
+
+def test_operations_in_weather_windows():
+    data = metocean()
+    olc = {'maxHs': 1.5, 'maxWs': 12.}
+    tasks = {'A': PhaseTask('A', 8., 24., 12, olc, ('JUP',))}
+    timeline, gantt = run({0: ['A']}, tasks, data, start=100.)
+    ww = weather_windows(data, olc)
+    operations = gantt[gantt.activity == 'operation']
+    assert len(operations) == 12
+    assert list(operations.unit) == list(range(12))
+    for begin, end in zip(operations.start, operations.end):
+        nr_window = np.searchsorted(ww.start, begin, 'right') - 1
+        assert ww.start[nr_window] <= begin
+        assert end <= ww.start[nr_window] + ww.duration[nr_window]
+    # the units are performed one after the other, as early as possible
+    assert (operations.start.values[1:] >= operations.end.values[:-1]).all()
+    assert operations.start.iloc[0] == ww.index.earliest(124., 8.)
+    phase = timeline['A']
+    assert phase['start time'] == 100.
+    assert phase['end time'] == operations.end.iloc[-1]
+    assert phase['sea time'] == 12 * 8.
+    waiting = gantt[gantt.activity == 'waiting']
+    assert np.isclose(phase['waiting time'], (waiting.end -
+                                              waiting.start).sum())
+    assert np.isclose(phase['end time'] - phase['start time'],
+                      24. + phase['sea time'] + phase['waiting time'])
+
+
+def test_shared_vessels_never_overlap():
+    data = metocean()
+    olc = {'maxHs': 1.8}
+    tasks = {'A': PhaseTask('A', 6., 12., 5, olc, ('CLV',)),
+             'B': PhaseTask('B', 4., 6., 8, olc, ('CLV', 'Tug')),
+             'C': PhaseTask('C', 5., 6., 4, olc, ('JUP',)),
+             'D': PhaseTask('D', 3., 0., 3, olc, ('Tug',))}
+    timeline, gantt = run({0: ['A', 'B', 'C', 'D']}, tasks, data)
+    for vessel in ('CLV', 'Tug', 'JUP'):
+        phases = [phase_id for phase_id in sorted(tasks)
+                  if vessel in tasks[phase_id].vessels]
+        spans = sorted((timeline[phase_id]['start time'],
+                        timeline[phase_id]['end time'])
+                       for phase_id in phases)
+        for (_, end), (begin, _) in zip(spans[:-1], spans[1:]):
+            assert begin >= end, vessel
+    # a phase starts as soon as all its vessels are free, the phases whose
+    # vessels are free are not delayed by the ones waiting
+    assert timeline['A']['start time'] == 0.
+    assert timeline['C']['start time'] == 0.
+    assert timeline['D']['start time'] == 0.
+    assert timeline['B']['start time'] == max(timeline['A']['end time'],
+                                              timeline['D']['end time'])
+    assert set(gantt.phase) == set(tasks)
+
+
+def test_dependent_phases_wait():
+    data = metocean()
+    tasks = {'E_export': PhaseTask('E_export', 30., 72., 1, {'maxHs': 2.},
+                                   ('CLV',)),
+             'F_driven': PhaseTask('F_driven', 8., 48., 6, {'maxHs': 1.5},
+                                   ('JUP',)),
+             'E_array': PhaseTask('E_array', 6., 24., 4, {'maxHs': 2.},
+                                  ('CLV',)),
+             'D_fixed': PhaseTask('D_fixed', 5., 24., 6, {'maxHs': 1.5},
+                                  ('JUP', 'Tug')),
+             'E_cp': PhaseTask('E_cp', 0., 10., 1)}
+    install_seq = {0: ['E_export', 'F_driven'],
+                   1: [{'E_array': 'E_export'},
+                       {'D_fixed': ('F_driven', 'E_array')}],
+                   2: ['E_cp']}
+    install = {}
+    timeline, gantt = simulate(install_seq, tasks, data, 24.,
+                               window_cache=WindowCache(), install=install)
+    assert install['schedule'] is timeline
+    depends, _ = dependencies(install_seq)
+    for phase_id, required in depends.items():
+        phase = timeline[phase_id]
+        assert np.isfinite(phase['end time'])
+        ready = max([timeline[other]['end time'] for other in required] +
+                    [24.])
+        assert phase['ready time'] == ready
+        assert phase['start time'] >= ready
+    # an operation without sea time does not wait for the weather
+    assert timeline['E_cp']['waiting time'] == 0.
+    assert timeline['E_cp']['end time'] == \
+        timeline['E_cp']['start time'] + 10.
+
+
+def test_phase_without_weather_window():
+    data = metocean()
+    tasks = {'A': PhaseTask('A', 6., 12., 2, {'maxHs': 0.1}, ('CLV',)),
+             'B': PhaseTask('B', 6., 12., 2, {'maxHs': 2.}, ('CLV',)),
+             'C': PhaseTask('C', 6., 0., 1, {'maxHs': 2.}, ('JUP',))}
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        timeline, gantt = run({0: ['A', 'C'], 1: [{'B': 'A'}]}, tasks, data)
+    assert any('no weather window' in str(warning.message)
+               for warning in caught)
+    assert timeline['A']['end time'] == np.inf
+    assert timeline['A']['start time'] == 0.
+    # the vessels are released, the dependent phase is never ready
+    assert timeline['B']['ready time'] == np.inf
+    assert timeline['B']['end time'] == np.inf
+    assert np.isfinite(timeline['C']['end time'])
+    assert 'A' not in set(gantt.phase[gantt.activity == 'operation'])
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the on-disk stores: the cached tables, the met-ocean store and its
+persistence surfaces have to give back the data they were built from, and to
+be rebuilt only when their source changes.
+"""
+
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from wp5.load import cache
+from wp5.load.metocean import (CALENDAR, VARIABLES, MetoceanFrame,
+                               MetoceanStore, build_store, open_metocean)
+from wp5.performance.schedule.persistence import (PersistenceSurface,
+                                                  persistence_surface)
+from wp5.performance.schedule.weather import weather_windows
+
+
+def no_temporary_files(path):
+    for _, _, files in os.walk(path):
+        assert not [name for name in files if name.endswith('.tmp')]
+
+
+def table():
+    panda = pd.DataFrame({'Name': ['Porto', 'Leixões', None, 'Viana'],
+                          'Depth [m]': [10.5, np.nan, 7., 12.],
+                          'Cranes': [2, 0, 1, 3],
+                          'Terminal area [m2]': [1000, 'n/a', 2500.5, 'All'],
+                          'Opening': [datetime(2015, 1, 1), None,
+                                      datetime(2016, 6, 30, 12), None]},
+                         index=pd.Index(['P1', 'P2', 'P3', 'P4'], name='id'))
+    panda['Terminal area [m2]'] = panda['Terminal area [m2]'].astype(object)
+    panda['Opening'] = panda['Opening'].astype(object)
+    return panda
+
+
+def test_cached_table_round_trip(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    source_path = str(tmpdir.join('ports.csv'))
+    panda = table()
+    panda.to_csv(source_path)
+    calls = []
+
+    def parser():
+        calls.append(1)
+        return panda
+
+    first = cache.CachedSource(source_path, cache_dir).load('ports', parser)
+    second = cache.CachedSource(source_path, cache_dir).load('ports', parser)
+    assert len(calls) == 1
+    assert first is panda
+    assert list(second.columns) == list(panda.columns)
+    assert second.index.name == 'id'
+    assert list(second.index) == list(panda.index)
+    for column in panda.columns:
+        for value, expected in zip(second[column], panda[column]):
+            if pd.isnull(expected):
+                assert pd.isnull(value)
+            else:
+                assert value == expected
+    no_temporary_files(cache_dir)
+
+
+def test_cached_table_rebuilt_on_change(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    source_path = str(tmpdir.join('data.csv'))
+    pd.DataFrame({'a': [1, 2, 3]}).to_csv(source_path, index=False)
+    assert list(cache.read_csv(source_path, cache_dir)['a']) == [1, 2, 3]
+    # same content, new modification time: the entry is kept
+    stat = os.stat(source_path)
+    os.utime(source_path, (stat.st_atime, stat.st_mtime + 10))
+    calls = []
+    source = cache.CachedSource(source_path, cache_dir)
+    source.load(cache._entry_key('csv', '', {}), lambda: calls.append(1))
+    assert not calls
+    pd.DataFrame({'a': [4, 5]}).to_csv(source_path, index=False)
+    os.utime(source_path, (stat.st_atime, stat.st_mtime + 20))
+    assert list(cache.read_csv(source_path, cache_dir)['a']) == [4, 5]
+    status = cache.cache_status(cache_dir)
+    assert list(status['status']) == ['valid']
+    assert list(status['tables']) == [1]
+    assert len([name for name in os.listdir(cache_dir)
+                if name.endswith('.npz')]) == 1
+
+
+def metocean_csv(path, nb_records=500, seed=0):
+    rs = np.random.RandomState(seed)
+    dates = pd.date_range('1999-12-20', periods=nb_records, freq='h')
+    panda = pd.DataFrame({'year': dates.year, 'month': dates.month,
+                          'day': dates.day, 'hour': dates.hour,
+                          'windSpeed': rs.uniform(0., 20., nb_records),
+                          'windDir': rs.uniform(0., 360., nb_records),
+                          'waveHs': rs.uniform(0., 4., nb_records),
+                          'waveDir': rs.uniform(0., 360., nb_records)})
+    panda.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def test_metocean_store_round_trip(tmpdir):
+    csv_path = str(tmpdir.join('metocean.csv'))
+    panda = metocean_csv(csv_path)
+    store = build_store(csv_path, str(tmpdir.join('store')), chunksize=64)
+    assert len(store) == len(panda)
+    assert store.time_step == 1
+    for var in VARIABLES:
+        np.testing.assert_allclose(store[var], panda[var], rtol=1e-6)
+        assert store[var].dtype == np.float32
+    frame = MetoceanFrame(store)
+    assert frame.columns == list(CALENDAR) + list(VARIABLES)
+    for column in CALENDAR:
+        np.testing.assert_array_equal(frame[column], panda[column])
+    np.testing.assert_allclose(frame.waveHs, panda.waveHs, rtol=1e-6)
+    reopened = MetoceanStore.open(store.path)
+    np.testing.assert_array_equal(reopened.hours, store.hours)
+    assert reopened.content_hash == store.content_hash
+    part = store.between(store.hours[10], store.hours[20])
+    np.testing.assert_array_equal(part.hours, store.hours[10:20])
+    no_temporary_files(str(tmpdir))
+
+
+def test_open_metocean_rebuilds_on_change(tmpdir):
+    csv_path = str(tmpdir.join('metocean.csv'))
+    path = str(tmpdir.join('store'))
+    metocean_csv(csv_path, seed=0)
+    store = open_metocean(csv_path, path)
+    data_mtime = os.stat(os.path.join(path, 'data.npy')).st_mtime
+    # copied file, same content: the store is kept
+    shutil.copy(csv_path, csv_path + '.bak')
+    shutil.move(csv_path + '.bak', csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, (stat.st_atime, stat.st_mtime + 10))
+    again = open_metocean(csv_path, path)
+    assert os.stat(os.path.join(path, 'data.npy')).st_mtime == data_mtime
+    assert again.content_hash == store.content_hash
+    panda = metocean_csv(csv_path, nb_records=300, seed=1)
+    rebuilt = open_metocean(csv_path, path)
+    assert len(rebuilt) == 300
+    assert rebuilt.content_hash != store.content_hash
+    np.testing.assert_allclose(rebuilt['waveHs'], panda.waveHs, rtol=1e-6)
+    # the previous store and the temporary folder are removed
+    assert sorted(os.listdir(str(tmpdir))) == ['metocean.csv', 'store']
+
+
+def test_persistence_surface_round_trip(tmpdir):
+    csv_path = str(tmpdir.join('metocean.csv'))
+    metocean_csv(csv_path, nb_records=2000)
+    frame = MetoceanFrame(open_metocean(csv_path, str(tmpdir.join('store'))))
+    built = PersistenceSurface.build(frame)
+    saved = persistence_surface(frame)
+    assert isinstance(saved.steps, np.memmap)
+    loaded = persistence_surface(frame)
+    np.testing.assert_array_equal(saved.steps, built.steps)
+    np.testing.assert_array_equal(loaded.steps, built.steps)
+    no_temporary_files(str(tmpdir))
+    # the windows of a grid point are those of its limits
+    for olc in ({'maxHs': 2.5, 'maxWs': 10.}, {'maxHs': 1., 'maxWs': 0},
+                {'maxHs': 3.75, 'maxWs': 17.}):
+        windows = loaded.windows(frame, olc)
+        expected = weather_windows(frame, olc)
+        np.testing.assert_array_equal(windows.start, expected.start)
+        np.testing.assert_array_equal(windows.duration, expected.duration)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+Tests of the weather window queries of WindowIndex against a scan of all the
+windows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from wp5.performance.schedule.weather import WindowIndex, weather_windows
+
+
+def random_windows(seed, nb_windows=300):
+    """sorted, non overlapping windows with random gaps and durations"""
+    rs = np.random.RandomState(seed)
+    duration = rs.randint(1, 60, nb_windows).astype(float)
+    gaps = rs.randint(1, 40, nb_windows).astype(float)
+    start = np.cumsum(gaps + np.concatenate(([0.], duration[:-1])))
+    return start, duration
+
+
+def scan_earliest(start, duration, after, min_duration):
+    if min_duration <= 0:
+        return after
+    for begin, length in zip(start, duration):
+        end = begin + length
+        if begin <= after < end and end - after >= min_duration:
+            return after
+        if begin > after and length >= min_duration:
+            return begin
+    return np.inf
+
+
+def scan_waiting_time(start, duration, after, min_duration):
+    for begin, length in zip(start, duration):
+        if begin > after and length >= min_duration:
+            return begin - after
+    return np.inf
+
+
+def queries(start, seed):
+    rs = np.random.RandomState(seed)
+    after = np.concatenate((rs.uniform(-10., start[-1] + 50., 400),
+                            start[::7], start[::11] + 0.5))
+    min_duration = rs.randint(-1, 70, len(after)).astype(float)
+    return after, min_duration
+
+
+def test_earliest_matches_scan():
+    for seed in range(5):
+        start, duration = random_windows(seed)
+        index = WindowIndex(start, duration)
+        after, min_duration = queries(start, seed)
+        expected = [scan_earliest(start, duration, a, d)
+                    for a, d in zip(after, min_duration)]
+        np.testing.assert_array_equal(index.earliest(after, min_duration),
+                                      expected)
+        for a, d, value in list(zip(after, min_duration, expected))[:50]:
+            assert index.earliest(a, d) == value
+
+
+def test_waiting_time_matches_scan():
+    for seed in range(5):
+        start, duration = random_windows(seed)
+        index = WindowIndex(start, duration)
+        after, min_duration = queries(start, seed)
+        expected = [scan_waiting_time(start, duration, a, d)
+                    for a, d in zip(after, min_duration)]
+        np.testing.assert_array_equal(index.waiting_time(after, min_duration),
+                                      expected)
+        for a, d, value in list(zip(after, min_duration, expected))[:50]:
+            assert index.waiting_time(a, d) == value
+
+
+def test_first_without_window():
+    start, duration = random_windows(0)
+    index = WindowIndex(start, duration)
+    assert index.first(start[-1], 0.) == -1
+    assert index.first(-1., duration.max() + 1) == -1
+    assert index.earliest(0., duration.max() + 1) == np.inf
+    empty = WindowIndex(np.array([]), np.array([]))
+    assert empty.earliest(5., 1.) == np.inf
+    assert empty.waiting_time(5., 1.) == np.inf
+
+
+def test_weather_windows_are_workable_runs():
+    rs = np.random.RandomState(3)
+    dates = pd.date_range('2000-01-01', periods=2000, freq='h')
+    metocean = pd.DataFrame({'year': dates.year, 'month': dates.month,
+                             'day': dates.day, 'hour': dates.hour,
+                             'waveHs': rs.uniform(0., 3., len(dates)),
+                             'windSpeed': rs.uniform(0., 15., len(dates))})
+    olc = {'maxHs': 2., 'maxWs': 10.}
+    ww = weather_windows(metocean, olc)
+    workable = (metocean.waveHs <= 2.) & (metocean.windSpeed <= 10.)
+    covered = np.zeros(len(metocean), dtype=bool)
+    for begin, length in zip(ww.start, ww.duration):
+        covered[int(begin):int(begin + length)] = True
+        # each window is a maximal run of workable hours
+        assert begin == 0 or not workable[int(begin) - 1]
+        assert begin + length == len(metocean) or \
+            not workable[int(begin + length)]
+    np.testing.assert_array_equal(covered, workable.values)
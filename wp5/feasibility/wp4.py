@@ -10,9 +10,92 @@ function related to the installation of moorings and foundations.
 
 BETA VERSION NOTES: The current version is limited to an installation strategy
 consisting of installation of 1 set of foundations at the time. This will be 
-futher developed in the beta version due to October.
+futher developed in the beta version due to October. The foundations of all
+devices are reshaped into a single numeric array and the requirements are
+computed with numpy reductions, so the cost does not grow with python loops
+over devices and foundations.
 """
 
+import numpy as np
+
+# Attributes of each foundation in the WP4 BoM, the column of foundation N is
+# "<attribute> foundation N <unit>"
+FOUNDATION_ATTRIBUTES = (('diameter', '[m]'),
+                         ('length', '[m]'),
+                         ('weight', '[kg]'))
+
+
+def foundation_array(wp4_outputs, nb_units):
+    """foundation_array reshapes the WP4 BoM into a numeric array of shape
+    (devices, foundations, attributes), the attributes being ordered as in
+    FOUNDATION_ATTRIBUTES. The BoM either contains one row per device or a
+    single row shared by all devices, any other number of rows raises a
+    ValueError, and a missing column of a foundation within the quantity of a
+    device a KeyError. Foundations beyond the quantity of a device are set to
+    NaN.
+
+    Parameters
+    ----------
+    wp4_outputs : DataFrame
+     Panda table containing all required inputs to WP5 coming from WP4
+    nb_units : int
+     number of devices of the array
+
+    Returns
+    -------
+    found : ndarray
+     float array of shape (nb_units, max quantity, 3)
+    """
+    if len(wp4_outputs) not in (1, nb_units):
+        raise ValueError("the WP4 BoM has %d rows, expected 1 or one per "
+                         "device (%d)" % (len(wp4_outputs), nb_units))
+    quantity = wp4_outputs['quantity'].values.astype(int)
+    nb_found = quantity.max()
+    keys = ["%s foundation %d %s" % (attr, x, unit)
+            for x in range(nb_found) for attr, unit in FOUNDATION_ATTRIBUTES]
+    # every foundation below nb_found belongs to at least one device
+    missing = [key for key in keys if key not in wp4_outputs.columns]
+    if missing:
+        raise KeyError("the WP4 BoM has no column %s" % ', '.join(
+            "'%s'" % key for key in missing))
+    found = wp4_outputs[keys].values.astype(float)
+    found = found.reshape(len(wp4_outputs), nb_found,
+                          len(FOUNDATION_ATTRIBUTES))
+    found[np.arange(nb_found)[np.newaxis, :] >= quantity[:, np.newaxis]] = np.nan
+    if len(wp4_outputs) != nb_units:
+        found = np.broadcast_to(found, (nb_units,) + found.shape[1:])
+    return found
+
+
+def foundation_requirements(found):
+    """foundation_requirements computes the deck loading, deck area and sleeve
+    diameter required to carry the set of foundations of any device
+
+    Parameters
+    ----------
+    found : ndarray
+     array of shape (devices, foundations, attributes) from foundation_array
+
+    Returns
+    -------
+    deck_loading : float
+     maximum loading due to a single foundation
+    deck_area : float
+     maximum area occupied by the set of foundations of a device
+    sleeve_diam : float
+     maximum foundation diameter
+    """
+    diameter = found[:, :, 0]
+    length = found[:, :, 1]
+    weight = found[:, :, 2]
+    area = diameter * length
+    load = area / weight
+    deck_loading = np.nanmax(load)
+    deck_area = np.nansum(area, axis=1).max()
+    sleeve_diam = np.nanmax(diameter)
+    return float(deck_loading), float(deck_area), float(sleeve_diam)
+
+
 def wp4_feas(log_phase, log_phase_id, wp2_outputs, wp4_outputs):
     """ wp4_feas is a function which determines the logistic requirement 
     associated with one logistic phase dealing with the installation of 
@@ -38,31 +121,19 @@ def wp4_feas(log_phase, log_phase_id, wp2_outputs, wp4_outputs):
      dictionnary containing all logistic requirements associated with every
      vessel type of the logistic phase under consideration
     """
-    if log_phase_id == 'F_driven':
-        # Equipment feasiblity
-        # Hammer sleeve diameter
-        diam_u_f = []  # list of diameter of each foundation per unit
-        load_u_f = []  # list of loading due to each foundation per unit
-        area_u_f = []  # list of area occupied by each foundation per unit
-        diam_u = []  # list of max diameter per unit
-        load_u = []  # list of loading due to the set of foundation(s) per unit
-        area_u = []  # list of loading occupied by the set of foundation(s) per unit
-        for dev in range(wp2_outputs['NumOFunits'].ix[0]):
-            for x in range(wp4_outputs['quantity'].ix[0]):
-                key1 = "diameter foundation " + str(x) + " [m]"
-                key2 = "length foundation " + str(x) + " [m]"
-                key3 = "weight foundation " + str(x) + " [kg]"
-                load_u_f[len(load_u_f):] = [wp4_outputs[key1].ix[0] * wp4_outputs[key2].ix[0] / wp4_outputs[key3].ix[0]]
-                area_u_f[len(area_u_f):] = [wp4_outputs[key1].ix[0] * wp4_outputs[key2].ix[0]]
-                diam_u_f[len(diam_u_f):] = [wp4_outputs[key1].ix[0]]
-            load_u[len(load_u):] = [max(load_u_f[dev * x:(dev + 1) * x])]
-            area_u[len(area_u):] = [sum(area_u_f[dev * x:(dev + 1) * x])]
-            diam_u[len(diam_u):] = [max(diam_u_f[dev * x:(dev + 1) * x])]
-        deck_loading = max(load_u)
-        deck_area = max(area_u)
-        sleeve_diam = max(diam_u)
+    if log_phase_id in ('F_driven', 'F_suction', 'F_gravity'):
+        nb_units = int(wp2_outputs['NumOFunits'].values.flat[0])
+        found = foundation_array(wp4_outputs, nb_units)
+        deck_loading, deck_area, sleeve_diam = foundation_requirements(found)
 
-        feas_e = {'Hammer': [['Sleeve diameter [m]', 'sup', sleeve_diam]]}
+        if log_phase_id == 'F_driven':
+            # Equipment feasiblity
+            # Hammer sleeve diameter
+            feas_e = {'Hammer': [['Sleeve diameter [m]', 'sup', sleeve_diam]]}
+        else:
+            # Suction caissons and gravity based foundations do not require
+            # any of the equipments of the equipment database
+            feas_e = {}
         feas_v = {'Crane Barge': [['Deck loading [ton/m2]', 'sup', deck_loading],
                                   ['Deck space [m2]', 'sup', deck_area]],
                   'Crane Vessel': [['Deck loading [ton/m2]', 'sup', deck_loading],
@@ -71,8 +142,4 @@ def wp4_feas(log_phase, log_phase_id, wp2_outputs, wp4_outputs):
                                 ['Deck space [m2]', 'sup', deck_area]],
                   'JUP Vessel': [['Deck loading [ton/m2]', 'sup', deck_loading],
                                  ['Deck space [m2]', 'sup', deck_area]]}
-    elif log_phase_id == 'F_suction':
-        pass
-    elif log_phase_id == 'F_gravity':
-        pass
     return feas_e, feas_v
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module provides a spatial index over the coordinates of the port database,
+used to select the nearest feasible ports to one or many project sites. The
+latitude/longitude of each port is converted to a point on the unit sphere:
+the straight-line (chord) distance between two such points increases with
+their great-circle distance, so the nearest ports are found by a KD-tree query
+on the 3D points, and the chord lengths are converted back to haversine
+distances [km].
+
+BETA VERSION NOTES: the KD-tree of scipy is used if available, otherwise the
+distances are computed by brute force with numpy, which remains fast for the
+size of the port database. The coordinates are given in the database as
+degree/minute/second strings, ports whose coordinates cannot be read are not
+indexed.
+"""
+
+import re
+import weakref
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from ..load.sql import SQLPorts
+from ..selection.requirement import compile_requirements
+
+EARTH_RADIUS = 6371.0  # [km]
+
+LATITUDE = "Latitude [° ' '']"
+LONGITUDE = "Longitude  [° ' '']"
+
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+_HEMISPHERE = re.compile(r'[NSEW]')
+
+
+def parse_dms(text):
+    """Converts a degree/minute/second string, e.g. 52°20'54" N or 53° 33,7' N,
+    into decimal degrees, negative for the southern and western hemispheres.
+    Returns NaN if the string cannot be read.
+    """
+    if isinstance(text, (int, float, np.number)):
+        return float(text)
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        return np.nan
+    degrees = 0.
+    for nr, number in enumerate(numbers[:3]):
+        degrees += float(number.replace(',', '.')) / 60 ** nr
+    hemisphere = _HEMISPHERE.findall(text.upper())
+    if hemisphere and hemisphere[-1] in 'SW':
+        degrees = -degrees
+    return degrees
+
+
+def port_coordinates(ports):
+    """Returns the latitudes and longitudes [deg] of the ports of a panda
+    table, NaN where the coordinates cannot be read"""
+    latitude = np.array([parse_dms(value) for value in ports[LATITUDE]],
+                        dtype=float)
+    longitude = np.array([parse_dms(value) for value in ports[LONGITUDE]],
+                         dtype=float)
+    return latitude, longitude
+
+
+def unit_vectors(latitude, longitude):
+    """Returns the points of the unit sphere at the given latitudes and
+    longitudes [deg], as an array of shape (n, 3)"""
+    lat = np.radians(np.atleast_1d(np.asarray(latitude, dtype=float)))
+    lon = np.radians(np.atleast_1d(np.asarray(longitude, dtype=float)))
+    return np.column_stack([np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """Converts chord lengths on the unit sphere into great-circle distances
+    [km]"""
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0., 1.))
+
+
+class PortIndex(object):
+    """
+    PortIndex is a spatial index over the coordinates of a port database. It
+    answers queries for the k nearest ports to many sites at once, optionally
+    restricted to the ports satisfying a set of requirements.
+
+    Parameters
+    ----------
+    ports : DataFrame
+     Panda table containing the ports database
+    """
+
+    def __init__(self, ports):
+        self.ports = ports
+        self.latitude, self.longitude = port_coordinates(ports)
+        located = ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+        self.positions = np.flatnonzero(located)
+        self.points = unit_vectors(self.latitude[located],
+                                   self.longitude[located])
+        self.tree = cKDTree(self.points) if cKDTree is not None else None
+        self._masks = {}
+
+    def _feasible(self, requirements):
+        """Returns the boolean mask of the indexed ports satisfying the
+        requirements, memoized by requirement set"""
+        requirement = compile_requirements(requirements)
+        mask = self._masks.get(requirement)
+        if mask is None:
+            mask = requirement.mask(self.ports)[self.positions]
+            self._masks[requirement] = mask
+        return mask
+
+    def _query(self, points, k):
+        """Returns the chord lengths and indexed positions of the k nearest
+        indexed ports of each point, shape (nb_points, k)"""
+        if self.tree is not None:
+            chord, nearest = self.tree.query(points, k)
+            return chord.reshape(len(points), k), nearest.reshape(len(points), k)
+        chord = np.sqrt(((points[:, np.newaxis, :] -
+                          self.points[np.newaxis, :, :]) ** 2).sum(axis=2))
+        nearest = np.argsort(chord, axis=1, kind='mergesort')[:, :k]
+        rows = np.arange(len(points))[:, np.newaxis]
+        return chord[rows, nearest], nearest
+
+    def nearest(self, latitude, longitude, k=1, requirements=()):
+        """Returns the k nearest ports satisfying the requirements to each site
+
+        Parameters
+        ----------
+        latitude, longitude : float or array
+         coordinates [deg] of the sites
+        k : int
+         number of ports per site
+        requirements : list or Requirement
+         port requirements [[column, method, value], ...], all ports if empty
+
+        Returns
+        -------
+        distance : ndarray
+         great-circle distances [km] of shape (nb_sites, k), sorted per site,
+         inf where fewer than k ports are feasible
+        positions : ndarray
+         positions of the ports in the ports table, of shape (nb_sites, k),
+         -1 where fewer than k ports are feasible
+        """
+        points = unit_vectors(latitude, longitude)
+        nb_sites = len(points)
+        distance = np.full((nb_sites, k), np.inf)
+        positions = np.full((nb_sites, k), -1, dtype=np.intp)
+
+        feasible = self._feasible(requirements)
+        nb_feasible = int(feasible.sum())
+        if nb_feasible == 0 or nb_sites == 0:
+            return distance, positions
+        k_found = min(k, nb_feasible)
+
+        # query more neighbours until each site has k_found feasible ones
+        k_query = min(len(self.points), k)
+        pending = np.arange(nb_sites)
+        while len(pending):
+            chord, nearest = self._query(points[pending], k_query)
+            ok = feasible[nearest]
+            done = ok.sum(axis=1) >= k_found
+            # the first k_found feasible neighbours of the completed sites
+            keep = (ok & (np.cumsum(ok, axis=1) <= k_found))[done]
+            sites = pending[done]
+            distance[sites, :k_found] = \
+                chord_to_km(chord[done][keep]).reshape(-1, k_found)
+            positions[sites, :k_found] = \
+                self.positions[nearest[done][keep]].reshape(-1, k_found)
+            pending = pending[~done]
+            k_query = min(len(self.points), 2 * k_query)
+
+        return distance, positions
+
+
+# PortIndex of each port database, by id of the database object. The entries
+# hold a weak reference to the database object, whose callback drops them, and
+# the indexes refer to their own copy of the ports table so that they do not
+# keep the database object alive
+_indexes = {}
+
+
+def _drop_index(key, ref):
+    """Removes the entry of a port database that no longer exists"""
+    entry = _indexes.get(key)
+    if entry is not None and entry[0] is ref:
+        del _indexes[key]
+
+
+def port_index(port_data):
+    """Returns the PortIndex of a port database, built the first time it is
+    requested for this database
+
+    Parameters
+    ----------
+    port_data : DataFrame or SQLPorts
+     panda table or database table containing the ports database
+
+    Returns
+    -------
+    index : PortIndex
+     the spatial index of all the ports of the database
+    """
+    key = id(port_data)
+    entry = _indexes.get(key)
+    if entry is not None and entry[0]() is port_data:
+        return entry[1]
+    if isinstance(port_data, SQLPorts):
+        index = PortIndex(port_data.feasible([]))
+    else:
+        index = PortIndex(port_data.copy())
+    try:
+        ref = weakref.ref(port_data, lambda ref: _drop_index(key, ref))
+    except TypeError:
+        return index
+    _indexes[key] = (ref, index)
+    return index
@@ -8,11 +8,68 @@ and O&M logistic activities.
 
 BETA VERSION NOTES: This current version is limited to the feasibility functions 
 of two logistic phases (one for the installation module and one for the O&M), 
-this will be upgraded for the beta version due to october.
+this will be upgraded for the beta version due to october. The port data can be
+either a panda table or the SQLPorts object of the SQLite database of
+wp5.load.sql, in which case only the feasible ports are read. When the site
+coordinates are given, the nearest feasible port is selected with the spatial
+index of port_index, otherwise the first feasible port is kept.
 """
 
+from ..load.sql import SQLPorts
+from ..logistics import select_rows
+from .port_index import port_index
 
-def install_port(user_inputs, wp3_outputs, wp4_outputs, port_data):
+
+def feasible_ports(port_data, requirements):
+    """feasible_ports returns the ports satisfying a list of requirements
+    [[column, method, value], ...], pushing the requirements down to the
+    database when port_data is a SQLPorts object.
+
+    Parameters
+    ----------
+    port_data : DataFrame or SQLPorts
+     panda table or database table containing the ports database
+    requirements : list
+     list of port requirements
+
+    Returns
+    -------
+    port_list : DataFrame
+     panda table containing the feasible ports
+    """
+    if isinstance(port_data, SQLPorts):
+        return port_data.feasible(requirements)
+    return select_rows(port_data, requirements)
+
+
+def nearest_port(port_data, requirements, site):
+    """nearest_port returns the nearest port to the site satisfying a list of
+    requirements [[column, method, value], ...]
+
+    Parameters
+    ----------
+    port_data : DataFrame or SQLPorts
+     panda table or database table containing the ports database
+    requirements : list
+     list of port requirements
+    site : tuple
+     (latitude, longitude) of the project site [deg]
+
+    Returns
+    -------
+    port : Series
+     the nearest feasible port, None if no port is feasible
+    distance : float
+     great-circle distance [km] between the port and the site
+    """
+    index = port_index(port_data)
+    distance, positions = index.nearest(site[0], site[1], 1, requirements)
+    if positions[0, 0] < 0:
+        return None, float('inf')
+    return index.ports.iloc[positions[0, 0]], float(distance[0, 0])
+
+
+def install_port(user_inputs, wp3_outputs, wp4_outputs, port_data, site=None):
     """install_port function selects the home port used by all logistic phases
     during installation. This selection is based on a 2 step process: 
         1 - the port feasibility functions from all logistic phases are taken
@@ -28,8 +85,11 @@ def install_port(user_inputs, wp3_outputs, wp4_outputs, port_data):
      dictionnary containing all required inputs to WP5 coming from WP3
     wp4_outputs : DataFrame
      panda table containing all required inputs to WP5 coming from WP4
-    port_data : DataFrame
-     panda table containing the ports database     
+    port_data : DataFrame or SQLPorts
+     panda table or database table containing the ports database
+    site : tuple
+     (latitude, longitude) of the project site [deg], the first feasible port
+     is selected if None
 
     Returns
     -------
@@ -45,35 +105,36 @@ def install_port(user_inputs, wp3_outputs, wp4_outputs, port_data):
     # calculate loading and projeted area of foundations/anchors
     load = []
     area = []
-    if user_inputs['device']['technology type'].ix[0] == "seabed fixed":
-        for x in range(wp4_outputs['quantity'].ix[0]):
+    if user_inputs['device']['technology type'].iloc[0] == "seabed fixed":
+        for x in range(wp4_outputs['quantity'].iloc[0]):
             key1 = "diameter foundation " + str(x) + " [m]"
             key2 = "length foundation " + str(x) + " [m]"
             key3 = "weight foundation " + str(x) + " [kg]"
-            load[len(load):] = [wp4_outputs[key1].ix[0] * wp4_outputs[key2].ix[0] / wp4_outputs[key3].ix[0]]
-            area[len(area):] = [wp4_outputs[key1].ix[0] * wp4_outputs[key2].ix[0]]
+            load[len(load):] = [wp4_outputs[key1].iloc[0] * wp4_outputs[key2].iloc[0] / wp4_outputs[key3].iloc[0]]
+            area[len(area):] = [wp4_outputs[key1].iloc[0] * wp4_outputs[key2].iloc[0]]
     # terminal load bearing minimum requirement
-    port['Terminal Load Bearing [ton / m2]'] = max(user_inputs['device']['length [m]'].ix[0] * user_inputs['device']['width [m]'].ix[0] / user_inputs['device']['drymass [kg]'].ix[0],
-                                                   max(load))
-    port_list = port_data[port_data['Terminal Load Bearing [ton/m2]'] >= port['Terminal Load Bearing [ton/m2]']]
-    port['Terminal area [m2]'] = max(user_inputs['device']['length [m]'].ix[0] * user_inputs['device']['width [m]'].ix[0], sum(area))
-    port_list = port_list[port_list['Terminal area [m2]'] >= port['Terminal area [m2]']]
+    port['Terminal Load Bearing [ton/m2]'] = max(user_inputs['device']['length [m]'].iloc[0] * user_inputs['device']['width [m]'].iloc[0] / user_inputs['device']['drymass [kg]'].iloc[0],
+                                                 max(load))
+    port['Terminal area [m2]'] = max(user_inputs['device']['length [m]'].iloc[0] * user_inputs['device']['width [m]'].iloc[0], sum(area))
+    requirements = [['Terminal Load Bearing [ton/m2]', 'sup', port['Terminal Load Bearing [ton/m2]']],
+                    ['Terminal area [m2]', 'sup', port['Terminal area [m2]']]]
+    port_list = feasible_ports(port_data, requirements)
 
     port['Port list satisfying the minimum requirements'] = port_list
 
-    # Distance ports-site calculation
-    # to be implemented once the transit distance algorithm is available
-    # by making use of the grid coordinate position of the site and the ports
-
-    # Nearest port selection
-    # to be modified by making use of port['Distance port-site'] will be
-    # implemented
-
-    port['Selected base port for installation'] = port_list.ix[0]
+    # Nearest port selection, great-circle distance ports-site until the
+    # transit distance algorithm is available
+    if site is None:
+        port['Selected base port for installation'] = \
+            port_list.iloc[0] if len(port_list) else None
+    else:
+        nearest, distance = nearest_port(port_data, requirements, site)
+        port['Selected base port for installation'] = nearest
+        port['Distance port-site'] = distance
 
     return port
 
-def OM_port(wp6_outputs, port_data):
+def OM_port(wp6_outputs, port_data, site=None):
     """OM_port function selects the home port used by all logistic phases
     required by the O&M module. This selection is based on a 2 step process: 
         1 - the port feasibility functions from all logistic phases are taken
@@ -89,8 +150,11 @@ def OM_port(wp6_outputs, port_data):
      dictionnary containing all required inputs to WP5 coming from WP3
     wp4_outputs : DataFrame
      panda table containing all required inputs to WP5 coming from WP4
-    port_data : DataFrame
-     panda table containing the ports database     
+    port_data : DataFrame or SQLPorts
+     panda table or database table containing the ports database
+    site : tuple
+     (latitude, longitude) of the project site [deg], the first feasible port
+     is selected if None
 
     Returns
     -------
@@ -107,30 +171,31 @@ def OM_port(wp6_outputs, port_data):
     # Calculate loading and projeted area of Spare Parts
 
     # Input collection
-    lenght_SP = wp6_outputs['LogPhase1']['Length_SP [m]'].ix[0]
-    width_SP = wp6_outputs['LogPhase1']['Width_SP [m]'].ix[0]
-    height_SP = wp6_outputs['LogPhase1']['Height_SP [m]'].ix[0]
-    total_mass_SP = wp6_outputs['LogPhase1']['Total_Mass_SP [t]'].ix[0]
-    indiv_mass_SP = wp6_outputs['LogPhase1']['Indiv_Mass_SP [t]'].ix[0]
+    lenght_SP = wp6_outputs['LogPhase1']['Length_SP [m]'].iloc[0]
+    width_SP = wp6_outputs['LogPhase1']['Width_SP [m]'].iloc[0]
+    height_SP = wp6_outputs['LogPhase1']['Height_SP [m]'].iloc[0]
+    total_mass_SP = wp6_outputs['LogPhase1']['Total_Mass_SP [t]'].iloc[0]
+    indiv_mass_SP = wp6_outputs['LogPhase1']['Indiv_Mass_SP [t]'].iloc[0]
 
     # Feasibility functions
     SP_area = float(lenght_SP) * float(width_SP)
     SP_loading = float(total_mass_SP) / float(SP_area)
 
     # terminal load bearing minimum requirement
-    port_list = port_data[port_data['Terminal area [m2]'] >= SP_area]
-    port_list = port_list[port_list['Terminal Load Bearing [ton/m2]'] >= SP_loading]
+    requirements = [['Terminal area [m2]', 'sup', SP_area],
+                    ['Terminal Load Bearing [ton/m2]', 'sup', SP_loading]]
+    port_list = feasible_ports(port_data, requirements)
 
     port['Port list satisfying the minimum requirements'] = port_list
 
-    # Distance ports-site calculation
-    # to be implemented once the transit distance algorithm is available
-    # by making use of the grid coordinate position of the site and the ports
-
-    # Nearest port selection
-    # to be modified by making use of port['Distance port-site'] will be
-    # implemented
-
-    port['Selected base port for installation'] = port_list.ix[0]
+    # Nearest port selection, great-circle distance ports-site until the
+    # transit distance algorithm is available
+    if site is None:
+        port['Selected base port for installation'] = \
+            port_list.iloc[0] if len(port_list) else None
+    else:
+        nearest, distance = nearest_port(port_data, requirements, site)
+        port['Selected base port for installation'] = nearest
+        port['Distance port-site'] = distance
 
     return port
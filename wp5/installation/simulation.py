@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module simulates the full installation plan returned by install_plan,
+instead of assessing each logistic phase in isolation. The simulation is
+driven by a queue of time-stamped events (heapq), processed in chronological
+order:
+    - a logistic phase is ready once all the phases it depends on are
+      finished, the phases of the first layer of install_seq at the project
+      start
+    - a ready phase starts as soon as all its vessels are available, vessels
+      being used by a single phase at a time, the phases waiting for vessels
+      are served in the order they became ready
+    - a started phase goes through its preparation at port, then performs its
+      sea operation once per unit (e.g. per device or per foundation), each
+      one waiting for the earliest weather window long enough, so that the
+      phase is interrupted whenever the weather closes between two units
+    - a finished phase releases its vessels and makes its dependent phases
+      ready
+The result is the timeline of each phase and the Gantt data of all the
+activities of the project. schedule_plan runs the schedule step layer by
+layer: the phases of a layer are scheduled after the simulated end of the
+previous layers, whose timeline is kept in install['schedule'].
+
+BETA VERSION NOTES: the transits between port and site are part of the sea
+time of each unit, as computed by the schedule step. The time is given in
+hours from the first met-ocean record.
+"""
+
+import heapq
+import itertools
+import warnings
+
+import pandas as pd
+
+from ..performance.schedule.schedule import sched
+from ..performance.schedule.weather import default_window_cache
+
+# columns of the Gantt data
+GANTT_COLUMNS = ('phase', 'activity', 'unit', 'start', 'end', 'vessels')
+
+
+class PhaseTask(object):
+    """
+    PhaseTask describes the work of a logistic phase for the simulation.
+
+    Parameters
+    ----------
+    phase_id : str
+     id of the logistic phase in install_seq
+    sea_time : float
+     duration [h] of the sea operation of each unit
+    preparation : float
+     duration [h] of the preparation at port, once per phase
+    units : int
+     number of times the sea operation is performed
+    olc : dict
+     operational limit conditions of the sea operation
+    vessels : tuple
+     names of the vessels used by the phase
+    """
+
+    def __init__(self, phase_id, sea_time, preparation=0., units=1, olc=None,
+                 vessels=()):
+        self.phase_id = phase_id
+        self.sea_time = float(sea_time)
+        self.preparation = float(preparation)
+        self.units = int(units)
+        self.olc = dict(olc or {})
+        self.vessels = tuple(vessels)
+
+
+def phase_task(phase_id, solution, units=1):
+    """Returns the PhaseTask of a scheduled VE_solutions of a logistic phase,
+    performing its sea operations units times"""
+    sched = solution.schedule
+    vessels = tuple(solution.sol_ves[nr].name
+                    for nr in sorted(solution.sol_ves))
+    return PhaseTask(phase_id, sched['sea time'], sched['preparation'], units,
+                     sched['olc'], vessels)
+
+
+def best_solution(log_phase):
+    """Returns the scheduled VE_solutions of a logistic phase completing the
+    earliest (preparation, waiting and sea time), None if it has none"""
+    best = None
+    best_time = float('inf')
+    for seq in range(len(log_phase.op_ve)):
+        solutions = log_phase.op_ve[seq].sol
+        for sol in range(len(solutions)):
+            sched_sol = solutions[sol].schedule
+            total = (sched_sol['preparation'] + sched_sol['waiting time'] +
+                     sched_sol['sea time'])
+            if best is None or total < best_time:
+                best = solutions[sol]
+                best_time = total
+    return best
+
+
+def dependencies(install_seq):
+    """Returns the phases each logistic phase of install_seq depends on. The
+    entries of a layer are either phase ids, depending on all the phases of
+    the previous layer, or dicts {phase id: phase id or tuple of phase ids}
+    giving the dependencies explicitly.
+
+    Parameters
+    ----------
+    install_seq : dict
+     dictionnary containing the layers of the installation plan
+
+    Returns
+    -------
+    depends : dict
+     dictionnary mapping each phase id to the tuple of its dependencies
+    order : list
+     the phase ids in the order of install_seq
+    """
+    depends = {}
+    order = []
+    previous = ()
+    for layer in sorted(install_seq):
+        current = []
+        for entry in install_seq[layer]:
+            if isinstance(entry, dict):
+                for phase_id, requires in entry.items():
+                    if not isinstance(requires, (tuple, list)):
+                        requires = (requires,)
+                    depends[phase_id] = tuple(requires)
+                    order.append(phase_id)
+                    current.append(phase_id)
+            else:
+                depends[entry] = tuple(previous)
+                order.append(entry)
+                current.append(entry)
+        previous = current
+    return dict((phase_id, depends[phase_id]) for phase_id in order), order
+
+
+class InstallationSimulation(object):
+    """
+    InstallationSimulation runs the discrete-event simulation of an
+    installation plan.
+
+    Parameters
+    ----------
+    install_seq : dict
+     dictionnary containing the layers of the installation plan
+    tasks : dict
+     dictionnary mapping each phase id of install_seq to its PhaseTask
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    start : float
+     project start [h from the first met-ocean record]
+    window_cache : WindowCache or PersistenceSurface
+     source of the weather windows, default_window_cache if None
+    """
+
+    def __init__(self, install_seq, tasks, metocean, start=0.,
+                 window_cache=None):
+        self.depends, self.order = dependencies(install_seq)
+        missing = [phase_id for phase_id in self.order
+                   if phase_id not in tasks]
+        if missing:
+            raise ValueError("no task for the logistic phases %s" % missing)
+        unknown = [required for phase_id in self.order
+                   for required in self.depends[phase_id]
+                   if required not in self.depends]
+        if unknown:
+            raise ValueError("unknown logistic phases %s in install_seq"
+                             % unknown)
+        self.tasks = tasks
+        self.metocean = metocean
+        self.start = float(start)
+        if window_cache is None:
+            window_cache = default_window_cache
+        self.window_cache = window_cache
+
+    def run(self):
+        """Runs the simulation
+
+        Returns
+        -------
+        timeline : dict
+         dictionnary mapping each phase id to a dict with its 'ready time',
+         'start time', 'end time', 'waiting time' and 'sea time' [h], the
+         end time is inf if the phase could not be completed
+        gantt : DataFrame
+         Panda table with one row per activity ('preparation', 'waiting',
+         'operation') and the columns of GANTT_COLUMNS
+        """
+        counter = itertools.count()
+        events = []
+
+        def push(time, kind, phase_id):
+            """queues an event, simultaneous events are processed in the
+            order they were queued"""
+            heapq.heappush(events, (time, next(counter), kind, phase_id))
+
+        dependents = dict((phase_id, []) for phase_id in self.order)
+        remaining = {}
+        for phase_id in self.order:
+            remaining[phase_id] = len(self.depends[phase_id])
+            for required in self.depends[phase_id]:
+                dependents[required].append(phase_id)
+        indexes = {}
+        for phase_id in self.order:
+            task = self.tasks[phase_id]
+            ww = self.window_cache.windows(self.metocean, task.olc)
+            indexes[phase_id] = ww.index
+
+        timeline = dict((phase_id, {'ready time': float('inf'),
+                                    'start time': float('inf'),
+                                    'end time': float('inf'),
+                                    'waiting time': 0.,
+                                    'sea time': 0.})
+                        for phase_id in self.order)
+        gantt = []
+        busy = set()
+        queue = []
+        units_left = {}
+
+        for phase_id in self.order:
+            if not remaining[phase_id]:
+                push(self.start, 'ready', phase_id)
+
+        def allocate(time):
+            """starts the waiting phases whose vessels are all available"""
+            for phase_id in list(queue):
+                task = self.tasks[phase_id]
+                if busy.isdisjoint(task.vessels):
+                    queue.remove(phase_id)
+                    busy.update(task.vessels)
+                    timeline[phase_id]['start time'] = time
+                    units_left[phase_id] = task.units
+                    if task.preparation > 0:
+                        gantt.append((phase_id, 'preparation', None, time,
+                                      time + task.preparation, task.vessels))
+                    push(time + task.preparation, 'operate', phase_id)
+
+        def finish(time, phase_id, completed=True):
+            busy.difference_update(self.tasks[phase_id].vessels)
+            if not completed:
+                return
+            timeline[phase_id]['end time'] = time
+            for dependent in dependents[phase_id]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    push(time, 'ready', dependent)
+
+        while events:
+            time, _, kind, phase_id = heapq.heappop(events)
+            task = self.tasks[phase_id]
+            if kind == 'ready':
+                timeline[phase_id]['ready time'] = time
+                queue.append(phase_id)
+            elif kind == 'operate':
+                if not units_left[phase_id]:
+                    finish(time, phase_id)
+                else:
+                    unit = task.units - units_left[phase_id]
+                    begin = indexes[phase_id].earliest(time, task.sea_time)
+                    if begin == float('inf'):
+                        warnings.warn("no weather window for the logistic "
+                                      "phase %s" % phase_id)
+                        finish(time, phase_id, completed=False)
+                    else:
+                        if begin > time:
+                            gantt.append((phase_id, 'waiting', unit, time,
+                                          begin, task.vessels))
+                            timeline[phase_id]['waiting time'] += begin - time
+                        end = begin + task.sea_time
+                        gantt.append((phase_id, 'operation', unit, begin, end,
+                                      task.vessels))
+                        timeline[phase_id]['sea time'] += task.sea_time
+                        units_left[phase_id] -= 1
+                        push(end, 'operate', phase_id)
+            allocate(time)
+
+        return timeline, pd.DataFrame(gantt, columns=GANTT_COLUMNS)
+
+
+def simulate(install_seq, tasks, metocean, start=0., window_cache=None,
+             install=None):
+    """simulate runs the discrete-event simulation of an installation plan,
+    see InstallationSimulation
+
+    Parameters
+    ----------
+    install_seq : dict
+     dictionnary containing the layers of the installation plan
+    tasks : dict
+     dictionnary mapping each phase id of install_seq to its PhaseTask
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    start : float
+     project start [h from the first met-ocean record]
+    window_cache : WindowCache or PersistenceSurface
+     source of the weather windows, default_window_cache if None
+    install : dict
+     if given, the timeline is stored in install['schedule']
+
+    Returns
+    -------
+    timeline : dict
+     dictionnary with the timeline of each phase
+    gantt : DataFrame
+     Panda table with the Gantt data of the project
+    """
+    simulation = InstallationSimulation(install_seq, tasks, metocean, start,
+                                        window_cache)
+    timeline, gantt = simulation.run()
+    if install is not None:
+        install['schedule'] = timeline
+    return timeline, gantt
+
+
+def schedule_plan(install_seq, install, log_phases, user_inputs, wp2_outputs,
+                  wp3_outputs, wp4_outputs, units=None, window_cache=None,
+                  **kwargs):
+    """schedule_plan schedules the logistic phases of an installation plan
+    layer by layer. The solutions of the phases of each layer are scheduled
+    by sched, the fastest solution of each phase is kept and the layers
+    scheduled so far are simulated, the timeline being stored in
+    install['schedule'] for the next layer.
+
+    Parameters
+    ----------
+    install_seq : dict
+     dictionnary containing the layers of the installation plan
+    install : dict
+     among other data contains the selected port
+    log_phases : dict
+     dictionnary mapping each phase id of install_seq to its logistic phase,
+     after the selection and match steps
+    user_inputs, wp2_outputs, wp3_outputs, wp4_outputs : dict
+     upstream data, see sched
+    units : dict
+     number of units installed by each logistic phase, 1 if missing
+    window_cache : WindowCache or PersistenceSurface
+     source of the weather windows, default_window_cache if None
+    kwargs :
+     other arguments of sched (site, routing, duration_model, executor)
+
+    Returns
+    -------
+    log_phases : dict
+     the scheduled logistic phases
+    timeline : dict
+     dictionnary with the timeline of each phase
+    gantt : DataFrame
+     Panda table with the Gantt data of the project
+    """
+    if units is None:
+        units = {}
+    start = user_inputs['device']['Project starting date [-]'].iloc[0]
+    install['schedule'] = {}
+    scheduled_seq = {}
+    tasks = {}
+    timeline, gantt = {}, pd.DataFrame([], columns=GANTT_COLUMNS)
+    for x, layer in enumerate(sorted(install_seq)):
+        scheduled_seq[layer] = install_seq[layer]
+        _, order = dependencies({layer: install_seq[layer]})
+        for phase_id in order:
+            log_phases[phase_id] = sched(x, install, log_phases[phase_id],
+                                         user_inputs, wp2_outputs,
+                                         wp3_outputs, wp4_outputs,
+                                         window_cache=window_cache, **kwargs)
+            solution = best_solution(log_phases[phase_id])
+            if solution is None:
+                raise ValueError("no solution for the logistic phase %s"
+                                 % phase_id)
+            tasks[phase_id] = phase_task(phase_id, solution,
+                                         units.get(phase_id, 1))
+        timeline, gantt = simulate(scheduled_seq, tasks,
+                                   user_inputs['metocean'], start,
+                                   window_cache, install)
+    return log_phases, timeline, gantt
@@ -8,14 +8,30 @@ imported is translated to panda dataframes.
 
 BETA VERSION NOTES: the module also aims to provide a buffer between the database
 source and WP5 package, so it becomes simple to shift from the temporary .xlsx
-and .csv files to the final SQL solution.
+and .csv files to the final SQL solution. The workbooks are read through the
+on-disk cache of wp5.load.cache, which only parses them again when they change.
 """
 
-import pandas as pd
-
-from ..logistics import VesselType
+from .cache import CachedExcelFile
+from ..logistics import VesselCatalogue
 from ..logistics import EquipmentType
 
+# Vessel types always available in the vessel catalogue, mapped to the name
+# used in the 'Vessel type' column of the vessel database
+VESSEL_ALIASES = {'Tugboat': 'Tugboat',
+                  'Crane Barge': 'Crane Barge',
+                  'Crane Vessel': 'Crane Vessel',
+                  'JUP Barge': 'JUP Barge',
+                  'JUP Vessel': 'JUP Vessel',
+                  'Anchor Handling': 'AHTS',
+                  'Multicat': 'Multicat',
+                  'CLV': 'CLV',
+                  'CLB': 'CLB',
+                  'CTV': 'CTV',
+                  'Dive Support Vessel': 'Dive Support Vessel',
+                  'Cable Repair Vessel': 'Cable Repair Vessel'
+                  }
+
 def load_vessel_data(file_path):
     """Imports vessel database into panda dataframe and creates a class for each
     vessel type
@@ -27,29 +43,18 @@ def load_vessel_data(file_path):
 
     Returns
     -------
-    vessels : dict
-     dictionnary containing all classes defining the different vessel types
+    vessels : VesselCatalogue
+     dictionnary-like catalogue of the classes defining the different vessel
+     types, including any type found in the 'Vessel type' column
     """
     # Transform vessel database .xls into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     pd_vessel = excel.parse('Python_Format', header=0, index_col=0)
-    # Splits the pd_vessel object with the full dataset, into smaller panda
-    # objects with specific vessel types. Each vessel object is initiated with
-    # the vessel class: VesselType
-    vessels = {'Tugboat': VesselType("Tugboat", pd_vessel[pd_vessel['Vessel type'] == 'Tugboat']),
-               'Crane Barge': VesselType("Crane Barge", pd_vessel[pd_vessel['Vessel type'] == 'Crane Barge']),
-               'Crane Vessel': VesselType("Crane Vessel", pd_vessel[pd_vessel['Vessel type'] == 'Crane Vessel']),
-               'JUP Barge': VesselType("JUP Barge", pd_vessel[pd_vessel['Vessel type'] == 'JUP Barge']),
-               'JUP Vessel': VesselType("JUP Vessel", pd_vessel[pd_vessel['Vessel type'] == 'JUP Vessel']),
-               'Anchor Handling': VesselType("AHTS", pd_vessel[pd_vessel['Vessel type'] == 'AHTS']),
-               'Multicat': VesselType("Multicat", pd_vessel[pd_vessel['Vessel type'] == 'Multicat']),
-               'CLV': VesselType("CLV", pd_vessel[pd_vessel['Vessel type'] == 'CLV']),
-               'CLB': VesselType("CLB", pd_vessel[pd_vessel['Vessel type'] == 'CLB']),
-               'CTV': VesselType("CTV", pd_vessel[pd_vessel['Vessel type'] == 'CTV']),
-               'Dive Support Vessel': VesselType("Dive Support Vessel", pd_vessel[pd_vessel['Vessel type'] == 'Dive Support Vessel']),
-               'Cable Repair Vessel': VesselType("Cable Repair Vessel", pd_vessel[pd_vessel['Vessel type'] == 'Cable Repair Vessel'])
-               }
+    # Partitions the pd_vessel object with the full dataset by vessel type in a
+    # single pass. Each vessel type is initiated with the vessel class
+    # VesselType only once a logistic phase requests it
+    vessels = VesselCatalogue(pd_vessel, VESSEL_ALIASES)
 
     return vessels
 
@@ -70,7 +75,7 @@ def load_equipment_data(file_path):
     """
 
     # Transform Equipment database .xls into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     hammer = excel.parse('hammer', header=0, index_col=0)
     drillingRig = excel.parse('drill rig', header=0, index_col=0)
@@ -96,7 +101,7 @@ def load_port_data(file_path):
      dictionnary containing a panda dataframe with all ports
     """
     # Transform vessel database .xls into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     ports = excel.parse('python', header=0, index_col=0)
 
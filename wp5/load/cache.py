@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module provides a transparent on-disk cache for the .xlsx and .csv files
+imported by the load functions. Each parsed sheet is stored column by column in
+an uncompressed numpy archive, so a warm load skips the Excel parser entirely.
+Cache entries are keyed by the absolute path, size, modification time and
+content hash of the source file and are rebuilt only when the source changes.
+
+BETA VERSION NOTES: the cache directory defaults to ~/.cache/wp5 and can be
+moved with the WP5_CACHE_DIR environment variable or set_cache_dir().
+"""
+
+import errno
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.environ.get('WP5_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'wp5'))
+
+_MANIFEST_EXT = '.json'
+_ENTRY_EXT = '.npz'
+# key of the archive member listing the object arrays stored as JSON text
+_OBJECTS_KEY = '__objects__'
+
+
+def set_cache_dir(path):
+    """Sets the default directory used to store the cached tables
+
+    Parameters
+    ----------
+    path : string
+     the folder path of the cache
+    """
+    global CACHE_DIR
+    CACHE_DIR = path
+
+
+def _cache_dir(cache_dir):
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    try:
+        os.makedirs(cache_dir)
+    except OSError as error:
+        # another process may have created the folder in the meantime
+        if error.errno != errno.EEXIST or not os.path.isdir(cache_dir):
+            raise
+    return cache_dir
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _content_hash(file_path, block_size=1 << 20):
+    sha = hashlib.sha1()
+    with open(file_path, 'rb') as source:
+        block = source.read(block_size)
+        while block:
+            sha.update(block)
+            block = source.read(block_size)
+    return sha.hexdigest()
+
+
+def _replace(src, dst):
+    # os.replace is atomic on every platform but does not exist in python 2
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def _write_atomic(path, write, mode='w'):
+    """Calls write(file) on a temporary file of the folder of path, then
+    moves it to path. The temporary file name is unique, so that concurrent
+    writers never write to the same file and readers only see complete
+    files."""
+    handle, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + '.', suffix='.tmp',
+        dir=os.path.dirname(path) or os.curdir)
+    try:
+        with os.fdopen(handle, mode) as tmp_file:
+            write(tmp_file)
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            return json.load(manifest_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_manifest(manifest_path, manifest):
+    _write_atomic(manifest_path,
+                  lambda manifest_file: json.dump(manifest, manifest_file,
+                                                  indent=1, sort_keys=True))
+
+
+def _encode_value(value):
+    """Converts the values of an object array that JSON does not support"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("cannot cache values of type %s" % type(value).__name__)
+
+
+def _decode_value(obj):
+    if '__datetime__' in obj:
+        return pd.Timestamp(obj['__datetime__'])
+    return obj
+
+
+def _pack(array):
+    """Returns an array np.save can store without pickle, object arrays
+    being serialized as JSON text"""
+    array = np.asarray(array)
+    if array.dtype != object:
+        return array, False
+    text = json.dumps(array.tolist(), default=_encode_value)
+    return np.frombuffer(text.encode('utf-8'), dtype=np.uint8), True
+
+
+def _unpack(array, is_object):
+    """Rebuilds an array stored by _pack"""
+    if not is_object:
+        return array
+    values = json.loads(array.tobytes().decode('utf-8'),
+                        object_hook=_decode_value)
+    unpacked = np.empty(len(values), dtype=object)
+    unpacked[:] = values
+    return unpacked
+
+
+def _save_frame(frame, entry_path):
+    """Stores a dataframe column by column into an uncompressed .npz archive,
+    without pickle"""
+    arrays = OrderedDict()
+    arrays['__columns__'] = np.array(list(frame.columns), dtype=object)
+    arrays['__index__'] = np.asarray(frame.index.values)
+    arrays['__index_name__'] = np.array([frame.index.name], dtype=object)
+    for nr_col in range(frame.shape[1]):
+        arrays['c%d' % nr_col] = np.asarray(frame.iloc[:, nr_col].values)
+    objects = []
+    for key in list(arrays):
+        arrays[key], is_object = _pack(arrays[key])
+        if is_object:
+            objects.append(key)
+    arrays[_OBJECTS_KEY] = np.array(objects, dtype=str)
+    _write_atomic(entry_path,
+                  lambda entry_file: np.savez(entry_file, **arrays), 'wb')
+
+
+def _load_frame(entry_path):
+    """Rebuilds the dataframe stored by _save_frame"""
+    with np.load(entry_path, allow_pickle=False) as archive:
+        objects = set(archive[_OBJECTS_KEY].tolist())
+
+        def member(key):
+            return _unpack(archive[key], key in objects)
+
+        columns = list(member('__columns__'))
+        index = pd.Index(member('__index__'),
+                         name=member('__index_name__')[0])
+        data = OrderedDict((nr_col, member('c%d' % nr_col))
+                           for nr_col in range(len(columns)))
+    frame = pd.DataFrame(data, index=index)
+    frame.columns = columns
+    return frame
+
+
+class CachedSource(object):
+    """
+    CachedSource validates one source file against its cache manifest and
+    gives access to the cached tables extracted from it.
+
+    """
+
+    def __init__(self, file_path, cache_dir=None):
+        self.file_path = os.path.abspath(file_path)
+        self.cache_dir = _cache_dir(cache_dir)
+        self.key = _digest(self.file_path)
+        self.manifest_path = os.path.join(self.cache_dir,
+                                          self.key + _MANIFEST_EXT)
+        self.manifest = None
+
+    def validate(self):
+        """Checks the source file against the manifest. The content hash is
+        only recomputed when the size or the modification time changed, and
+        the cached tables are dropped only if the content really changed."""
+        stat = os.stat(self.file_path)
+        manifest = _read_manifest(self.manifest_path)
+        if (manifest is not None and manifest['size'] == stat.st_size and
+                manifest['mtime'] == stat.st_mtime):
+            self.manifest = manifest
+            return self.manifest
+
+        content_hash = _content_hash(self.file_path)
+        if manifest is None or manifest['hash'] != content_hash:
+            if manifest is not None:
+                self._remove_entries(manifest)
+            manifest = {'path': self.file_path,
+                        'hash': content_hash,
+                        'entries': {}}
+        manifest['size'] = stat.st_size
+        manifest['mtime'] = stat.st_mtime
+        _write_manifest(self.manifest_path, manifest)
+        self.manifest = manifest
+        return self.manifest
+
+    def _remove_entries(self, manifest):
+        for entry_file in manifest['entries'].values():
+            entry_path = os.path.join(self.cache_dir, entry_file)
+            if os.path.exists(entry_path):
+                os.remove(entry_path)
+
+    def load(self, entry_key, parser):
+        """Returns the table cached under entry_key, calling parser() and
+        storing its result on a cache miss"""
+        if self.manifest is None:
+            self.validate()
+        entry_file = self.manifest['entries'].get(entry_key)
+        if entry_file is not None:
+            entry_path = os.path.join(self.cache_dir, entry_file)
+            if os.path.exists(entry_path):
+                try:
+                    return _load_frame(entry_path)
+                except (KeyError, ValueError):
+                    # entry written by a previous version of the cache, with
+                    # pickled object arrays
+                    pass
+
+        frame = parser()
+        entry_file = '%s-%s-%s%s' % (self.key[:16],
+                                     self.manifest['hash'][:16],
+                                     _digest(entry_key)[:16],
+                                     _ENTRY_EXT)
+        _save_frame(frame, os.path.join(self.cache_dir, entry_file))
+        self.manifest['entries'][entry_key] = entry_file
+        _write_manifest(self.manifest_path, self.manifest)
+        return frame
+
+
+def _entry_key(kind, name, kwargs):
+    return '%s:%s:%s' % (kind, name, sorted(kwargs.items()))
+
+
+class CachedExcelFile(object):
+    """
+    CachedExcelFile is a drop-in replacement of pd.ExcelFile for the load
+    functions. The workbook is only opened by pandas if one of the requested
+    sheets is missing from the cache.
+
+    """
+
+    def __init__(self, file_path, cache_dir=None):
+        self.file_path = file_path
+        self.source = CachedSource(file_path, cache_dir)
+        self._excel = None
+
+    def _parse_excel(self, sheet_name, kwargs):
+        if self._excel is None:
+            self._excel = pd.ExcelFile(self.file_path)
+        return self._excel.parse(sheet_name, **kwargs)
+
+    def parse(self, sheet_name, **kwargs):
+        """Returns the sheet as a panda dataframe, see pd.ExcelFile.parse"""
+        return self.source.load(_entry_key('xlsx', sheet_name, kwargs),
+                                lambda: self._parse_excel(sheet_name, kwargs))
+
+
+def read_csv(file_path, cache_dir=None, **kwargs):
+    """Cached equivalent of pd.read_csv
+
+    Parameters
+    ----------
+    file_path : string
+     the folder path of the .csv file
+    cache_dir : string
+     the folder path of the cache, CACHE_DIR by default
+
+    Returns
+    -------
+    frame : DataFrame
+     panda table containing the .csv data
+    """
+    source = CachedSource(file_path, cache_dir)
+    return source.load(_entry_key('csv', '', kwargs),
+                       lambda: pd.read_csv(file_path, **kwargs))
+
+
+def cache_status(cache_dir=None):
+    """Lists the source files currently held in the cache
+
+    Parameters
+    ----------
+    cache_dir : string
+     the folder path of the cache, CACHE_DIR by default
+
+    Returns
+    -------
+    status : DataFrame
+     panda table with one row per cached source file, the number of cached
+     tables, the disk usage and whether the source changed or disappeared
+    """
+    cache_dir = _cache_dir(cache_dir)
+    rows = []
+    for manifest_file in sorted(os.listdir(cache_dir)):
+        if not manifest_file.endswith(_MANIFEST_EXT):
+            continue
+        manifest = _read_manifest(os.path.join(cache_dir, manifest_file))
+        if manifest is None:
+            continue
+        size = 0
+        for entry_file in manifest['entries'].values():
+            entry_path = os.path.join(cache_dir, entry_file)
+            if os.path.exists(entry_path):
+                size += os.path.getsize(entry_path)
+        path = manifest['path']
+        if not os.path.exists(path):
+            state = 'missing'
+        else:
+            stat = os.stat(path)
+            if (stat.st_size == manifest['size'] and
+                    stat.st_mtime == manifest['mtime']):
+                state = 'valid'
+            else:
+                state = 'stale'
+        rows.append({'source': path,
+                     'tables': len(manifest['entries']),
+                     'size [bytes]': size,
+                     'status': state})
+    return pd.DataFrame(rows, columns=['source', 'tables', 'size [bytes]',
+                                       'status'])
+
+
+def clear_cache(cache_dir=None, stale_only=False):
+    """Deletes cached tables
+
+    Parameters
+    ----------
+    cache_dir : string
+     the folder path of the cache, CACHE_DIR by default
+    stale_only : bool
+     if True, only the entries whose source file changed or disappeared are
+     removed
+
+    Returns
+    -------
+    removed : int
+     number of files deleted from the cache directory
+    """
+    cache_dir = _cache_dir(cache_dir)
+    status = cache_status(cache_dir)
+    if stale_only:
+        sources = status['source'][status['status'] != 'valid']
+    else:
+        sources = status['source']
+    removed = 0
+    for path in sources:
+        manifest_path = os.path.join(cache_dir, _digest(path) + _MANIFEST_EXT)
+        manifest = _read_manifest(manifest_path)
+        if manifest is None:
+            # removed or corrupted since cache_status read it
+            continue
+        for entry_file in manifest['entries'].values():
+            entry_path = os.path.join(cache_dir, entry_file)
+            if os.path.exists(entry_path):
+                os.remove(entry_path)
+                removed += 1
+        os.remove(manifest_path)
+        removed += 1
+    return removed
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module reads gridded met-ocean hindcasts, i.e. time series over a
+latitude/longitude grid, and extracts the time series of given project sites
+for the schedule functions. The hindcast is stored in a local folder:
+    meta.json      variables, time chunks and grid description
+    latitude.npy   latitudes [deg] of the grid rows, ascending
+    longitude.npy  longitudes [deg] of the grid columns, ascending
+    hours.npy      epoch-hour axis (hours since 1970-01-01, int64)
+    valid.npy      boolean (lat, lon) mask of the grid points with data
+    <variable>.<k>.npy  float32 array (lat, lon, time) of the k-th time chunk
+Within each chunk the series of a grid point is contiguous, so extracting a
+site only reads the series of its nearest grid point, or of the four grid
+points around it for bilinear interpolation, from the memory-mapped chunks.
+Directions (variables ending with 'Dir') are interpolated through their
+vector components.
+
+The extracted series are saved as MetoceanStore folders in the 'sites'
+subfolder of the hindcast and kept in memory, so further requests for the
+same site, e.g. when comparing sites or screening O&M ports, neither read
+the grid again nor build a new store.
+
+BETA VERSION NOTES: the grid points without data (e.g. land) are skipped,
+the nearest grid point with data is used and the bilinear weights are
+normalized over the corners with data at each time step. Hindcasts in other
+formats (netCDF, GRIB) have to be converted with build_hindcast beforehand.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import cache
+from .metocean import MetoceanStore
+
+# length of the time chunks written by build_hindcast [records]
+CHUNK_LENGTH = 8760
+
+
+def build_hindcast(path, latitude, longitude, hours, data,
+                   chunk_length=CHUNK_LENGTH):
+    """Writes a gridded hindcast in the folder path, replacing any previous
+    hindcast and its extracted sites
+
+    Parameters
+    ----------
+    path : string
+     the folder path of the hindcast
+    latitude, longitude : array
+     ascending latitudes and longitudes [deg] of the grid
+    hours : array
+     epoch-hour of each time step
+    data : dict
+     dictionnary mapping each variable name to a float array of shape
+     (len(latitude), len(longitude), len(hours)), NaN where there is no data
+    chunk_length : int
+     number of time steps per chunk
+
+    Returns
+    -------
+    hindcast : GriddedHindcast
+     the memory-mapped hindcast
+    """
+    _hindcasts.pop(os.path.abspath(path), None)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    hours = np.asarray(hours, dtype=np.int64)
+    variables = sorted(data)
+    np.save(os.path.join(path, 'latitude.npy'),
+            np.asarray(latitude, dtype=float))
+    np.save(os.path.join(path, 'longitude.npy'),
+            np.asarray(longitude, dtype=float))
+    np.save(os.path.join(path, 'hours.npy'), hours)
+
+    valid = np.zeros((len(latitude), len(longitude)), dtype=bool)
+    chunks = []
+    for first in range(0, len(hours), chunk_length):
+        last = min(first + chunk_length, len(hours))
+        chunks.append([first, last])
+        nr_chunk = len(chunks) - 1
+        for name in variables:
+            values = np.asarray(data[name][:, :, first:last], dtype=np.float32)
+            valid |= ~np.isnan(values).all(axis=2)
+            np.save(os.path.join(path, '%s.%d.npy' % (name, nr_chunk)),
+                    np.ascontiguousarray(values))
+    np.save(os.path.join(path, 'valid.npy'), valid)
+
+    meta = {'variables': variables, 'chunks': chunks}
+    with open(os.path.join(path, 'meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=1, sort_keys=True)
+    return GriddedHindcast(path)
+
+
+class GriddedHindcast(object):
+    """
+    GriddedHindcast gives access to the memory-mapped chunks of a gridded
+    hindcast written by build_hindcast.
+
+    Parameters
+    ----------
+    path : string
+     the folder path of the hindcast
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+        self.variables = tuple(meta['variables'])
+        self.chunks = [tuple(chunk) for chunk in meta['chunks']]
+        self.latitude = np.load(os.path.join(path, 'latitude.npy'))
+        self.longitude = np.load(os.path.join(path, 'longitude.npy'))
+        self.hours = np.load(os.path.join(path, 'hours.npy'), mmap_mode='r')
+        self.valid = np.load(os.path.join(path, 'valid.npy'))
+        self._sites = {}
+
+    def chunk(self, name, nr_chunk):
+        """Returns the memory-mapped array (lat, lon, time) of a time chunk of
+        a variable"""
+        chunk_path = os.path.join(self.path, '%s.%d.npy' % (name, nr_chunk))
+        return np.load(chunk_path, mmap_mode='r')
+
+    def nearest_point(self, latitude, longitude):
+        """Returns the (row, column) of the grid point with data nearest to a
+        site, None if the grid has no data"""
+        rows, cols = np.nonzero(self.valid)
+        if not len(rows):
+            return None
+        # squared distances on a local equirectangular projection
+        scale = np.cos(np.radians(latitude))
+        dist = (self.latitude[rows] - latitude) ** 2 + \
+            ((self.longitude[cols] - longitude) * scale) ** 2
+        nearest = int(np.argmin(dist))
+        return int(rows[nearest]), int(cols[nearest])
+
+    def weights(self, latitude, longitude, method='bilinear'):
+        """Returns the grid points and weights used to interpolate the series
+        of a site
+
+        Parameters
+        ----------
+        latitude, longitude : float
+         coordinates [deg] of the site
+        method : str
+         'nearest' for the nearest grid point with data, 'bilinear' for the
+         bilinear interpolation between the four surrounding grid points
+
+        Returns
+        -------
+        points : list
+         list of ((row, column), weight)
+        """
+        if method == 'nearest':
+            point = self.nearest_point(latitude, longitude)
+            return [] if point is None else [(point, 1.)]
+        if method != 'bilinear':
+            raise ValueError("unknown interpolation method '%s'" % method)
+        points = []
+        axes = ((self.latitude, latitude), (self.longitude, longitude))
+        bounds = []
+        for axis, value in axes:
+            if len(axis) == 1 or value <= axis[0] or value >= axis[-1]:
+                # outside the grid along this axis, nearest row or column
+                nr = 0 if len(axis) == 1 or value <= axis[0] else len(axis) - 1
+                bounds.append(((nr, 1.),))
+                continue
+            upper = int(np.searchsorted(axis, value, side='right'))
+            ratio = (value - axis[upper - 1]) / (axis[upper] - axis[upper - 1])
+            bounds.append(((upper - 1, 1. - ratio), (upper, ratio)))
+        for row, row_weight in bounds[0]:
+            for col, col_weight in bounds[1]:
+                weight = row_weight * col_weight
+                if weight > 0 and self.valid[row, col]:
+                    points.append(((row, col), weight))
+        if not points:
+            # no corner with data, e.g. a site along the coast
+            return self.weights(latitude, longitude, 'nearest')
+        return points
+
+    def extract(self, latitude, longitude, method='bilinear'):
+        """Extracts the time series of a site from the grid
+
+        Parameters
+        ----------
+        latitude, longitude : float
+         coordinates [deg] of the site
+        method : str
+         'nearest' or 'bilinear', see weights
+
+        Returns
+        -------
+        data : ndarray
+         float32 array of shape (variables, time steps)
+        """
+        points = self.weights(latitude, longitude, method)
+        data = np.full((len(self.variables), len(self.hours)), np.nan,
+                       dtype=np.float32)
+        if not points:
+            return data
+        for nr_chunk, (first, last) in enumerate(self.chunks):
+            for nr_var, name in enumerate(self.variables):
+                grid = self.chunk(name, nr_chunk)
+                series = np.array([grid[row, col] for (row, col), _ in points],
+                                  dtype=float)
+                weight = np.array([w for _, w in points])[:, np.newaxis]
+                weight = np.where(np.isnan(series), 0., weight)
+                total = weight.sum(axis=0)
+                with np.errstate(invalid='ignore'):
+                    if name.endswith('Dir'):
+                        angle = np.radians(series)
+                        east = np.nansum(weight * np.sin(angle), axis=0)
+                        north = np.nansum(weight * np.cos(angle), axis=0)
+                        values = np.degrees(np.arctan2(east, north)) % 360.
+                        values[total == 0] = np.nan
+                    else:
+                        values = np.nansum(weight * series, axis=0) / total
+                data[nr_var, first:last] = values
+        return data
+
+    @staticmethod
+    def _install(tmp_path, path):
+        """Moves an extracted site folder to path, keeping the site already
+        installed there by another extractor if any"""
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            if os.path.exists(os.path.join(path, 'meta.json')):
+                return
+            # folder left incomplete by a previous version, without meta.json
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp_path, path)
+
+    def site(self, latitude, longitude, method='bilinear'):
+        """Returns the MetoceanStore of the time series of a site, extracted
+        on the first request and cached on disk and in memory
+
+        Parameters
+        ----------
+        latitude, longitude : float
+         coordinates [deg] of the site
+        method : str
+         'nearest' or 'bilinear', see weights
+
+        Returns
+        -------
+        store : MetoceanStore
+         the memory-mapped store of the site
+        """
+        key = '%.4f,%.4f,%s' % (latitude, longitude, method)
+        store = self._sites.get(key)
+        if store is not None:
+            return store
+        path = os.path.join(self.path, 'sites', cache._digest(key)[:16])
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            data = self.extract(latitude, longitude, method)
+            # unique temporary folder, concurrent extractors never share it
+            sites = cache._cache_dir(os.path.dirname(path))
+            tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp', dir=sites)
+            try:
+                np.save(os.path.join(tmp_path, 'hours.npy'),
+                        np.asarray(self.hours))
+                np.save(os.path.join(tmp_path, 'data.npy'), data)
+                meta = {'source': os.path.abspath(self.path),
+                        'latitude': latitude,
+                        'longitude': longitude,
+                        'method': method,
+                        'variables': list(self.variables)}
+                with open(os.path.join(tmp_path, 'meta.json'),
+                          'w') as meta_file:
+                    json.dump(meta, meta_file, indent=1, sort_keys=True)
+                self._install(tmp_path, path)
+            finally:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        store = MetoceanStore.open(path)
+        self._sites[key] = store
+        return store
+
+
+_hindcasts = {}
+
+
+def open_hindcast(path):
+    """Returns the GriddedHindcast of a folder, opened once per folder so its
+    extracted sites stay cached in memory"""
+    path = os.path.abspath(path)
+    hindcast = _hindcasts.get(path)
+    if hindcast is None:
+        hindcast = GriddedHindcast(path)
+        _hindcasts[path] = hindcast
+    return hindcast
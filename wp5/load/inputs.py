@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module loads all the inputs required to run WP5 package concurrently. The
+three databases and the five upstream data sets are independent from each
+other, they are read by a pool of threads (or processes) and the time taken
+by each source is reported along with the loaded data.
+
+BETA VERSION NOTES: the thread pool is the default, as most of the loading time
+is spent in file I/O and in the numpy/pandas parsers. The process pool needs to
+pickle the results back to the main process.
+"""
+
+import time
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from . import load_vessel_data, load_equipment_data, load_port_data
+from .wp_bom import load_WP1_BoM, load_WP2_BoM
+from .wp_bom import load_WP3_BoM, load_WP4_BoM
+from .wp_bom import load_WP6_BoM
+
+
+def _timed_load(name, func, args):
+    start = time.time()
+    result = func(*args)
+    return name, result, time.time() - start
+
+
+def load_all(sources, workers=None, pool='thread'):
+    """Loads a set of independent sources in parallel
+
+    Parameters
+    ----------
+    sources : dict
+     dictionnary mapping the name of each source to a tuple (func, args), the
+     source is loaded by calling func(*args)
+    workers : int
+     number of workers of the pool, by default one per source
+    pool : str
+     'thread' to load the sources in a thread pool, 'process' to load them
+     in a process pool
+
+    Returns
+    -------
+    results : dict
+     dictionnary mapping the name of each source to the loaded data
+    timings : dict
+     dictionnary mapping the name of each source to its loading time [s]
+    """
+    if workers is None:
+        workers = len(sources)
+    if pool == 'thread':
+        executor = ThreadPool(workers)
+    elif pool == 'process':
+        executor = Pool(workers)
+    else:
+        raise ValueError("unknown pool type '%s'" % pool)
+
+    try:
+        jobs = [executor.apply_async(_timed_load, (name, func, args))
+                for name, (func, args) in sources.items()]
+        results = {}
+        timings = {}
+        for job in jobs:
+            name, result, elapsed = job.get()
+            results[name] = result
+            timings[name] = elapsed
+    finally:
+        executor.close()
+        executor.join()
+
+    return results, timings
+
+
+def load_inputs(vessel_file, equipment_file, port_file, wp1_file,
+                metocean_file, wp2_file, wp3_file, wp4_file, wp6_file,
+                workers=None, pool='thread'):
+    """Loads the WP5 databases and the upstream data sets in parallel
+
+    Parameters
+    ----------
+    vessel_file, equipment_file, port_file : string
+     the folder paths of the vessel, equipment and port databases
+    wp1_file, metocean_file : string
+     the folder paths of the device and metocean WP1 data sets
+    wp2_file, wp3_file, wp4_file, wp6_file : string
+     the folder paths of the WP2, WP3, WP4 and WP6 data sets
+    workers : int
+     number of workers of the pool, by default one per source
+    pool : str
+     'thread' or 'process', see load_all
+
+    Returns
+    -------
+    inputs : dict
+     dictionnary containing the vessels, equipments, ports, user_inputs,
+     wp2_outputs, wp3_outputs, wp4_outputs and wp6_outputs structures as
+     returned by the individual load functions, and the loading time [s] of
+     each of them under the key 'timings'
+    """
+    sources = {'vessels': (load_vessel_data, (vessel_file,)),
+               'equipments': (load_equipment_data, (equipment_file,)),
+               'ports': (load_port_data, (port_file,)),
+               'user_inputs': (load_WP1_BoM, (wp1_file, metocean_file)),
+               'wp2_outputs': (load_WP2_BoM, (wp2_file,)),
+               'wp3_outputs': (load_WP3_BoM, (wp3_file,)),
+               'wp4_outputs': (load_WP4_BoM, (wp4_file,)),
+               'wp6_outputs': (load_WP6_BoM, (wp6_file,))
+               }
+
+    inputs, timings = load_all(sources, workers, pool)
+    inputs['timings'] = timings
+
+    return inputs
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module imports the met-ocean time series used by the schedule functions.
+The .csv hindcast is converted once into a binary store made of an epoch-hour
+time axis (hours since 1970-01-01, int64) and one contiguous float32 array per
+met-ocean variable. The store is memory-mapped when opened, so decades of
+hourly data for many sites can be used without loading them into RAM.
+
+BETA VERSION NOTES: the schedule functions still expect the panda table
+previously returned by pd.read_csv, MetoceanFrame provides that interface on
+top of the store.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from . import cache
+
+VARIABLES = ('windSpeed', 'windDir', 'waveHs', 'waveDir')
+CALENDAR = ('year', 'month', 'day', 'hour')
+
+_EPOCH = np.datetime64('1970-01-01T00', 'h')
+
+
+def epoch_hours(year, month, day, hour):
+    """Converts calendar columns into hours since 1970-01-01 00:00
+
+    Parameters
+    ----------
+    year, month, day, hour : array-like
+     calendar date of each met-ocean record
+
+    Returns
+    -------
+    hours : ndarray
+     int64 array containing the epoch-hour of each record
+    """
+    dates = pd.to_datetime(pd.DataFrame({'year': np.asarray(year),
+                                         'month': np.asarray(month),
+                                         'day': np.asarray(day),
+                                         'hour': np.asarray(hour)}))
+    return (dates.values.astype('datetime64[h]') - _EPOCH).astype(np.int64)
+
+
+class MetoceanStore(object):
+    """
+    MetoceanStore holds a met-ocean time series as an int64 epoch-hour axis
+    (hours) and a float32 array of shape (variables, time steps) (data), whose
+    rows are the contiguous time series of each variable. Both arrays may be
+    memory-mapped. The stores read from disk keep the folder (path) and the
+    content hash of the source of the data (content_hash).
+
+    """
+
+    def __init__(self, hours, data, variables=VARIABLES, path=None,
+                 content_hash=None):
+        self.hours = hours
+        self.data = data
+        self.variables = tuple(variables)
+        self.path = path
+        self.content_hash = content_hash
+
+    @classmethod
+    def open(cls, path):
+        """Memory-maps the store previously written in the folder path"""
+        with open(os.path.join(path, 'meta.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+        hours = np.load(os.path.join(path, 'hours.npy'), mmap_mode='r')
+        data_path = os.path.join(path, 'data.npy')
+        data = np.load(data_path, mmap_mode='r')
+        content_hash = meta.get('hash')
+        if content_hash is None:
+            # stores without source file, e.g. the sites of a hindcast, are
+            # identified by their data file
+            stat = os.stat(data_path)
+            content_hash = '%d:%r' % (stat.st_size, stat.st_mtime)
+        return cls(hours, data, meta['variables'], path, content_hash)
+
+    def __len__(self):
+        return len(self.hours)
+
+    def __getitem__(self, name):
+        return self.data[self.variables.index(name)]
+
+    @property
+    def time_step(self):
+        """time step of the series in hours"""
+        return int(self.hours[1] - self.hours[0])
+
+    def calendar(self):
+        """Returns a dict with the year, month, day and hour of each record"""
+        dates = pd.DatetimeIndex(np.asarray(self.hours).astype('datetime64[h]'))
+        return {'year': np.asarray(dates.year),
+                'month': np.asarray(dates.month),
+                'day': np.asarray(dates.day),
+                'hour': np.asarray(dates.hour)}
+
+    def between(self, start, end):
+        """Returns a view of the store restricted to start <= hours < end,
+        both given in epoch-hours"""
+        first, last = np.searchsorted(self.hours, [start, end])
+        return MetoceanStore(self.hours[first:last], self.data[:, first:last],
+                             self.variables, self.path, self.content_hash)
+
+
+def _count_records(file_path):
+    with open(file_path, 'rb') as source:
+        lines = sum(block.count(b'\n')
+                    for block in iter(lambda: source.read(1 << 20), b''))
+        source.seek(-1, os.SEEK_END)
+        if source.read(1) != b'\n':
+            lines += 1
+    return lines - 1
+
+
+def _write_meta(path, meta):
+    cache._write_atomic(os.path.join(path, 'meta.json'),
+                        lambda meta_file: json.dump(meta, meta_file, indent=1,
+                                                    sort_keys=True))
+
+
+def build_store(file_path, path, chunksize=100000):
+    """Converts a met-ocean .csv file with the columns year, month, day, hour,
+    windSpeed, windDir, waveHs and waveDir into a store. The file is read by
+    chunks and written directly into the memory-mapped arrays of a temporary
+    folder, which then replaces the folder path, so that a store is never
+    seen half written.
+
+    Parameters
+    ----------
+    file_path : string
+     the folder path of the met-ocean .csv file
+    path : string
+     the folder path where the store is written
+
+    Returns
+    -------
+    store : MetoceanStore
+     the memory-mapped store
+    """
+    path = os.path.abspath(path)
+    parent = cache._cache_dir(os.path.dirname(path))
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path) + '.',
+                                suffix='.tmp', dir=parent)
+    try:
+        nb_records = _count_records(file_path)
+        hours = np.lib.format.open_memmap(os.path.join(tmp_path, 'hours.npy'),
+                                          mode='w+', dtype=np.int64,
+                                          shape=(nb_records,))
+        data = np.lib.format.open_memmap(os.path.join(tmp_path, 'data.npy'),
+                                         mode='w+', dtype=np.float32,
+                                         shape=(len(VARIABLES), nb_records))
+        first = 0
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            last = first + len(chunk)
+            hours[first:last] = epoch_hours(*[chunk[col]
+                                              for col in CALENDAR])
+            for nr_var, var in enumerate(VARIABLES):
+                data[nr_var, first:last] = chunk[var].values
+            first = last
+        hours.flush()
+        data.flush()
+        del hours, data
+
+        stat = os.stat(file_path)
+        meta = {'source': os.path.abspath(file_path),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'hash': cache._content_hash(file_path),
+                'variables': list(VARIABLES)}
+        _write_meta(tmp_path, meta)
+
+        # a folder cannot be renamed over another one, the previous store is
+        # moved aside first, then deleted with its derived files
+        old_path = None
+        if os.path.exists(path):
+            old_path = tempfile.mkdtemp(prefix=os.path.basename(path) + '.',
+                                        suffix='.old', dir=parent)
+            os.rmdir(old_path)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
+    return MetoceanStore.open(path)
+
+
+def open_metocean(file_path, path=None):
+    """Opens the store built from a met-ocean .csv file, building it first if
+    it does not exist yet or if the .csv file changed since.
+
+    Parameters
+    ----------
+    file_path : string
+     the folder path of the met-ocean .csv file
+    path : string
+     the folder path of the store, by default a folder of the WP5 cache
+     directory derived from file_path
+
+    Returns
+    -------
+    store : MetoceanStore
+     the memory-mapped store
+    """
+    if path is None:
+        path = os.path.join(cache.CACHE_DIR, 'metocean',
+                            cache._digest(os.path.abspath(file_path)))
+    meta_path = os.path.join(path, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as meta_file:
+            meta = json.load(meta_file)
+        stat = os.stat(file_path)
+        if meta['size'] == stat.st_size and meta['mtime'] == stat.st_mtime:
+            return MetoceanStore.open(path)
+        if meta['hash'] == cache._content_hash(file_path):
+            # same content, e.g. the file was copied or touched: the new size
+            # and modification time are recorded so the file is not hashed
+            # again on the next call
+            meta['size'] = stat.st_size
+            meta['mtime'] = stat.st_mtime
+            _write_meta(path, meta)
+            return MetoceanStore.open(path)
+    return build_store(file_path, path)
+
+
+class MetoceanFrame(object):
+    """
+    MetoceanFrame is a thin adapter giving a MetoceanStore the interface of
+    the panda table previously read from the met-ocean .csv file. Columns are
+    returned as panda series wrapping the store arrays, the calendar columns
+    (year, month, day, hour) are derived from the epoch-hour axis on demand.
+
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._calendar = None
+
+    @property
+    def columns(self):
+        return list(CALENDAR) + list(self.store.variables)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, name):
+        if name in self.store.variables:
+            values = self.store[name]
+        elif name in CALENDAR:
+            if self._calendar is None:
+                self._calendar = self.store.calendar()
+            values = self._calendar[name]
+        else:
+            raise KeyError(name)
+        return pd.Series(values, name=name, copy=False)
+
+    def __getattr__(self, name):
+        store = self.__dict__.get('store')
+        if store is not None and (name in CALENDAR or name in store.variables):
+            return self[name]
+        raise AttributeError(name)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module provides a local SQLite backend for the vessel, equipment and port
+databases. The numeric columns used by the feasibility functions are indexed,
+and the requirements computed by the feasibility functions are translated into
+WHERE clauses, so only the feasible rows are read from the database. The
+columns holding mostly numbers are stored as numbers, their text entries
+(e.g. 'All', 'n/a') as NULL.
+
+BETA VERSION NOTES: the database is built from the temporary .xlsx files with
+import_databases(), the same tables could be filled from the final DTOcean
+database server.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from . import load_vessel_data, load_equipment_data, load_port_data
+from . import VESSEL_ALIASES
+from ..logistics import VesselType, EquipmentType
+from ..selection.requirement import Requirement, compile_requirements
+
+INDEX_LABEL = '__index__'
+
+# Requirement columns indexed in each table
+VESSEL_INDEXES = ['Deck loading [ton/m2]',
+                  'Deck space [m2]',
+                  'Crane weight [t]']
+EQUIPMENT_INDEXES = ['Sleeve diameter [m]']
+PORT_INDEXES = ['Terminal area [m2]',
+                'Terminal Load Bearing [ton/m2]']
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def where_clause(requirements):
+    """Translates requirements [[column, method, value], ...] or Requirement
+    objects into the condition of a WHERE clause
+
+    Parameters
+    ----------
+    requirements : list or Requirement
+     requirements computed by the feasibility functions
+
+    Returns
+    -------
+    clause : str
+     SQL condition with one placeholder per value, '1' if empty
+    params : list
+     values of the placeholders
+    """
+    if not isinstance(requirements, Requirement) and not requirements:
+        return '1', []
+    return compile_requirements(requirements).sql()
+
+
+def _numeric_columns(panda):
+    """Returns the object columns of a panda table holding mostly numbers,
+    e.g. numeric columns with a few comments such as 'n/a' or 'All'"""
+    columns = []
+    for column in panda.columns:
+        if panda[column].dtype != object:
+            continue
+        nb_values = panda[column].notnull().sum()
+        numbers = pd.to_numeric(panda[column], errors='coerce')
+        nb_numbers = numbers.notnull().sum()
+        if nb_numbers and 2 * nb_numbers >= nb_values:
+            columns.append(column)
+    return columns
+
+
+def _write_table(conn, table, panda, indexes, prefix=()):
+    # numeric columns are stored as numbers, the comments they hold becoming
+    # NULL, so that SQLite compares them as the numpy requirements do
+    panda = panda.copy()
+    for column in set(_numeric_columns(panda)).union(indexes):
+        if column in panda.columns:
+            panda[column] = pd.to_numeric(panda[column], errors='coerce')
+    panda.to_sql(table, conn, if_exists='replace', index=True,
+                 index_label=INDEX_LABEL)
+    for column in indexes:
+        if column not in panda.columns:
+            continue
+        columns = list(prefix) + [column]
+        conn.execute('CREATE INDEX %s ON %s (%s)'
+                     % (_quote('ix_%s_%s' % (table, column)), _quote(table),
+                        ', '.join(_quote(col) for col in columns)))
+    conn.execute('INSERT INTO wp5_tables VALUES (?, ?)',
+                 (table, panda.index.name))
+
+
+def import_databases(db_path, vessel_file, equipment_file, port_file):
+    """Imports the vessel, equipment and port workbooks into a SQLite database
+
+    Parameters
+    ----------
+    db_path : string
+     the folder path of the SQLite database, replaced if it exists
+    vessel_file : string
+     the folder path of the vessel database
+    equipment_file : string
+     the folder path of the equipment database
+    port_file : string
+     the folder path of the port database
+
+    Returns
+    -------
+    database : WP5Database
+     the imported database
+    """
+    vessels = load_vessel_data(vessel_file)
+    equipments = load_equipment_data(equipment_file)
+    ports = load_port_data(port_file)
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute('DROP TABLE IF EXISTS wp5_tables')
+        conn.execute('DROP TABLE IF EXISTS wp5_equipments')
+        conn.execute('CREATE TABLE wp5_tables (name TEXT, index_name TEXT)')
+        conn.execute('CREATE TABLE wp5_equipments (name TEXT, '
+                     'table_name TEXT)')
+        _write_table(conn, 'vessels', vessels.panda, VESSEL_INDEXES,
+                     prefix=['Vessel type'])
+        for nr_eq, name in enumerate(sorted(equipments)):
+            table = 'equipment_%d' % nr_eq
+            _write_table(conn, table, equipments[name].panda,
+                         EQUIPMENT_INDEXES)
+            conn.execute('INSERT INTO wp5_equipments VALUES (?, ?)',
+                         (name, table))
+        _write_table(conn, 'ports', ports, PORT_INDEXES)
+    conn.close()
+    return WP5Database(db_path)
+
+
+class WP5Database(object):
+    """
+    WP5Database gives access to a SQLite database written by import_databases.
+    Vessel and equipment types, as well as the ports, query the database with
+    the feasibility requirements instead of filtering full panda tables.
+
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+
+    def query(self, table, requirements=(), extra=None, extra_params=()):
+        """Returns the rows of table satisfying the requirements"""
+        clause, params = where_clause(requirements)
+        if extra is not None:
+            clause = '%s AND %s' % (extra, clause)
+            params = list(extra_params) + params
+        # rows are returned in the order of the source workbook
+        panda = pd.read_sql_query('SELECT * FROM %s WHERE %s ORDER BY rowid'
+                                  % (_quote(table), clause),
+                                  self.conn, params=params,
+                                  index_col=INDEX_LABEL)
+        index_name = self.conn.execute('SELECT index_name FROM wp5_tables '
+                                       'WHERE name = ?', (table,)).fetchone()
+        panda.index.name = index_name[0]
+        return panda
+
+    def query_labels(self, table, requirements=(), extra=None,
+                     extra_params=()):
+        """Returns the index labels of the rows of table satisfying the
+        requirements"""
+        clause, params = where_clause(requirements)
+        if extra is not None:
+            clause = '%s AND %s' % (extra, clause)
+            params = list(extra_params) + params
+        rows = self.conn.execute('SELECT %s FROM %s WHERE %s ORDER BY rowid'
+                                 % (_quote(INDEX_LABEL), _quote(table), clause),
+                                 params)
+        return [label for (label,) in rows]
+
+    def vessel_types(self, aliases=VESSEL_ALIASES):
+        """Returns a dict with one SQLVesselType per vessel type of the
+        database, plus the aliased keys of load_vessel_data"""
+        rows = self.conn.execute('SELECT DISTINCT "Vessel type" FROM vessels '
+                                 'WHERE "Vessel type" IS NOT NULL')
+        vessels = dict((name, SQLVesselType(name, self)) for (name,) in rows)
+        for key, name in aliases.items():
+            vessels[key] = vessels.get(name, SQLVesselType(name, self))
+        return vessels
+
+    def equipment_types(self):
+        """Returns a dict with one SQLEquipmentType per equipment type"""
+        rows = self.conn.execute('SELECT name, table_name FROM wp5_equipments')
+        return dict((name, SQLEquipmentType(name, self, table))
+                    for name, table in rows)
+
+    def ports(self):
+        """Returns the SQLPorts object of the port table"""
+        return SQLPorts(self)
+
+
+def _positions(panda, labels):
+    """Returns the positions of index labels in a panda table, skipping the
+    labels added to the database after the table was read"""
+    positions = panda.index.get_indexer(labels)
+    return positions[positions >= 0]
+
+
+class SQLVesselType(VesselType):
+    """
+    SQLVesselType is a VesselType whose panda table is read from a WP5Database
+    the first time it is needed, and whose feasible vessels are queried from
+    the database.
+
+    """
+
+    def __init__(self, id, database):
+        self.id = id
+        self.database = database
+        self._panda = None
+        self.invalidate()
+
+    @property
+    def panda(self):
+        if self._panda is None:
+            self._panda = self.feasible([])
+        return self._panda
+
+    @panda.setter
+    def panda(self, panda):
+        self._panda = panda
+        self.invalidate()
+
+    def feasible_positions(self, requirements):
+        """Returns the positions in panda of the vessels satisfying the
+        requirements, only their index labels are read from the database"""
+        labels = self.database.query_labels('vessels', requirements,
+                                            '"Vessel type" = ?', [self.id])
+        return _positions(self.panda, labels)
+
+    def feasible(self, requirements):
+        """Returns the vessels of this type satisfying the requirements"""
+        return self.database.query('vessels', requirements,
+                                   '"Vessel type" = ?', [self.id])
+
+
+class SQLEquipmentType(EquipmentType):
+    """
+    SQLEquipmentType is an EquipmentType whose panda table is read from a
+    WP5Database the first time it is needed, and whose feasible equipments are
+    queried from the database.
+
+    """
+
+    def __init__(self, id, database, table):
+        self.id = id
+        self.database = database
+        self.table = table
+        self._panda = None
+        self.invalidate()
+
+    @property
+    def panda(self):
+        if self._panda is None:
+            self._panda = self.feasible([])
+        return self._panda
+
+    @panda.setter
+    def panda(self, panda):
+        self._panda = panda
+        self.invalidate()
+
+    def feasible_positions(self, requirements):
+        """Returns the positions in panda of the equipments satisfying the
+        requirements, only their index labels are read from the database"""
+        labels = self.database.query_labels(self.table, requirements)
+        return _positions(self.panda, labels)
+
+    def feasible(self, requirements):
+        """Returns the equipments of this type satisfying the requirements"""
+        return self.database.query(self.table, requirements)
+
+
+class SQLPorts(object):
+    """
+    SQLPorts gives access to the port table of a WP5Database.
+
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def feasible(self, requirements):
+        """Returns the ports satisfying the requirements"""
+        return self.database.query('ports', requirements)
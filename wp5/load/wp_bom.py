@@ -9,10 +9,12 @@ panda dataframes.
 
 BETA VERSION NOTES: the module also aims to provide a buffer between the
 database source and WP5 package, so it becomes simple to shift from
-the temporary .xlsx and .csv files to the final SQL solution.
+the temporary .xlsx and .csv files to the final SQL solution. The files are
+read through the on-disk cache of wp5.load.cache.
 """
 
-import pandas as pd
+from .cache import CachedExcelFile, read_csv
+from .metocean import open_metocean, MetoceanFrame
 
 def load_WP1_BoM(file_path_device, file_path_metocean):
     """Imports WP1 data set into panda dataframes.
@@ -30,8 +32,9 @@ def load_WP1_BoM(file_path_device, file_path_metocean):
      dictionnary containing all required inputs to WP5 coming from WP1/end-user
     """
     # Transform the .xls database into panda type
-    excel = pd.ExcelFile(file_path_device)
-    metocean = pd.read_csv(file_path_metocean)
+    excel = CachedExcelFile(file_path_device)
+    # Open the memory-mapped met-ocean store, built once from the .csv file
+    metocean = MetoceanFrame(open_metocean(file_path_metocean))
     # Collect data from a particular .xls tab
     device = excel.parse('device', header=0, index_col=0)
     # Splits the different dataset through different dict keys()
@@ -56,7 +59,7 @@ def load_WP2_BoM(file_path):
      dictionnary containing all required inputs to WP5 coming from WP2
     """
     # Transform the .xls database into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     units = excel.parse('units', header=0, index_col=0)
     position = excel.parse('position', header=0, index_col=0)
@@ -82,7 +85,7 @@ def load_WP3_BoM(file_path):
      dictionnary containing all required inputs to WP5 coming from WP3
     """
     # Transform the .xls database into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     layout = excel.parse('Sheet1', header=0, index_col=0)
     # Splits the different dataset through different dict keys()
@@ -106,7 +109,7 @@ def load_WP4_BoM(file_path):
      Dataframe containing all required inputs to WP5 coming from WP4
     """
     # Transform the .csv database into panda type
-    WP4_BoM = pd.read_csv(file_path)
+    WP4_BoM = read_csv(file_path)
 
     return WP4_BoM
 
@@ -125,7 +128,7 @@ def load_WP6_BoM(file_path):
      Dataframe containing all required inputs to WP5 coming from WP6
     """
     # Transform the .xls database into panda type
-    excel = pd.ExcelFile(file_path)
+    excel = CachedExcelFile(file_path)
     # Collect data from a particular tab
     wp6inputs = excel.parse('Sheet1', header=0, index_col=0)
     # Splits the different dataset through different dict keys()
@@ -1,6 +1,81 @@
-class VesselType(object):
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import itertools
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from ..selection.requirement import compile_requirements
+
+# version numbers given to the panda tables of the vessel and equipment types
+_versions = itertools.count()
+
+
+def select_rows(panda, requirements):
+    """Returns the rows of a panda table satisfying a list of requirements
+    [[column, method, value], ...] as produced by the feasibility functions.
+    The requirements are compiled into a single mask and the selected rows are
+    copied once into the returned table.
     """
-    VesselType.py is a
+    return panda.iloc[compile_requirements(requirements).positions(panda)]
+
+
+def _checksum(values):
+    """Returns a checksum of the values of a column, used to detect the
+    columns modified in place"""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = pd.util.hash_array(values.ravel())
+    return values.shape, zlib.crc32(np.ascontiguousarray(values).tobytes())
+
+
+class SortedIndex(object):
+    """
+    SortedIndex keeps the non-missing values of one numeric column sorted,
+    together with their positions in the table, so that threshold queries are
+    answered by binary search.
+
+    """
+
+    def __init__(self, values):
+        values = pd.to_numeric(pd.Series(values), errors='coerce').values
+        positions = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[positions], kind='mergesort')
+        self.values = values[positions][order]
+        self.positions = positions[order]
+
+    def sup(self, value):
+        """positions of the rows with value <= column"""
+        return self.positions[np.searchsorted(self.values, value, 'left'):]
+
+    def inf(self, value):
+        """positions of the rows with column <= value"""
+        return self.positions[:np.searchsorted(self.values, value, 'right')]
+
+    def range(self, low, high):
+        """positions of the rows with low <= column <= high"""
+        first = np.searchsorted(self.values, low, 'left')
+        last = np.searchsorted(self.values, high, 'right')
+        return self.positions[first:max(first, last)]
+
+    def eq(self, value):
+        """positions of the rows with column == value"""
+        return self.range(value, value)
+
+
+class LogisticType(object):
+    """
+    LogisticType is the base class of the vessel and equipment types, holding
+    the panda table of all the vessels or equipments of that type. Sorted
+    indexes of the requirement columns are built the first time a column is
+    queried and kept until the panda table is replaced or invalidate() is
+    called. A checksum of each queried column is taken as well, so that a
+    column modified in place is detected by validate() the next time it is
+    queried.
 
     """
 
@@ -8,13 +83,124 @@ class VesselType(object):
         self.id = id
         self.panda = panda
 
+    @property
+    def panda(self):
+        return self._panda
+
+    @panda.setter
+    def panda(self, panda):
+        self._panda = panda
+        self.invalidate()
+
+    def invalidate(self):
+        """Drops the sorted indexes and gives the panda table a new version
+        number"""
+        self._indexes = {}
+        self._checksums = {}
+        self.version = next(_versions)
 
-class EquipmentType(object):
+    def validate(self, columns):
+        """Checks the columns against their checksums taken when they were
+        last queried, calling invalidate() if one of them was modified in
+        place, and returns the version number of the panda table"""
+        checksums = dict((column, _checksum(self.panda[column].values))
+                         for column in columns)
+        if any(self._checksums.get(column, checksum) != checksum
+               for column, checksum in checksums.items()):
+            self.invalidate()
+        self._checksums.update(checksums)
+        return self.version
+
+    def sorted_index(self, column):
+        """Returns the SortedIndex of a column, building it if needed"""
+        index = self._indexes.get(column)
+        if index is None:
+            index = SortedIndex(self.panda[column].values)
+            self._indexes[column] = index
+        return index
+
+    def feasible_positions(self, requirements):
+        """Returns the sorted positions of the rows of panda satisfying the
+        requirements"""
+        requirement = compile_requirements(requirements)
+        self.validate(requirement.columns())
+        return requirement.indexed_positions(self)
+
+    def feasible(self, requirements):
+        """Returns a copy of the rows of panda satisfying the requirements,
+        feasible_positions avoids the copy"""
+        return self.panda.iloc[self.feasible_positions(requirements)]
+
+
+class VesselType(LogisticType):
+    """
+    VesselType.py is a
+
+    """
+
+
+class EquipmentType(LogisticType):
     """
     EquipmentType.py is a
 
     """
-    def __init__(self, id, panda):
-        self.id = id
+
+
+class VesselCatalogue(Mapping):
+    """
+    VesselCatalogue partitions the vessel database by 'Vessel type' in a single
+    grouping pass and keeps, for each type, the positions of its rows in the
+    full table. The VesselType of a given type is only built the first time it
+    is requested, e.g. when a logistic phase references it, and holds a copy
+    of the rows of that type (pandas cannot view scattered rows).
+    The catalogue iterates over the vessel types, each one once; the aliased
+    keys are only used to look vessel types up.
+
+    Parameters
+    ----------
+    panda : DataFrame
+     Panda table containing the vessel database
+    aliases : dict
+     dictionnary mapping catalogue keys to the name of a vessel type. Aliased
+     keys are always available, as an empty VesselType if the vessel type does
+     not appear in the database
+    type_column : str
+     name of the column containing the vessel type
+    """
+
+    def __init__(self, panda, aliases=None, type_column='Vessel type'):
         self.panda = panda
+        self.aliases = dict(aliases or {})
+        self.partitions = panda.groupby(type_column, sort=False).indices
+        # vessel types available, in the order of the aliases then of the
+        # database
+        self.type_names = []
+        for name in itertools.chain(self.aliases.values(), self.partitions):
+            if name not in self.type_names:
+                self.type_names.append(name)
+        self._types = {}
+
+    def _type_name(self, key):
+        return self.aliases.get(key, key)
+
+    def __getitem__(self, key):
+        type_name = self._type_name(key)
+        if type_name not in self._types:
+            positions = self.partitions.get(type_name)
+            if positions is None:
+                if type_name not in self.type_names:
+                    raise KeyError(key)
+                positions = np.empty(0, dtype=np.intp)
+            self._types[type_name] = VesselType(type_name,
+                                                self.panda.iloc[positions])
+        return self._types[type_name]
+
+    def __iter__(self):
+        return iter(self.type_names)
+
+    def __len__(self):
+        return len(self.type_names)
 
+    def materialized(self):
+        """Returns the names of the vessel types already built"""
+        return list(self._types)
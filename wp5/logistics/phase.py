@@ -8,6 +8,12 @@ are responsible to initialize and characterize the logistic phases both of the
 installation and O&M modules. The functions return a class of each logistic phase
 characterized in terms of operations sequence and vessel & equipment combination.
 
+The LogPhase objects returned by the init functions are templates: the
+selection step works on a clone, which shares the operation sequences and
+vessel & equipment combinations of its template and only records the pruned
+combinations, the filtered views and the solutions of one evaluation. The same
+template can thus be evaluated any number of times, also concurrently.
+
 BETA VERSION NOTES: In this version, only two logistic phases were characterized,
 one related to Moorings and Foundation Installation: Driven Pile, and another
 related to Operation and Maintenance: Offshore Inspection.
@@ -20,6 +26,7 @@ class LogPhase(object):
         self.id = id
         self.description = description
         self.op_ve = {}
+        self.template = None
 #        self.feasibility = feasiblity
 #        self.matching = matching
 #        self.v&e&p_selected = {}
@@ -29,6 +36,17 @@ class LogPhase(object):
 #        self.environmental = environment
 #        self.risk = risk
 
+    def clone(self):
+        """Returns a copy of the logistic phase for one evaluation. The
+        operation sequences and the vessel & equipment combinations are
+        shared with the template until the evaluation replaces or deletes
+        them"""
+        phase = LogPhase(self.id, self.description)
+        phase.op_ve = dict((seq, op_ve.clone())
+                           for seq, op_ve in self.op_ve.items())
+        phase.template = self if self.template is None else self.template
+        return phase
+
 
 class DefPhase(object):
 
@@ -39,6 +57,15 @@ class DefPhase(object):
         self.ve_combination = {}
         self.sol = {}
 
+    def clone(self):
+        """Returns a copy sharing the operation sequence and the vessel &
+        equipment combinations, with its own combination dict and no
+        solutions"""
+        op_ve = DefPhase(self.id, self.description)
+        op_ve.op_sequence = self.op_sequence
+        op_ve.ve_combination = dict(self.ve_combination)
+        return op_ve
+
 
 class VE_solutions(object):
 
@@ -48,6 +75,9 @@ class VE_solutions(object):
         self.sol_eq = {}
         self.schedule = {}
         self.cost = {}
+        self.combination = None
+        self.lower_bound = None
+        self.day_rate = None
 
 
 def logPhase_install_init(logOp, vessels, equipments):
@@ -394,7 +424,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_OM6],
+                                                    logOp["op_OM6"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -426,7 +456,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_OM7],
+                                                    logOp["op_OM7"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -445,7 +475,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_OM8],
+                                                    logOp["op_OM8"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -471,7 +501,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT1],
+                                                    logOp["op_RT1"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -501,7 +531,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT2],
+                                                    logOp["op_RT2"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -532,7 +562,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT3],
+                                                    logOp["op_RT3"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -558,7 +588,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT4],
+                                                    logOp["op_RT4"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -584,7 +614,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT5],
+                                                    logOp["op_RT5"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
@@ -616,7 +646,7 @@ def logPhase_OM_init(logOp, vessels, equipments):
                                                     logOp["op2"],
                                                     logOp["op3"],
                                                     logOp["op4"],
-                                                    logOp["op_RT6],
+                                                    logOp["op_RT6"],
                                                     logOp["op7"],
                                                     logOp["op8"]]
                                                     
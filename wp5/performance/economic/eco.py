@@ -13,21 +13,56 @@ and port in the next version of the code.
 """
 
 import numpy
-def cost(install, log_phase):
-    for seq in range(len(log_phase.op_ve)):
+
+from ..ranking import rank_solutions
+
+
+def vessel_hourly_cost(solution):
+    """Returns the hourly cost [€/hour] of the vessels of a solution, the mean
+    of the minimum and maximum operational day rates of its first vessel"""
+    op_cost_max = solution.sol_ves[0]['Op max Day Rate']
+    op_cost_min = solution.sol_ves[0]['Op min Day Rate']
+    return numpy.mean([op_cost_max, op_cost_min])/24
+
+
+def cost(install, log_phase, mode='pareto', k=10, objective='total cost'):
+    """cost function calculates the cost of each scheduled solution of the
+    logistic phase and ranks the solutions, see rank_solutions
+
+    Parameters
+    ----------
+    install : dict
+     not used
+    log_phase : class
+     class of the logistic phase under consideration for assessment, with the
+     schedule of each solution
+    mode : str
+     'pareto' to keep the non-dominated solutions, 'topk' to keep the k best
+     solutions on the objective
+    k : int
+     number of solutions kept in 'topk' mode
+    objective : str
+     objective the solutions are ranked by
+
+    Returns
+    -------
+    ranking : DataFrame
+     Panda table with the ranked solutions and their total cost, total
+     duration and waiting time
+    log_phase : class
+     An updated version of the log_phase argument with the cost of each
+     solution
+    """
+    for seq in log_phase.op_ve:
 #
-        for sol in range(len(log_phase.op_ve[seq].sol)):
+        for sol in log_phase.op_ve[seq].sol:
             sched = log_phase.op_ve[seq].sol[sol].schedule
             dur_sea_wait = sched['sea time'] + sched['waiting time']
-            op_cost_max = log_phase.op_ve[seq].sol[sol].sol_ves[0]['Op max Day Rate']
-            op_cost_min = log_phase.op_ve[seq].sol[sol].sol_ves[0]['Op min Day Rate']
-            vessel_cost = numpy.mean([op_cost_max, op_cost_min])/24  #  [€/hour]
+            vessel_cost = vessel_hourly_cost(log_phase.op_ve[seq].sol[sol])  #  [€/hour]
             log_phase.op_ve[seq].sol[sol].cost = {'vessel': vessel_cost*dur_sea_wait,
                                                   'equipment': 0,
                                                   'port cost': 0}
 
-    sol = {}
-    sol[0] = log_phase.op_ve[0].sol[0].cost
-    sol[1] = log_phase.op_ve[0].sol[1].cost
+    ranking = rank_solutions(log_phase, mode, k, objective)
 
-    return sol, log_phase
\ No newline at end of file
+    return ranking, log_phase
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module evaluates the solutions of a logistic phase in a pool of worker
+processes. Each (sequence, solution) pair is submitted as a compact
+SolutionTask (operational limits, preparation and sea time, starting time,
+hourly cost) and comes back as a SolutionRecord with its waiting time and
+vessel cost; the weather windows are computed and cached in each worker.
+
+The met-ocean data are published once to the workers, never pickled with the
+tasks:
+    - a met-ocean store on disk is memory-mapped again by each worker, the
+      operating system sharing the pages between processes
+    - other met-ocean data sets are copied once into shared memory blocks,
+      which the workers map without copy
+Without shared memory (Python < 3.8) the arrays are sent once to each worker
+when it starts.
+
+BETA VERSION NOTES: the records are returned in the order of the tasks when
+ordered is True, in order of completion otherwise. The shared memory blocks
+are released by close().
+"""
+
+import multiprocessing
+from collections import namedtuple
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from ..load.metocean import MetoceanStore, epoch_hours
+from .schedule.weather import (OLC_VARIABLES, WindowCache, _store, _variable,
+                               quantize_olc)
+
+SolutionTask = namedtuple('SolutionTask', ['sequence', 'solution', 'olc',
+                                           'preparation', 'sea_time',
+                                           'start', 'hourly_cost'])
+
+SolutionRecord = namedtuple('SolutionRecord', ['sequence', 'solution',
+                                               'waiting_time', 'cost'])
+
+
+def solution_task(seq, sol, olc, preparation, sea_time, start, hourly_cost):
+    """Returns the SolutionTask of a solution, with its operational limit
+    conditions quantized into a tuple"""
+    return SolutionTask(seq, sol, quantize_olc(olc), float(preparation),
+                        float(sea_time), float(start), float(hourly_cost))
+
+
+def publish_metocean(metocean):
+    """Publishes a met-ocean data set for the worker processes
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+
+    Returns
+    -------
+    spec : tuple
+     description of the published data, given to the worker initializer
+    blocks : list
+     shared memory blocks to be released once the workers are done
+    """
+    store = _store(metocean)
+    if store is not None and store.path is not None:
+        return ('store', store.path, int(store.hours[0]),
+                int(store.hours[-1]) + 1), []
+
+    if store is not None:
+        hours = np.asarray(store.hours)
+        variables = store.variables
+        data = np.asarray(store.data)
+    else:
+        hours = epoch_hours(metocean['year'], metocean['month'],
+                            metocean['day'], metocean['hour'])
+        variables = tuple(name for _, name in OLC_VARIABLES
+                          if name in metocean.columns)
+        data = np.array([_variable(metocean, name) for name in variables],
+                        dtype=np.float32).reshape(len(variables), len(hours))
+
+    if shared_memory is None:
+        return ('arrays', hours, data, variables), []
+    blocks = []
+    arrays = []
+    for array in (hours, data):
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+        shared[...] = array
+        blocks.append(block)
+        arrays.append((block.name, array.shape, array.dtype.str))
+    return ('shared', arrays, variables), blocks
+
+
+def _attach(name):
+    """Maps a shared memory block created by the main process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # the workers share the resource tracker of the main process, which
+        # alone releases the block
+        return shared_memory.SharedMemory(name=name)
+
+
+def open_published(spec):
+    """Returns the MetoceanStore of met-ocean data published by
+    publish_metocean, and the shared memory blocks it maps"""
+    kind = spec[0]
+    if kind == 'store':
+        _, path, first, last = spec
+        store = MetoceanStore.open(path)
+        if int(store.hours[0]) != first or int(store.hours[-1]) + 1 != last:
+            store = store.between(first, last)
+        return store, []
+    if kind == 'arrays':
+        _, hours, data, variables = spec
+        return MetoceanStore(hours, data, variables), []
+    _, arrays, variables = spec
+    blocks = [_attach(name) for name, _, _ in arrays]
+    hours, data = [np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+                   for (_, shape, dtype), block in zip(arrays, blocks)]
+    return MetoceanStore(hours, data, variables), blocks
+
+
+# met-ocean data and weather windows of the worker process, the threads of a
+# thread pool use the state of their executor instead
+_worker = {}
+
+
+def _init_worker(spec):
+    store, blocks = open_published(spec)
+    _worker['metocean'] = store
+    _worker['blocks'] = blocks
+    _worker['windows'] = WindowCache()
+
+
+def _evaluate(task, state=None):
+    """Evaluates the schedule of a solution with the met-ocean data and
+    weather windows of state, those of the worker process if None"""
+    if state is None:
+        state = _worker
+    olc = dict((key, limit) for (key, _), limit
+               in zip(OLC_VARIABLES, task.olc))
+    ww = state['windows'].windows(state['metocean'], olc)
+    waiting = ww.index.waiting_time(task.start + task.preparation,
+                                    task.sea_time)
+    cost = task.hourly_cost * (task.sea_time + waiting)
+    return SolutionRecord(task.sequence, task.solution, waiting, cost)
+
+
+class SolutionExecutor(object):
+    """
+    SolutionExecutor fans out the evaluation of SolutionTask objects to a
+    pool of worker processes sharing the met-ocean data.
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    workers : int
+     number of worker processes, by default one per CPU
+    ordered : bool
+     if True the records are returned in the order of the tasks, otherwise
+     in order of completion
+    chunksize : int
+     number of tasks sent at once to a worker, by default about four chunks
+     per worker
+    pool : str
+     'process' for a process pool, 'thread' for a thread pool (e.g. for
+     debugging)
+    """
+
+    def __init__(self, metocean, workers=None, ordered=True, chunksize=None,
+                 pool='process'):
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.ordered = ordered
+        self.chunksize = chunksize
+        self._blocks = []
+        if pool == 'process':
+            spec, self._blocks = publish_metocean(metocean)
+            self._pool = Pool(workers, _init_worker, (spec,))
+            self._evaluate = _evaluate
+        elif pool == 'thread':
+            # the threads share the met-ocean data of the main process, kept
+            # by the executor so that several executors can coexist
+            state = {'metocean': metocean, 'blocks': [],
+                     'windows': WindowCache()}
+            self._pool = ThreadPool(workers)
+            self._evaluate = partial(_evaluate, state=state)
+        else:
+            raise ValueError("unknown pool type '%s'" % pool)
+
+    def evaluate(self, tasks):
+        """Evaluates a list of SolutionTask objects
+
+        Parameters
+        ----------
+        tasks : list
+         SolutionTask objects, see solution_task
+
+        Returns
+        -------
+        records : list
+         SolutionRecord objects with the waiting time [h] and the vessel cost
+         of each solution
+        """
+        tasks = list(tasks)
+        chunksize = self.chunksize
+        if chunksize is None:
+            chunksize = max(1, len(tasks) // (4 * self.workers))
+        if self.ordered:
+            records = self._pool.imap(self._evaluate, tasks, chunksize)
+        else:
+            records = self._pool.imap_unordered(self._evaluate, tasks,
+                                                chunksize)
+        return list(records)
+
+    def close(self):
+        """Stops the workers and releases the shared memory blocks"""
+        if self._pool is None:
+            return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
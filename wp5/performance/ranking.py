@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module ranks the scheduled and costed solutions of a logistic phase. The
+solutions are compared on three objectives to be minimized: the total cost,
+the total duration and the waiting time. Two rankings are available:
+    'pareto': incremental Pareto archive keeping only the non-dominated
+              solutions, ranked by total cost
+    'topk': bounded heap keeping the k best solutions on one objective
+In both cases the memory used does not grow with the number of solutions
+submitted, only with the number of solutions kept.
+
+BETA VERSION NOTES: the total cost is the sum of the vessel, equipment and port
+costs computed by the cost step, the total duration is the preparation time
+plus the sea time plus the waiting time of the schedule step. A missing
+objective (NaN, e.g. the cost of a vessel without day rate) is ranked as the
+worst possible value.
+"""
+
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+OBJECTIVES = ('total cost', 'total duration', 'waiting time')
+
+
+def solution_objectives(solution):
+    """Returns the objectives (total cost, total duration, waiting time) of a
+    scheduled and costed VE_solutions"""
+    sched = solution.schedule
+    waiting = sched['waiting time']
+    duration = sched['preparation'] + sched['sea time'] + waiting
+    return (float(sum(solution.cost.values())), float(duration),
+            float(waiting))
+
+
+class ParetoArchive(object):
+    """
+    ParetoArchive keeps the solutions not dominated by any other solution
+    submitted so far. A solution dominates another if it is not worse on any
+    objective and better on at least one.
+
+    """
+
+    def __init__(self, nb_objectives=len(OBJECTIVES)):
+        self.values = np.empty((0, nb_objectives))
+        self.items = []
+
+    def add(self, item, values):
+        """Submits an item with its objective values, returns True if it
+        enters the archive"""
+        values = np.asarray(values, dtype=float)
+        # dominated by, or equal to, an archived solution
+        if np.any((self.values <= values).all(axis=1)):
+            return False
+        # remove the archived solutions dominated by the new one
+        dominated = (self.values >= values).all(axis=1) & \
+            (self.values > values).any(axis=1)
+        if dominated.any():
+            keep = np.flatnonzero(~dominated)
+            self.values = self.values[keep]
+            self.items = [self.items[pos] for pos in keep]
+        self.values = np.vstack([self.values, values])
+        self.items.append(item)
+        return True
+
+    def ranked(self, objective=0):
+        """Returns the archived (values, item) pairs sorted by one objective,
+        then by the following ones"""
+        others = [col for col in range(self.values.shape[1])
+                  if col != objective]
+        # the last key of lexsort is the primary one
+        keys = [self.values[:, col] for col in reversed(others)]
+        order = np.lexsort(keys + [self.values[:, objective]])
+        return [(tuple(self.values[pos]), self.items[pos]) for pos in order]
+
+    def __len__(self):
+        return len(self.items)
+
+
+class TopK(object):
+    """
+    TopK keeps the k items with the lowest value of one objective in a bounded
+    heap.
+
+    """
+
+    def __init__(self, k, objective=0):
+        self.k = k
+        self.objective = objective
+        self._heap = []
+        self._counter = itertools.count()
+
+    def add(self, item, values):
+        """Submits an item with its objective values, returns True if it is
+        among the k best so far"""
+        # max-heap on the objective, ties keep the first submitted
+        entry = (-values[self.objective], -next(self._counter),
+                 tuple(values), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def ranked(self):
+        """Returns the kept (values, item) pairs sorted by the objective"""
+        return [(entry[2], entry[3]) for entry in
+                sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def rank_solutions(log_phase, mode='pareto', k=10, objective='total cost'):
+    """rank_solutions ranks the scheduled and costed solutions of all the
+    operation sequences of a logistic phase
+
+    Parameters
+    ----------
+    log_phase : class
+     class of the logistic phase under consideration for assessment, with the
+     schedule and cost of each solution in log_phase.op_ve[seq].sol
+    mode : str
+     'pareto' to keep the non-dominated solutions, 'topk' to keep the k best
+     solutions on the objective
+    k : int
+     number of solutions kept in 'topk' mode
+    objective : str
+     one of OBJECTIVES, the objective the solutions are ranked by
+
+    Returns
+    -------
+    ranking : DataFrame
+     Panda table with one row per kept solution, sorted by rank, with the
+     columns 'rank', 'sequence', 'solution', 'combination', the objectives,
+     'vessels' and 'equipments' (the indexes of the vessels and equipments of
+     the solution in their database)
+    """
+    nr_obj = OBJECTIVES.index(objective)
+    if mode == 'pareto':
+        archive = ParetoArchive()
+    elif mode == 'topk':
+        archive = TopK(k, nr_obj)
+    else:
+        raise ValueError("unknown ranking mode '%s'" % mode)
+
+    for seq in sorted(log_phase.op_ve):
+        for nr_sol, solution in sorted(log_phase.op_ve[seq].sol.items()):
+            values = solution_objectives(solution)
+            # NaN would neither dominate nor be dominated, inf is the worst
+            archive.add((seq, nr_sol, solution, values),
+                        np.where(np.isnan(values), np.inf, values))
+
+    if mode == 'pareto':
+        ranked = archive.ranked(nr_obj)
+    else:
+        ranked = archive.ranked()
+
+    rows = []
+    for rank, (_, (seq, nr_sol, solution, values)) in enumerate(ranked):
+        row = {'rank': rank,
+               'sequence': seq,
+               'solution': nr_sol,
+               'combination': solution.combination,
+               'vessels': tuple(solution.sol_ves[nr].name
+                                for nr in sorted(solution.sol_ves)),
+               'equipments': tuple(solution.sol_eq[nr].name
+                                   for nr in sorted(solution.sol_eq))}
+        row.update(zip(OBJECTIVES, values))
+        rows.append(row)
+    columns = ['rank', 'sequence', 'solution', 'combination'] + \
+        list(OBJECTIVES) + ['vessels', 'equipments']
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module contains the duration models of the individual logistic
+operations, shared by the installation (sched) and O&M (sched_om) schedule
+functions. A DurationModel maps the id of each LogOp to a formula:
+    FixedTime: a fixed duration [h]
+    Transit: the port-to-site distance divided by the transit speed of the
+             first vessel of each solution
+    PerUnit: a duration per unit [h] times a quantity of the project
+    FromInputs: a duration read from the outputs of another work package
+Each formula also tells whether the operation takes place at port
+(preparation) or at sea, and the operational limit conditions it imposes on
+the sea operations. The formulas of an operation sequence are looked up once,
+then the durations of all the solutions of the sequence are evaluated at once
+into a (solutions x operations) matrix. Given to compatibility_ve or
+compatibility_ve_om, a duration model also bounds the sea time of the
+solutions enumerated by the match stage (min_sea_time) and gives the transit
+limits of the towed barges (transit_limits).
+
+BETA VERSION NOTES: the durations are still the placeholder values of the
+previous version of the schedule functions, to be replaced by the operation
+durations of the databases. Operations without formula in the model are not
+scheduled.
+"""
+
+import numpy as np
+
+# met-ocean limits of the operational limit conditions
+OLC_KEYS = ('maxHs', 'maxTp', 'maxWs', 'maxCs')
+
+
+def _value(spec, context):
+    """Resolves a number, or a (source, table, column) reference to the first
+    value of a column of a panda table of the context"""
+    if isinstance(spec, tuple):
+        source, table, column = spec
+        return float(context[source][table][column].iloc[0])
+    return float(spec)
+
+
+class Formula(object):
+    """
+    Formula is the base class of the operation duration formulas.
+
+    Parameters
+    ----------
+    sea : bool
+     True for the operations at sea, False for the preparation at port
+    olc : dict
+     operational limit conditions {'maxHs': .., 'maxWs': .., ..} imposed by
+     the operation, given as numbers or (source, table, column) references
+    """
+
+    def __init__(self, sea=True, olc=None):
+        self.sea = sea
+        self.olc = dict(olc or {})
+
+    def durations(self, solutions, context):
+        """Returns the duration [h] of the operation for each solution"""
+        raise NotImplementedError
+
+    def limits(self, context):
+        """Returns the operational limit conditions of the operation"""
+        return dict((key, _value(spec, context))
+                    for key, spec in self.olc.items())
+
+    def min_duration(self, context):
+        """Returns a lower bound of the duration [h] of the operation for any
+        solution, 0 if it depends on data missing from the context"""
+        return 0.
+
+
+class FixedTime(Formula):
+    """
+    FixedTime is a fixed operation duration [h].
+
+    """
+
+    def __init__(self, hours, sea=False, olc=None):
+        super(FixedTime, self).__init__(sea, olc)
+        self.hours = hours
+
+    def durations(self, solutions, context):
+        return np.full(len(solutions), float(self.hours))
+
+    def min_duration(self, context):
+        return float(self.hours)
+
+
+class Transit(Formula):
+    """
+    Transit is the port-to-site distance (context['distance'] [km]) divided by
+    the transit speed of the first vessel of each solution.
+
+    """
+
+    def durations(self, solutions, context):
+        speed = 3.6 * np.array([sol.sol_ves[0]['Transit speed [m/s]']
+                                for sol in solutions], dtype=float)  # [km/h]
+        return context['distance'] / speed
+
+
+class PerUnit(Formula):
+    """
+    PerUnit is a duration per unit [h] times the quantity context[quantity],
+    e.g. the number of devices or foundations.
+
+    """
+
+    def __init__(self, hours, quantity, sea=True, olc=None):
+        super(PerUnit, self).__init__(sea, olc)
+        self.hours = hours
+        self.quantity = quantity
+
+    def durations(self, solutions, context):
+        return np.full(len(solutions),
+                       float(self.hours) * context[self.quantity])
+
+    def min_duration(self, context):
+        if self.quantity not in context:
+            return 0.
+        return float(self.hours) * context[self.quantity]
+
+
+class FromInputs(Formula):
+    """
+    FromInputs is a duration [h] read from the first row of a column of the
+    outputs of another work package, given as (source, table, column).
+
+    """
+
+    def __init__(self, reference, sea=True, olc=None):
+        super(FromInputs, self).__init__(sea, olc)
+        self.reference = reference
+
+    def durations(self, solutions, context):
+        return np.full(len(solutions), _value(self.reference, context))
+
+    def min_duration(self, context):
+        try:
+            return _value(self.reference, context)
+        except (KeyError, IndexError):
+            return 0.
+
+
+class OperationDurations(object):
+    """
+    OperationDurations holds the durations of an operation sequence for a list
+    of solutions.
+
+    Parameters
+    ----------
+    durations : ndarray
+     durations [h] of shape (solutions, operations), 0 for the operations not
+     scheduled
+    sea : ndarray
+     boolean array, True for the sea operations
+    scheduled : ndarray
+     boolean array, True for the operations with a formula
+    olc : dict
+     operational limit conditions of the sea operations, the lowest limit of
+     all operations, 0 if not constrained
+    """
+
+    def __init__(self, durations, sea, scheduled, olc):
+        self.durations = durations
+        self.sea = sea
+        self.scheduled = scheduled
+        self.olc = olc
+
+    def preparation(self):
+        """Returns the preparation time [h] of each solution"""
+        return self.durations[:, self.scheduled & ~self.sea].sum(axis=1)
+
+    def sea_time(self):
+        """Returns the sea time [h] of each solution"""
+        return self.durations[:, self.scheduled & self.sea].sum(axis=1)
+
+    def all_durations(self, nr_sol):
+        """Returns the list of the durations [h] of the scheduled operations
+        of a solution, the preparation operations first"""
+        row = self.durations[nr_sol]
+        return row[self.scheduled & ~self.sea].tolist() + \
+            row[self.scheduled & self.sea].tolist()
+
+
+class DurationModel(object):
+    """
+    DurationModel evaluates the durations of the operation sequences from the
+    formulas of each LogOp id.
+
+    Parameters
+    ----------
+    formulas : dict
+     dictionnary mapping LogOp ids to Formula objects
+    default : Formula
+     formula of the operations without formula, not scheduled if None
+    """
+
+    def __init__(self, formulas, default=None):
+        self.formulas = dict(formulas)
+        self.default = default
+        self._compiled = {}
+
+    def compile(self, op_sequence):
+        """Returns the formulas of an operation sequence, None for the
+        operations not scheduled, looked up once per sequence of ids"""
+        ids = tuple(log_op.id for log_op in op_sequence)
+        formulas = self._compiled.get(ids)
+        if formulas is None:
+            formulas = tuple(self.formulas.get(op_id, self.default)
+                             for op_id in ids)
+            self._compiled[ids] = formulas
+        return formulas
+
+    def min_sea_time(self, op_sequence, context=None):
+        """Returns a lower bound of the sea time [h] of an operation sequence
+        for any solution, the transits counting as 0 since they depend on the
+        vessels
+
+        Parameters
+        ----------
+        op_sequence : list
+         LogOp objects of the operation sequence
+        context : dict
+         project data used by the formulas, the durations depending on data
+         missing from it count as 0
+
+        Returns
+        -------
+        sea_time : float
+         lower bound of the sea time [h]
+        """
+        if context is None:
+            context = {}
+        return float(sum(formula.min_duration(context)
+                         for formula in self.compile(op_sequence)
+                         if formula is not None and formula.sea))
+
+    def limits(self, op_sequence, context=None, kind=Formula):
+        """Returns the lowest operational limit conditions imposed by the
+        formulas of an operation sequence, only the formulas of class kind,
+        e.g. Transit, if given. The limits depending on data missing from the
+        context are ignored, 0 if not constrained"""
+        if context is None:
+            context = {}
+        olc = dict((key, 0.) for key in OLC_KEYS)
+        for formula in self.compile(op_sequence):
+            if not isinstance(formula, kind):
+                continue
+            for key, spec in formula.olc.items():
+                try:
+                    limit = _value(spec, context)
+                except (KeyError, IndexError):
+                    continue
+                if limit and (not olc[key] or limit < olc[key]):
+                    olc[key] = limit
+        return olc
+
+    def transit_limits(self, op_sequence, context=None):
+        """Returns the lowest operational limit conditions of the transits
+        of an operation sequence, see limits"""
+        return self.limits(op_sequence, context, Transit)
+
+    def evaluate(self, op_sequence, solutions, context):
+        """Evaluates the durations of an operation sequence for a list of
+        solutions
+
+        Parameters
+        ----------
+        op_sequence : list
+         LogOp objects of the operation sequence
+        solutions : list
+         VE_solutions objects performing the sequence
+        context : dict
+         project data used by the formulas, e.g. 'distance' [km] or the
+         outputs of other work packages
+
+        Returns
+        -------
+        durations : OperationDurations
+         durations of the operations of each solution
+        """
+        formulas = self.compile(op_sequence)
+        durations = np.zeros((len(solutions), len(formulas)))
+        sea = np.zeros(len(formulas), dtype=bool)
+        scheduled = np.zeros(len(formulas), dtype=bool)
+        olc = dict((key, 0.) for key in OLC_KEYS)
+        for nr_op, formula in enumerate(formulas):
+            if formula is None:
+                continue
+            scheduled[nr_op] = True
+            sea[nr_op] = formula.sea
+            if len(solutions):
+                durations[:, nr_op] = formula.durations(solutions, context)
+            for key, limit in formula.limits(context).items():
+                if limit and (not olc[key] or limit < olc[key]):
+                    olc[key] = limit
+        return OperationDurations(durations, sea, scheduled, olc)
+
+
+INSTALLATION_DURATIONS = DurationModel({
+    10: FixedTime(48),  # Mobilisation
+    11: FixedTime(0),  # Assembly at port
+    13: FixedTime(24),  # Vessel preparation and loading
+    14: Transit(olc={'maxHs': 1.5}),  # Transportation from port to site
+    15: FixedTime(0.5, sea=True),  # Seafloor and equipment preparation
+    17: Transit(),  # Transportation from site to port
+    30: FixedTime(3, sea=True, olc={'maxWs': 20}),  # drilling rig
+    31: FixedTime(5, sea=True),  # hammering
+    32: FixedTime(6, sea=True),  # vibro-driving
+    })
+
+_WP6 = 'wp6_outputs'
+_ON_SITE = FromInputs((_WP6, 'LogPhase1', 'T_OnSite [h]'),
+                      olc={'maxHs': (_WP6, 'LogPhase1', 'Hs_Max [m]'),
+                           'maxWs': (_WP6, 'LogPhase1', 'Vw_Max [m/s]')})
+
+OM_DURATIONS = DurationModel(dict(
+    [(10, FixedTime(24)),  # Mobilisation
+     (11, FixedTime(0)),  # Assembly at port
+     (13, FixedTime(24)),  # Vessel preparation and loading
+     (14, Transit()),  # Transportation from port to site
+     (17, Transit())] +  # Transportation from site to port
+    # inspection and on-site maintenance operations
+    [(op_id, _ON_SITE) for op_id in range(60, 68)]),
+    default=FixedTime(1))
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module precomputes the persistence surface of a met-ocean data set, used
+to sweep the operational limits of the vessels without going through the
+met-ocean records again for each new pair of limits. For every pair of
+thresholds of a grid of significant wave height (HS_LEVELS) and wind speed
+(WS_LEVELS) limits, the surface stores the number of consecutive workable time
+steps remaining from each time step, as uint16 values saturating at 65535.
+
+A pair of limits is answered by the grid point rounded down to the nearest
+levels, i.e. the answer is never more permissive than the wave height and
+wind speed limits. Whether an
+operation of a given duration can start at a given time step is then a single
+lookup, and the weather windows of a grid point are read from the surface
+without the met-ocean data. PersistenceSurface has the windows() method of
+WindowCache and can be given to the schedule functions in its place.
+
+BETA VERSION NOTES: only the wave height and wind speed limits are covered by
+the surface, remaining() and workable() ignore the other operational limits.
+windows() computes the windows directly when a wave period or current speed
+limit is given. Surfaces built from a met-ocean store on disk are saved in the
+store folder under a name including the content hash of the store, and
+memory-mapped when requested again.
+"""
+
+import bisect
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ...load import cache
+from .weather import (WeatherWindows, _store, _variable, dataset_key,
+                      record_hours, run_lengths, weather_windows)
+
+# thresholds of the surface [m] and [m/s], the first level is 0 (never
+# workable) and the last one inf (not constraining)
+HS_LEVELS = (0.,) + tuple(np.round(np.arange(0.25, 5.01, 0.25), 2)) + \
+    (np.inf,)
+WS_LEVELS = (0.,) + tuple(np.arange(2., 30.1, 1.)) + (np.inf,)
+
+_SATURATION = np.iinfo(np.uint16).max
+
+
+def remaining_steps(mask):
+    """Returns the number of consecutive True values of a boolean array from
+    each position, saturating at the uint16 maximum"""
+    mask = np.asarray(mask, dtype=bool)
+    nb_steps = len(mask)
+    positions = np.arange(nb_steps)
+    # position of the next non workable step from each position
+    stops = np.where(mask, nb_steps, positions)
+    next_stop = np.minimum.accumulate(stops[::-1])[::-1]
+    return np.minimum(next_stop - positions, _SATURATION).astype(np.uint16)
+
+
+def _level(levels, limit):
+    """Returns the position of the largest level not above the limit, the
+    last level (inf) for a missing, 0 or None limit"""
+    if not limit:
+        return len(levels) - 1
+    return max(bisect.bisect_right(levels, limit) - 1, 0)
+
+
+class PersistenceSurface(object):
+    """
+    PersistenceSurface holds the remaining workable time steps of a met-ocean
+    data set over a grid of wave height and wind speed limits.
+
+    Parameters
+    ----------
+    hours : ndarray
+     time of each met-ocean record [h from the first record]
+    steps : ndarray
+     uint16 array of shape (len(hs_levels), len(ws_levels), len(hours))
+    hs_levels, ws_levels : tuple
+     sorted thresholds of the grid [m] and [m/s]
+    key : tuple
+     dataset_key of the met-ocean data set
+    """
+
+    def __init__(self, hours, steps, hs_levels=HS_LEVELS, ws_levels=WS_LEVELS,
+                 key=None):
+        self.hours = np.asarray(hours)
+        self.steps = steps
+        self.hs_levels = tuple(float(level) for level in hs_levels)
+        self.ws_levels = tuple(float(level) for level in ws_levels)
+        self.key = key
+        self.time_step = hours[1] - hours[0] if len(hours) > 1 else 1
+        self._windows = {}
+
+    @classmethod
+    def build(cls, metocean, hs_levels=HS_LEVELS, ws_levels=WS_LEVELS,
+              out=None):
+        """Computes the surface of a met-ocean data set, in the array out if
+        given (e.g. a memory-mapped file)"""
+        hours = record_hours(metocean)
+        shape = (len(hs_levels), len(ws_levels), len(hours))
+        steps = np.empty(shape, dtype=np.uint16) if out is None else out
+        hs = _variable(metocean, 'waveHs')
+        ws = _variable(metocean, 'windSpeed')
+        nb_steps = len(hours)
+        with np.errstate(invalid='ignore'):
+            for nr_hs, hs_limit in enumerate(hs_levels):
+                hs_ok = np.ones(nb_steps, dtype=bool) if hs is None \
+                    else hs <= hs_limit
+                for nr_ws, ws_limit in enumerate(ws_levels):
+                    ok = hs_ok if ws is None else hs_ok & (ws <= ws_limit)
+                    steps[nr_hs, nr_ws] = remaining_steps(ok)
+        return cls(hours, steps, hs_levels, ws_levels, dataset_key(metocean))
+
+    @property
+    def nbytes(self):
+        return self.steps.nbytes
+
+    def grid_point(self, olc):
+        """Returns the (Hs, wind speed) level positions used for the
+        operational limit conditions"""
+        return (_level(self.hs_levels, olc.get('maxHs')),
+                _level(self.ws_levels, olc.get('maxWs')))
+
+    def remaining(self, olc, step):
+        """Returns the consecutive workable hours remaining from a time step
+        (position or array of positions in the met-ocean records)"""
+        nr_hs, nr_ws = self.grid_point(olc)
+        return self.steps[nr_hs, nr_ws, step] * self.time_step
+
+    def workable(self, olc, step, duration):
+        """Returns True if an operation lasting duration [h] can start at a
+        time step (position or array of positions in the met-ocean records)"""
+        return self.remaining(olc, step) >= duration
+
+    def windows(self, metocean, olc):
+        """Returns the weather windows of the grid point of the operational
+        limit conditions, read from the surface and kept for later requests.
+        The windows of another met-ocean data set, or of limits constraining
+        the wave period or the current speed, are computed directly.
+
+        Parameters
+        ----------
+        metocean : MetoceanFrame, MetoceanStore or DataFrame
+         met-ocean data set
+        olc : dict
+         operational limit conditions, see workable_mask
+
+        Returns
+        -------
+        ww : WeatherWindows
+         shared read-only weather windows
+        """
+        if (dataset_key(metocean) != self.key or olc.get('maxTp') or
+                olc.get('maxCs')):
+            return weather_windows(metocean, olc)
+        point = self.grid_point(olc)
+        ww = self._windows.get(point)
+        if ww is None:
+            steps = np.asarray(self.steps[point])
+            first, _ = run_lengths(steps > 0)
+            limits = {'maxHs': self.hs_levels[point[0]],
+                      'maxWs': self.ws_levels[point[1]]}
+            ww = WeatherWindows(self.hours[first].astype(float),
+                                steps[first] * float(self.time_step), limits)
+            self._windows[point] = ww
+        return ww
+
+
+def persistence_surface(metocean, hs_levels=HS_LEVELS, ws_levels=WS_LEVELS):
+    """Returns the persistence surface of a met-ocean data set. The surface of
+    a met-ocean store on disk is saved in the store folder the first time and
+    memory-mapped afterwards.
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    hs_levels, ws_levels : tuple
+     sorted thresholds of the grid [m] and [m/s]
+
+    Returns
+    -------
+    surface : PersistenceSurface
+     the persistence surface
+    """
+    store = _store(metocean)
+    if store is None or store.path is None:
+        return PersistenceSurface.build(metocean, hs_levels, ws_levels)
+
+    key = dataset_key(metocean)
+    # the content hash keeps a store rebuilt in the same folder from reusing
+    # the surface of the previous data
+    name = 'persistence_%s.npy' % cache._digest(json.dumps(
+        [store.content_hash, list(key[3:]), list(hs_levels),
+         list(ws_levels)], default=float))[:16]
+    path = os.path.join(store.path, name)
+    if os.path.exists(path):
+        steps = np.load(path, mmap_mode='r')
+        return PersistenceSurface(record_hours(metocean), steps, hs_levels,
+                                  ws_levels, key)
+    # unique temporary file, concurrent builders never share it
+    handle, tmp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp',
+                                        dir=store.path)
+    os.close(handle)
+    try:
+        shape = (len(hs_levels), len(ws_levels), len(store))
+        steps = np.lib.format.open_memmap(tmp_path, mode='w+',
+                                          dtype=np.uint16, shape=shape)
+        PersistenceSurface.build(metocean, hs_levels, ws_levels, out=steps)
+        steps.flush()
+        del steps
+        cache._replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return PersistenceSurface(record_hours(metocean),
+                              np.load(path, mmap_mode='r'), hs_levels,
+                              ws_levels, key)
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module computes the sea-route distances used by the transit operations of
+the schedule step. The routes are searched with A* over a navigation grid of
+sea and land cells, each step costing the great-circle distance between the
+centres of two neighbouring sea cells (8-connected), with the great-circle
+distance to the destination as heuristic. Every computed distance is stored in
+a persistent cache keyed by the coordinates of both end points, so further
+queries of the same port-to-site or site-to-site route are dictionary lookups.
+
+Without navigation grid, or if one of the end points cannot reach the sea, the
+great-circle distance is used. Without coordinates, DEFAULT_DISTANCE is
+returned as by the former distance() stub.
+
+BETA VERSION NOTES: the navigation grid is read from a local raster, either a
+.npz file (arrays 'sea', 'lat0', 'lon0', 'dlat', 'dlon') or an ESRI ASCII grid
+(.asc), where non-zero cells are sea. Coastline files have to be rasterized
+beforehand.
+"""
+
+import atexit
+import hashlib
+import heapq
+import json
+import math
+import os
+import tempfile
+import weakref
+
+import numpy as np
+
+from ...load import cache
+from ...installation.port_index import LATITUDE, LONGITUDE, parse_dms
+
+EARTH_RADIUS = 6371.0  # [km]
+DEFAULT_DISTANCE = 20.0  # [km]
+# number of new distances after which a DistanceCache writes its file
+AUTOSAVE_BATCH = 64
+
+# neighbours of a cell in the 8-connected grid
+_MOVES = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def great_circle(lat1, lon1, lat2, lon2):
+    """Returns the great-circle (haversine) distance [km] between two points
+    given in decimal degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    hav = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1., math.sqrt(hav)))
+
+
+class NavigationGrid(object):
+    """
+    NavigationGrid is a regular latitude/longitude grid of sea (True) and land
+    (False) cells.
+
+    Parameters
+    ----------
+    sea : ndarray
+     boolean array of shape (nb_lat, nb_lon), row 0 at the southern edge
+    lat0, lon0 : float
+     latitude and longitude [deg] of the south-west corner of the grid
+    dlat, dlon : float
+     cell size [deg]
+    """
+
+    def __init__(self, sea, lat0, lon0, dlat, dlon):
+        self.sea = np.asarray(sea, dtype=bool)
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.dlat = float(dlat)
+        self.dlon = float(dlon)
+        sha = hashlib.sha1(np.packbits(self.sea).tobytes())
+        sha.update(repr((self.sea.shape, self.lat0, self.lon0, self.dlat,
+                         self.dlon)).encode('utf-8'))
+        self.digest = sha.hexdigest()
+
+    @classmethod
+    def load(cls, path):
+        """Reads a navigation grid from a .npz file or an ESRI ASCII grid"""
+        if path.endswith('.npz'):
+            with np.load(path) as raster:
+                return cls(raster['sea'], raster['lat0'], raster['lon0'],
+                           raster['dlat'], raster['dlon'])
+        header = {}
+        with open(path, 'r') as raster:
+            for _ in range(6):
+                position = raster.tell()
+                line = raster.readline().split()
+                if not line or not line[0][0].isalpha():
+                    raster.seek(position)
+                    break
+                header[line[0].lower()] = float(line[1])
+            values = np.loadtxt(raster, ndmin=2)
+        if 'nodata_value' in header:
+            values[values == header['nodata_value']] = 0
+        cellsize = header['cellsize']
+        # the first row of an ASCII grid is the northern one
+        return cls(values[::-1] != 0, header['yllcorner'],
+                   header['xllcorner'], cellsize, cellsize)
+
+    def cell(self, latitude, longitude):
+        """Returns the (row, column) of the cell containing a point, None if
+        the point is outside the grid"""
+        row = int(math.floor((latitude - self.lat0) / self.dlat))
+        col = int(math.floor((longitude - self.lon0) / self.dlon))
+        if 0 <= row < self.sea.shape[0] and 0 <= col < self.sea.shape[1]:
+            return row, col
+        return None
+
+    def centre(self, row, col):
+        """Returns the latitude and longitude [deg] of the centre of a cell"""
+        return (self.lat0 + (row + 0.5) * self.dlat,
+                self.lon0 + (col + 0.5) * self.dlon)
+
+    def nearest_sea(self, latitude, longitude):
+        """Returns the sea cell nearest to a point, e.g. a port on the coast,
+        None if the point is outside the grid or the grid has no sea"""
+        cell = self.cell(latitude, longitude)
+        if cell is None:
+            return None
+        if self.sea[cell]:
+            return cell
+        rows, cols = np.nonzero(self.sea)
+        if not len(rows):
+            return None
+        lat = np.radians(self.lat0 + (rows + 0.5) * self.dlat)
+        lon = np.radians(self.lon0 + (cols + 0.5) * self.dlon)
+        lat1 = math.radians(latitude)
+        lon1 = math.radians(longitude)
+        hav = np.sin((lat - lat1) / 2) ** 2 + \
+            np.cos(lat1) * np.cos(lat) * np.sin((lon - lon1) / 2) ** 2
+        nearest = int(np.argmin(hav))
+        return int(rows[nearest]), int(cols[nearest])
+
+    def shortest_path(self, origin, destination):
+        """Returns the length [km] of the shortest sea route between two
+        points given as (latitude, longitude), inf if there is none"""
+        start = self.nearest_sea(*origin)
+        goal = self.nearest_sea(*destination)
+        if start is None or goal is None:
+            return float('inf')
+        # from the end points to the centres of their sea cells
+        access = great_circle(origin[0], origin[1], *self.centre(*start)) + \
+            great_circle(destination[0], destination[1], *self.centre(*goal))
+        goal_lat, goal_lon = self.centre(*goal)
+
+        def heuristic(cell):
+            return great_circle(goal_lat, goal_lon, *self.centre(*cell))
+
+        nb_rows, nb_cols = self.sea.shape
+        cost = {start: 0.}
+        queue = [(heuristic(start), 0., start)]
+        while queue:
+            _, dist, cell = heapq.heappop(queue)
+            if cell == goal:
+                return access + dist
+            if dist > cost[cell]:
+                continue
+            centre = self.centre(*cell)
+            for drow, dcol in _MOVES:
+                row, col = cell[0] + drow, cell[1] + dcol
+                if not (0 <= row < nb_rows and 0 <= col < nb_cols) or \
+                        not self.sea[row, col]:
+                    continue
+                step = great_circle(centre[0], centre[1],
+                                    *self.centre(row, col))
+                new_dist = dist + step
+                if new_dist < cost.get((row, col), float('inf')):
+                    cost[(row, col)] = new_dist
+                    heapq.heappush(queue, (new_dist + heuristic((row, col)),
+                                           new_dist, (row, col)))
+        return float('inf')
+
+
+def _save_at_exit(ref):
+    distance_cache = ref()
+    if distance_cache is not None:
+        distance_cache.flush()
+
+
+class DistanceCache(object):
+    """
+    DistanceCache is a persistent dictionary of route distances [km], keyed by
+    the coordinates of both end points rounded to 1e-4 deg. Routes are
+    symmetric, both directions share the same entry. The file is written
+    through a temporary file of the same folder, and merged with the
+    distances saved meanwhile by other processes.
+
+    Parameters
+    ----------
+    path : string
+     the file path of the JSON cache, not persistent if None
+    autosave : bool
+     if True, the file is updated every AUTOSAVE_BATCH new distances and when
+     the interpreter exits
+    """
+
+    def __init__(self, path=None, autosave=True):
+        self.path = path
+        self.autosave = autosave
+        self.distances = self._read()
+        self._unsaved = 0
+        if path is not None and autosave:
+            atexit.register(_save_at_exit, weakref.ref(self))
+
+    def _read(self):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(origin, destination):
+        points = sorted(['%.4f,%.4f' % tuple(point)
+                         for point in (origin, destination)])
+        return '|'.join(points)
+
+    def get(self, origin, destination):
+        """Returns the cached distance [km], None if unknown"""
+        return self.distances.get(self.key(origin, destination))
+
+    def set(self, origin, destination, distance):
+        """Stores a distance [km]"""
+        self.distances[self.key(origin, destination)] = distance
+        self._unsaved += 1
+        if self.autosave and self._unsaved >= AUTOSAVE_BATCH:
+            self.save()
+
+    def flush(self):
+        """Writes the cache to its file if distances were added since it was
+        last saved"""
+        if self._unsaved:
+            self.save()
+
+    def save(self):
+        """Writes the cache to its file"""
+        if self.path is None:
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        cache._cache_dir(folder)
+        # keep the distances saved by other processes
+        distances = self._read()
+        distances.update(self.distances)
+        self.distances = distances
+        handle, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+            dir=folder)
+        try:
+            with os.fdopen(handle, 'w') as cache_file:
+                json.dump(self.distances, cache_file, sort_keys=True)
+            cache._replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._unsaved = 0
+
+    def __len__(self):
+        return len(self.distances)
+
+
+class RoutingEngine(object):
+    """
+    RoutingEngine returns the sea-route distance between two points, computing
+    it once and looking it up in its DistanceCache afterwards.
+
+    Parameters
+    ----------
+    grid : NavigationGrid or string
+     navigation grid, or the path of its raster file. Great-circle distances
+     are used if None
+    cache_path : string
+     file path of the persistent distance cache, by default a file of the WP5
+     cache directory specific to the navigation grid
+    """
+
+    def __init__(self, grid=None, cache_path=None):
+        if isinstance(grid, str):
+            grid = NavigationGrid.load(grid)
+        self.grid = grid
+        if cache_path is None:
+            name = 'great_circle' if grid is None else grid.digest[:16]
+            cache_path = os.path.join(cache.CACHE_DIR, 'routes',
+                                      '%s.json' % name)
+        self.cache = DistanceCache(cache_path)
+
+    def distance(self, origin, destination):
+        """Returns the distance [km] of the sea route between two points
+
+        Parameters
+        ----------
+        origin, destination : tuple
+         (latitude, longitude) of the end points [deg]
+
+        Returns
+        -------
+        distance : float
+         route distance [km], DEFAULT_DISTANCE if a point is missing
+        """
+        if origin is None or destination is None or \
+                np.isnan(list(origin) + list(destination)).any():
+            return DEFAULT_DISTANCE
+        distance = self.cache.get(origin, destination)
+        if distance is None:
+            distance = float('inf')
+            if self.grid is not None:
+                distance = self.grid.shortest_path(origin, destination)
+            if math.isinf(distance):
+                distance = great_circle(origin[0], origin[1],
+                                        destination[0], destination[1])
+            self.cache.set(origin, destination, distance)
+        return distance
+
+
+def port_location(port):
+    """Returns the (latitude, longitude) [deg] of the port selected by
+    install_port or OM_port, None if no port or coordinates are available"""
+    try:
+        selected = port['Selected base port for installation']
+        location = (parse_dms(selected[LATITUDE]),
+                    parse_dms(selected[LONGITUDE]))
+    except (KeyError, TypeError, IndexError):
+        return None
+    if np.isnan(location).any():
+        return None
+    return location
+
+
+_default_engine = None
+
+
+def default_routing():
+    """Returns the RoutingEngine used when none is given to the schedule
+    functions, using great-circle distances and the default cache"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = RoutingEngine()
+    return _default_engine
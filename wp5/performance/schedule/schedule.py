@@ -12,162 +12,83 @@ BETA VERSION NOTES: The module will suffer major changes in the next version of
 the code.
 """
 
-import numpy
+from ..economic.eco import vessel_hourly_cost
+from ..parallel import solution_task
+from .durations import INSTALLATION_DURATIONS
+from .routing import default_routing, port_location
+from .weather import default_window_cache
 
 def sched(x, install, log_phase, user_inputs, wp2_outputs, wp3_outputs,
-          wp4_outputs):
-    def distance(coordinates, map_land):
-        '''
-        distance returns the calculated distance between two points
-        TO BE PROVIDED BY UEDIN (WP3)
-        '''
-        return 20.0
-    def indices(a, func):
-        '''
-        indices returns the indices of a vector "a" that satisfy the
-        conditional function "func"
-        '''
-        return [i for (i, val) in enumerate(a) if func(val)]
-    def differences(a):
-        '''
-        differences returns a vector containing the difference
-        '''
-        return [j-i for i, j in zip(a[:-1], a[1:])]
+          wp4_outputs, site=None, routing=None, window_cache=None,
+          duration_model=None, executor=None):
+    if routing is None:
+        routing = default_routing()
+    if window_cache is None:
+        window_cache = default_window_cache
+    if duration_model is None:
+        duration_model = INSTALLATION_DURATIONS
+    # coordinates of the selected port and of the project site
+    port_site = (port_location(install.get('port')), site)
 
-    def weatherWindow(user_inputs, olc):
-        '''
-        this functions returns the starting times and the durations of all weather
-        windows found in the met-ocean data for the given operational limit
-        conditions (olc)
-        '''
-        # Initialisation
-        met_ocean = user_inputs['metocean']
-        ww = {'start': 0,
-              'duraiton': 0}
-        # Operational limit conditions (consdiered static over the entire duration of the marine operation fro the moment)
-        timeStep = met_ocean.hour.ix[1]-met_ocean.hour.ix[0]
-        # resourceDataPointNb = len(met_ocean.waveHs)
-        # Build the binary weather windows: 1=authorized access, 0=denied access
-        Hs_bin = map(float, met_ocean.waveHs > olc['maxHs'])
-        Ws_bin = map(float, met_ocean.windSpeed > olc['maxWs'])
-
-        WW_bin = Hs_bin or Ws_bin
-
-        ## Determine the durations and the starting times of the weather windows
-        # Look for all indexes permitting access
-        WW_authorized = indices(WW_bin, lambda x: x == 1)
-        if not WW_authorized:
-            print'Not a single permitting weather window was found with the criteria specified for one vessel with these met-ocean data!'
-        else:
-            # Return the number of consecutive time steps where marine operations are not permitted ("Gap") or 0 otherwise
-            WW_authorized = numpy.array(WW_authorized)
-            index = numpy.array(range(len(WW_authorized)))
-            WW_authorized_0 = WW_authorized - index
-            WW_Gap1 = differences(WW_authorized_0)
-            # Find position of consecutive permitting weather window among Gap
-            WW_posConsecutiveGap1 = indices([1] + WW_Gap1, lambda x: x == 1)
-            # Give the number of consecutive permitting weather conditions without
-            # interuption, i.e the durations of all weather windows
-            # except the last one!
-            WW_findConsecutive1 = differences(WW_posConsecutiveGap1)
-            WW_findConsecutive1_2 = [1] + WW_findConsecutive1
-            WW_findConsecutive1_2 = numpy.cumsum(WW_findConsecutive1_2)
-            # Locate the starting times of each weather windows
-            WW_posConsecutive1 = WW_authorized[WW_findConsecutive1_2]
-            # assign starting times and durations of all weather windows to output
-            #tt = numpy.multiply(timeStep,range(WW_posConsecutive1))
-            #WW_posConsecutive1 * timeStep
-            ww['start'] = WW_posConsecutive1 * timeStep
-            #[x*timeStep for x in WW_posConsecutive1]
-            duration = numpy.array(WW_findConsecutive1)
-            ww['duration'] = duration * timeStep
-        return  ww
+    # the port-to-site distance is the same for all the solutions
+    context = {'distance': routing.distance(*port_site)}  # [km]
 
+    # solutions evaluated by the executor, if any
+    tasks = []
     for seq in range(len(log_phase.op_ve)):
-#
-        for sol in range(len(log_phase.op_ve[seq].sol)):
-            op_dur_prep = []
-            op_dur_sea = []
-            olc_sea_Hs = []
-            olc_sea_Tp = []
-            olc_sea_Ws = []
-            olc_sea_Cs = []
-            olc = {'maxHs': 0,
-                   'maxTp': 0,
-                   'maxWs': 0,
-                   'maxCs': 0}
-
-            for op in range(len(log_phase.op_ve[seq].op_sequence)):
-                log_op = log_phase.op_ve[seq].op_sequence
-                if log_op[op].description == "Transportation from port to site":
-                    coordinates = 'none'
-                    map_land = 'none'
-                    dist_p2s = distance(coordinates, map_land)  # [km]
-                    sailing_speed = 3.6*log_phase.op_ve[seq].sol[sol].sol_ves[0]['Transit speed [m/s]'] # [km/h]
-                    # sailing_speed = 20.0  # [km/h]
-                    log_op[op].time = dist_p2s/sailing_speed  # [h]
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
-                    olc_sea_Hs[len(olc_sea_Hs):] = [1.5]
-                    # olc_sea_Hs[len(olc_sea_Hs):] =  log_phase.op_ve[seq].ve_combination[combi].solution[2]
-                elif log_op[op].description == "Mobilisation":
-                    log_op[op].time = 48
-                    op_dur_prep[len(op_dur_prep):] = [log_op[op].time]
-                elif log_op[op].description == "Assembly at port":
-                    log_op[op].time = 0
-                    op_dur_prep[len(op_dur_prep):] = [log_op[op].time]
-                elif log_op[op].description == "Vessel preparation and loading":
-                    log_op[op].time = 24
-                    op_dur_prep[len(op_dur_prep):] = [log_op[op].time]
-                elif log_op[op].description == "Seafloor and equipment preparation on-site":
-                    log_op[op].time = 0.5
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
-                elif log_op[op].description == "Driven pile foundation seafloor penetration through drilling rig + positioning":
-                    log_op[op].time = 3
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
-                    olc_sea_Ws[op] = 20 # [m/s]
-                elif log_op[op].description == "Driven pile foundation seafloor penetration through hammering + positioning":
-                    log_op[op].time = 5
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
-                elif log_op[op].description == "Driven pile foundation seafloor penetration through vibro-driving + positioning":
-                    log_op[op].time = 6
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
-                elif log_op[op].description == "Transportation from site to port":
-                    coordinates = 'none'
-                    map_land = 'none'
-                    dist_p2s = distance(coordinates, map_land)  # [km]
-                    sailing_speed = 3.6*log_phase.op_ve[seq].sol[sol].sol_ves[0]['Transit speed [m/s]']  # [km/h]
-                    log_op[op].time = dist_p2s/sailing_speed  # [h]
-                    op_dur_sea[len(op_dur_sea):] = [log_op[op].time]
+        solutions = [log_phase.op_ve[seq].sol[sol]
+                     for sol in range(len(log_phase.op_ve[seq].sol))]
+        # durations of all the operations of all the solutions, the LogOp
+        # objects are shared by all the logistic phases and evaluations
+        op_dur = duration_model.evaluate(log_phase.op_ve[seq].op_sequence,
+                                         solutions, context)
+        preparation = op_dur.preparation()
+        sea_time = op_dur.sea_time()
 
-            if olc_sea_Hs:
-                olc['maxHs'] = min(olc_sea_Hs) #
-            if olc_sea_Tp:
-                olc['maxTp'] = min(olc_sea_Tp) #
-            if olc_sea_Ws:
-                olc['maxWs'] = min(olc_sea_Ws) #
-            if olc_sea_Cs:
-                olc['maxCs'] = min(olc_sea_Cs) #
+        for sol, solution in enumerate(solutions):
+            olc = dict(op_dur.olc)
+            dur_total_sea = sea_time[sol]
+            if x == 0:  #  find layer of installation plan
+                start_proj = user_inputs['device']['Project starting date [-]'].iloc[0]
+            elif x > 0:  #  after the phases of the previous layers
+                # install['schedule'] holds the simulated timeline of the
+                # previous layers, see installation.simulation.schedule_plan
+                if not install.get('schedule'):
+                    raise ValueError("the previous layers of the "
+                                     "installation plan are not scheduled, "
+                                     "see schedule_plan")
+                start_proj = max(phase['end time'] for phase in
+                                 install['schedule'].values())
+            starting_time = start_proj + preparation[sol]
 
-            weather_wind = weatherWindow(user_inputs, olc)
+            solution.schedule = {'olc': olc,
+                                 'log_op_dur_all': op_dur.all_durations(sol),
+                                 'preparation': preparation[sol],
+                                 'sea time': dur_total_sea}
+            if executor is not None:
+                tasks.append(solution_task(seq, sol, olc, preparation[sol],
+                                           dur_total_sea, start_proj,
+                                           vessel_hourly_cost(solution)))
+                continue
 
-            dur_total_sea = sum(op_dur_sea)
-            if x == 0:  #  find layer of installation plan
-                start_proj = user_inputs['device']['Project starting date [-]'].ix[0]
-                starting_time = start_proj + sum(op_dur_prep)
-            elif x > 0:  #  to be implemented (dummy not functional at the moment)
-                last_end_time = max(install['schedule'][end_time])
-                starting_time = last_end_time + sum(op_dur_prep)
+            # shared by all the solutions with the same limits
+            weather_wind = window_cache.windows(user_inputs['metocean'], olc)
+            # earliest window starting after starting_time and long enough
+            # for the sea operations, inf if there is none
+            waiting_time = weather_wind.index.waiting_time(starting_time,
+                                                           dur_total_sea)
+            solution.schedule['weather windows'] = weather_wind
+            solution.schedule['waiting time'] = waiting_time
 
-            index_ww_start = indices(weather_wind['start'], lambda x: x > starting_time)
-                                     #and weatherWind['duration']>=duration_total)/
-            index_ww_dur = indices(weather_wind['duration'], lambda x: x >= dur_total_sea)
-            index_ww = index_ww_start or index_ww_dur
-            waiting_time = weather_wind['start'][index_ww[0]] - starting_time
-            log_phase.op_ve[seq].sol[sol].schedule= {'olc': olc,
-                                                     'log_op_dur_all': op_dur_prep + op_dur_sea,
-                                                     'preparation': sum(op_dur_prep),
-                                                     'sea time': dur_total_sea,
-                                                     'weather windows': weather_wind,
-                                                     'waiting time': waiting_time}
+    if executor is not None:
+        # the weather windows are computed by the workers, not kept
+        for record in executor.evaluate(tasks):
+            solution = log_phase.op_ve[record.sequence].sol[record.solution]
+            solution.schedule['weather windows'] = None
+            solution.schedule['waiting time'] = record.waiting_time
+            # same vessel cost as the cost step, see economic.eco
+            solution.cost = {'vessel': record.cost,
+                             'equipment': 0,
+                             'port cost': 0}
 
     return log_phase
\ No newline at end of file
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module computes the weather windows used by the schedule step, i.e. the
+periods of the met-ocean record during which all the operational limit
+conditions (olc) of a marine operation are satisfied. A time step is workable
+when every met-ocean variable is below or at its limit; the starts and
+durations of the windows are the runs of consecutive workable time steps,
+found by run-length encoding of the boolean mask.
+
+The olc keys and the met-ocean variables they limit are listed in
+OLC_VARIABLES. A limit of 0 or None is not constraining, as are the limits of
+variables absent from the met-ocean data.
+
+The weather windows of a met-ocean data set only depend on its operational
+limit conditions, which are shared by most of the solutions of a logistic
+phase. WindowCache keeps the computed windows in a bounded least recently used
+cache keyed by (met-ocean data set, quantized olc), and every schedule using
+the same limits refers to the same read-only WeatherWindows object.
+
+BETA VERSION NOTES: window starts are given in hours from the first met-ocean
+record, the operational limit conditions are considered static over the
+entire duration of the marine operation. The cached limits are rounded down to
+OLC_QUANTUM, the windows are computed with the rounded limits.
+
+The schedule functions look for the earliest window starting after a given
+time and lasting at least the sea time of the operations. WindowIndex answers
+these queries in logarithmic time from the sorted window starts and a sparse
+table of the maximum window duration over every range of 2**k windows.
+"""
+
+import math
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from ...load.metocean import MetoceanStore, MetoceanFrame, epoch_hours
+
+# met-ocean variable limited by each operational limit condition
+OLC_VARIABLES = (('maxHs', 'waveHs'),
+                 ('maxTp', 'waveTp'),
+                 ('maxWs', 'windSpeed'),
+                 ('maxCs', 'currentSpeed'))
+
+# resolution of the cached operational limits [m, s, m/s]
+OLC_QUANTUM = 0.01
+
+# default memory budget of the window cache [bytes]
+CACHE_BYTES = 64 * 1024 ** 2
+
+
+def _store(metocean):
+    """Returns the MetoceanStore behind a met-ocean data set, None for a
+    panda table"""
+    if isinstance(metocean, MetoceanStore):
+        return metocean
+    if isinstance(metocean, MetoceanFrame):
+        return metocean.store
+    return None
+
+
+def _variable(metocean, name):
+    """Returns a met-ocean variable as an array, None if absent"""
+    store = _store(metocean)
+    if store is not None:
+        if name not in store.variables:
+            return None
+        return np.asarray(store[name])
+    if name not in metocean.columns:
+        return None
+    return np.asarray(metocean[name].values)
+
+
+def record_hours(metocean):
+    """Returns the time of each met-ocean record in hours from the first
+    record"""
+    store = _store(metocean)
+    if store is not None:
+        hours = np.asarray(store.hours)
+    else:
+        hours = epoch_hours(metocean['year'], metocean['month'],
+                            metocean['day'], metocean['hour'])
+    return hours - hours[0]
+
+
+def workable_mask(metocean, olc):
+    """Returns the boolean mask of the workable time steps of a met-ocean data
+    set
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    olc : dict
+     operational limit conditions {'maxHs': .., 'maxTp': .., 'maxWs': ..,
+     'maxCs': ..}, missing, 0 or None limits are not constraining
+
+    Returns
+    -------
+    workable : ndarray
+     boolean array, True for the time steps satisfying all the limits
+    """
+    workable = None
+    for key, name in OLC_VARIABLES:
+        limit = olc.get(key)
+        if not limit:
+            continue
+        values = _variable(metocean, name)
+        if values is None:
+            continue
+        with np.errstate(invalid='ignore'):
+            ok = values <= limit
+        workable = ok if workable is None else workable & ok
+    if workable is None:
+        workable = np.ones(len(record_hours(metocean)), dtype=bool)
+    return workable
+
+
+def run_lengths(mask):
+    """Returns the positions and lengths of the runs of True values of a
+    boolean array"""
+    edges = np.diff(np.concatenate(([0], np.asarray(mask, dtype=np.int8),
+                                    [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+class WeatherWindows(object):
+    """
+    WeatherWindows holds the start times [h] and durations [h] of the weather
+    windows of a met-ocean data set for given operational limit conditions.
+    The arrays are read-only. ww['start'] and ww['duration'] give the same
+    arrays as the dict formerly returned by weatherWindow().
+
+    """
+
+    def __init__(self, start, duration, olc=None):
+        start.flags.writeable = False
+        duration.flags.writeable = False
+        self.start = start
+        self.duration = duration
+        self.olc = olc
+        self._index = None
+
+    @property
+    def index(self):
+        """WindowIndex of the windows, built on first use"""
+        if self._index is None:
+            self._index = WindowIndex(self.start, self.duration)
+        return self._index
+
+    def __getitem__(self, key):
+        if key not in ('start', 'duration'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        return self.start.nbytes + self.duration.nbytes
+
+
+class WindowIndex(object):
+    """
+    WindowIndex answers the queries "earliest window starting after t and
+    lasting at least d" over the weather windows. The window starts are
+    sorted, the first window starting after t is found by binary search; the
+    first of the following windows lasting at least d is then found by
+    skipping ranges of 2**k windows, from the largest to the smallest k, whose
+    maximum duration is below d.
+
+    Parameters
+    ----------
+    start : ndarray
+     sorted start times of the windows [h]
+    duration : ndarray
+     durations of the windows [h]
+    """
+
+    def __init__(self, start, duration):
+        self.start = np.asarray(start)
+        # levels[k][i] is the maximum duration of the windows i to i + 2**k - 1
+        levels = [np.asarray(duration, dtype=float)]
+        width = 1
+        while 2 * width <= len(self.start):
+            previous = levels[-1]
+            levels.append(np.maximum(previous[:-width], previous[width:]))
+            width *= 2
+        self.levels = levels
+
+    def __len__(self):
+        return len(self.start)
+
+    def first(self, after, min_duration=0.):
+        """Returns the position of the earliest window starting after a time
+        and lasting at least a duration
+
+        Parameters
+        ----------
+        after : float or array
+         the windows have to start strictly after this time [h]
+        min_duration : float or array
+         minimum duration of the windows [h]
+
+        Returns
+        -------
+        position : int or ndarray
+         position of the window in the start and duration arrays, -1 where
+         no window satisfies the query
+        """
+        after, min_duration = np.broadcast_arrays(
+            np.asarray(after, dtype=float),
+            np.asarray(min_duration, dtype=float))
+        nb_windows = len(self.start)
+        position = np.searchsorted(self.start, after, side='right')
+        position = np.atleast_1d(position).astype(np.intp)
+        needed = np.atleast_1d(min_duration)
+        for k in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[k]
+            # ranges of 2**k windows entirely too short are skipped
+            inside = position + 2 ** k <= nb_windows
+            skip = np.zeros(len(position), dtype=bool)
+            skip[inside] = level[position[inside]] < needed[inside]
+            position[skip] += 2 ** k
+        position[position >= nb_windows] = -1
+        if np.ndim(after) == 0:
+            return int(position[0])
+        return position.reshape(np.shape(after))
+
+    def earliest(self, after, min_duration=0.):
+        """Returns the earliest time [h], at or after a given time, from which
+        the weather stays workable for at least min_duration, either within
+        the window in progress or at the start of a following window. inf
+        where there is no such time.
+
+        Parameters
+        ----------
+        after : float or array
+         earliest possible time [h]
+        min_duration : float or array
+         required workable duration [h]
+
+        Returns
+        -------
+        earliest : float or ndarray
+         earliest start time [h]
+        """
+        after, min_duration = np.broadcast_arrays(
+            np.asarray(after, dtype=float),
+            np.asarray(min_duration, dtype=float))
+        # start of the earliest following window long enough
+        position = np.asarray(self.first(after, min_duration))
+        earliest = np.full(position.shape, np.inf)
+        found = position >= 0
+        earliest[found] = self.start[position[found]]
+        # window in progress at time after, long enough from time after
+        current = np.searchsorted(self.start, after, side='right') - 1
+        valid = current >= 0
+        current = np.maximum(current, 0)
+        if len(self.start):
+            end = self.start[current] + self.levels[0][current]
+            inside = valid & (end - after >= min_duration)
+            earliest = np.where(inside, after, earliest)
+        # operations without duration do not depend on the weather
+        earliest = np.where(min_duration <= 0, after, earliest)
+        if np.ndim(earliest) == 0:
+            return float(earliest)
+        return earliest
+
+    def waiting_time(self, after, min_duration=0.):
+        """Returns the time [h] from after to the start of the earliest window
+        lasting at least min_duration, inf if there is no such window"""
+        position = np.asarray(self.first(after, min_duration))
+        start = np.full(position.shape, np.inf)
+        found = position >= 0
+        start[found] = self.start[position[found]]
+        waiting = start - np.asarray(after, dtype=float)
+        if np.ndim(waiting) == 0:
+            return float(waiting)
+        return waiting
+
+
+def weather_windows(metocean, olc):
+    """weather_windows returns the starting times and the durations of all
+    weather windows found in the met-ocean data for the given operational
+    limit conditions (olc)
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    olc : dict
+     operational limit conditions, see workable_mask
+
+    Returns
+    -------
+    ww : WeatherWindows
+     start times [h from the first record] and durations [h] of the windows
+    """
+    hours = record_hours(metocean)
+    time_step = hours[1] - hours[0] if len(hours) > 1 else 1
+    first, length = run_lengths(workable_mask(metocean, olc))
+    start = hours[first].astype(float)
+    duration = (length * time_step).astype(float)
+    return WeatherWindows(start, duration, dict(olc))
+
+
+def quantize_olc(olc, quantum=OLC_QUANTUM):
+    """Returns the operational limit conditions as a tuple of limits rounded
+    down to quantum, in the order of OLC_VARIABLES, 0 for the limits which are
+    not constraining. A positive limit below quantum is kept as quantum, since
+    0 would mean not constraining"""
+    limits = []
+    for key, _ in OLC_VARIABLES:
+        limit = olc.get(key)
+        if not limit:
+            limits.append(0.)
+            continue
+        # the small tolerance keeps e.g. 2.3 from being rounded down to 2.29
+        steps = max(1, math.floor(limit / quantum + 1e-9))
+        limits.append(round(steps * quantum, 10))
+    return tuple(limits)
+
+
+def dataset_key(metocean):
+    """Returns the key identifying a met-ocean data set in the window cache.
+    Stores read from disk are identified by their folder, content hash and
+    time range, so a store rebuilt in the same folder gets a new key, other
+    data sets by their identity."""
+    store = _store(metocean)
+    if store is not None and store.path is not None and len(store):
+        return ('store', store.path, store.content_hash,
+                int(store.hours[0]), int(store.hours[-1]), len(store))
+    return ('object', id(metocean))
+
+
+class WindowCache(object):
+    """
+    WindowCache is a least recently used cache of WeatherWindows, keyed by the
+    met-ocean data set and the quantized operational limit conditions. The
+    least recently used windows are dropped when the total size of the cached
+    arrays exceeds max_bytes.
+
+    Parameters
+    ----------
+    max_bytes : int
+     memory budget of the cached arrays [bytes]
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def windows(self, metocean, olc):
+        """Returns the weather windows of a met-ocean data set for the given
+        operational limit conditions, computed on the first request
+
+        Parameters
+        ----------
+        metocean : MetoceanFrame, MetoceanStore or DataFrame
+         met-ocean data set
+        olc : dict
+         operational limit conditions, see workable_mask
+
+        Returns
+        -------
+        ww : WeatherWindows
+         shared read-only weather windows
+        """
+        limits = quantize_olc(olc)
+        key = (dataset_key(metocean), limits)
+        with self._lock:
+            entry = self._windows.get(key)
+            # data sets identified by id() are checked against reuse of the id
+            if entry is not None and (entry[0] is None or
+                                      entry[0]() is metocean):
+                self._windows[key] = self._windows.pop(key)
+                self.hits += 1
+                return entry[1]
+        quantized = dict((name, limit) for (name, _), limit
+                         in zip(OLC_VARIABLES, limits))
+        ww = weather_windows(metocean, quantized)
+        ref = None
+        if key[0][0] == 'object':
+            try:
+                ref = weakref.ref(metocean)
+            except TypeError:
+                return ww
+        with self._lock:
+            self.misses += 1
+            previous = self._windows.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1].nbytes
+            self._windows[key] = (ref, ww)
+            self.nbytes += ww.nbytes
+            while self.nbytes > self.max_bytes and len(self._windows) > 1:
+                _, (_, dropped) = self._windows.popitem(last=False)
+                self.nbytes -= dropped.nbytes
+        return ww
+
+    def __len__(self):
+        return len(self._windows)
+
+    def clear(self):
+        """Forgets all cached windows"""
+        with self._lock:
+            self._windows.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+default_window_cache = WindowCache()
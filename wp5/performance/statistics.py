@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module replays the schedule of each solution of a logistic phase from
+every possible starting date of a calendar window, in every year of the
+met-ocean record, instead of the single project starting date used by sched
+and sched_om. The waiting times of all the starting dates of a solution are
+found at once by a single vectorized query of the WindowIndex of its weather
+windows, and summarized by their percentiles (P10, P50 and P90 by default),
+together with the sea time and the cost of the solution.
+
+BETA VERSION NOTES: the durations of the marine operations are deterministic,
+so the sea time is the same for all the starting dates, only the waiting time
+and the cost vary. Starting dates without any long enough weather window until
+the end of the met-ocean record have an infinite waiting time; they are
+counted in the 'no window' column and included in the percentiles as such.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .economic.eco import vessel_hourly_cost
+from .schedule.weather import default_window_cache, record_hours
+
+PERCENTILES = (10, 50, 90)
+
+
+def calendar_starts(metocean, first=(1, 1), last=(12, 31), every=None):
+    """Returns the met-ocean records within a calendar window of every year
+
+    Parameters
+    ----------
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set
+    first, last : tuple
+     (month, day) of the first and last days of the window, included. The
+     window spans the new year if last is before first
+    every : float
+     minimum time [h] between two starting dates, every record if None
+
+    Returns
+    -------
+    hours : ndarray
+     time of the records [h from the first record]
+    """
+    if hasattr(metocean, 'calendar'):
+        calendar = metocean.calendar()
+    else:
+        calendar = metocean
+    month_day = 100 * np.asarray(calendar['month']) + \
+        np.asarray(calendar['day'])
+    first_md = 100 * first[0] + first[1]
+    last_md = 100 * last[0] + last[1]
+    if first_md <= last_md:
+        inside = (month_day >= first_md) & (month_day <= last_md)
+    else:
+        inside = (month_day >= first_md) | (month_day <= last_md)
+    hours = record_hours(metocean)[inside].astype(float)
+    if every is not None and len(hours):
+        # keep the records falling on the multiples of every
+        periods = np.floor(hours / every)
+        keep = np.concatenate(([True], np.diff(periods) > 0))
+        hours = hours[keep]
+    return hours
+
+
+def percentiles(values, percent=PERCENTILES):
+    """Returns the nearest-rank percentiles of an array, infinite values
+    included"""
+    values = np.sort(np.asarray(values, dtype=float))
+    if not len(values):
+        return [np.nan] * len(percent)
+    ranks = np.round(np.asarray(percent) / 100. * (len(values) - 1))
+    return list(values[ranks.astype(np.intp)])
+
+
+def start_date_statistics(log_phase, metocean, first=(1, 1), last=(12, 31),
+                          every=None, percent=PERCENTILES, window_cache=None):
+    """start_date_statistics replays the schedule of each solution from all
+    the starting dates of a calendar window
+
+    Parameters
+    ----------
+    log_phase : class
+     class of the logistic phase under consideration for assessment, with the
+     schedule of each solution computed by sched or sched_om
+    metocean : MetoceanFrame, MetoceanStore or DataFrame
+     met-ocean data set the schedules were computed with
+    first, last : tuple
+     (month, day) of the first and last days of the calendar window
+    every : float
+     minimum time [h] between two starting dates, every record if None
+    percent : tuple
+     percentiles to be computed
+    window_cache : WindowCache or PersistenceSurface
+     source of the weather windows, default_window_cache if None
+
+    Returns
+    -------
+    statistics : DataFrame
+     Panda table with one row per solution, with the columns 'sequence',
+     'solution', 'start dates', 'no window' and the percentiles of the
+     waiting time, sea time and cost, e.g. 'waiting time P50'
+    """
+    if window_cache is None:
+        window_cache = default_window_cache
+    starts = calendar_starts(metocean, first, last, every)
+
+    rows = []
+    for seq in sorted(log_phase.op_ve):
+        for nr_sol, solution in sorted(log_phase.op_ve[seq].sol.items()):
+            sched = solution.schedule
+            ww = window_cache.windows(metocean, sched['olc'])
+            sea_time = sched['sea time']
+            # the sea operations start after the preparation at port
+            waiting = ww.index.waiting_time(starts + sched['preparation'],
+                                            sea_time)
+            cost = vessel_hourly_cost(solution) * (sea_time + waiting)
+            row = {'sequence': seq,
+                   'solution': nr_sol,
+                   'start dates': len(starts),
+                   'no window': int(np.isinf(waiting).sum())}
+            for name, values in (('waiting time', waiting),
+                                 ('sea time', np.full(len(starts), sea_time)),
+                                 ('cost', cost)):
+                for pc, value in zip(percent, percentiles(values, percent)):
+                    row['%s P%d' % (name, pc)] = value
+            solution.statistics = row
+            rows.append(row)
+
+    columns = ['sequence', 'solution', 'start dates', 'no window'] + \
+        ['%s P%d' % (name, pc) for name in ('waiting time', 'sea time', 'cost')
+         for pc in percent]
+    return pd.DataFrame(rows, columns=columns)
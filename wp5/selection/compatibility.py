@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module contains the compatibility checks of the match stage. Each check
+compares all the feasible rows of two tables at once by broadcasting one
+column of the first table against one column of the second, and returns a
+boolean matrix, True for the compatible pairs. compatible_pairs translates a
+matrix into the index pairs given to the solution enumerator.
+
+The vessel-pair check applies to the combinations where a barge is towed by a
+towing vessel (e.g. Crane Barge + Tugboat, JUP Barge + Tugboat):
+    - the bollard pull of the towing vessel has to be at least a given ratio
+      times the gross tonnage of the barge. The ratio depends on the hull of
+      the barge, the towing speed and the sea state of the tow, the match
+      stage uses TOW_RATIO unless another ratio is given
+    - the towing vessel has to reach the transit speed of the barge
+    - the transit Hs limit of the pair, the lowest of both, has to allow the
+      transit Hs limit of the logistic phase
+
+The port/vessel, port/equipment and vessel/equipment checks are:
+    - the length and maximum draft of the vessel have to fit the terminal
+      length and draught of the port
+    - the equipment weight has to be within the lift capacity of the largest
+      gantry or tower crane of the port
+    - the equipment weight has to be within the crane capacity of the vessel,
+      and its footprint within the deck space of the vessel
+feasible_triples combines the three matrices into the list of compatible
+(port, vessel, equipment) index triples.
+
+BETA VERSION NOTES: missing characteristics are not limiting, except for the
+bollard pull of the towing vessel when it is checked, without which the barge
+cannot be towed.
+The equipment databases name their weight and dimensions differently, the
+columns used are listed in EQUIPMENT_WEIGHTS and EQUIPMENT_FOOTPRINTS.
+"""
+
+import numpy as np
+import pandas as pd
+
+# vessel types towing the barges of a combination
+TOWING_VESSELS = ('Tugboat', 'AHTS')
+
+# bollard pull [ton] required per ton of the towed barge: the rule of thumb of
+# 1 ton of bollard pull per 100 tons of displacement for a tow in moderate
+# weather, applied to the gross tonnage of the vessel database in the absence
+# of the displacement of the barges
+TOW_RATIO = 0.01
+
+# weight [ton] of the equipments, first column found in the equipment table
+EQUIPMENT_WEIGHTS = ('total weight', 'Weight (ton)')
+
+# (length [m], width [m]) of the equipment footprint on deck
+EQUIPMENT_FOOTPRINTS = (('power pack: lenght', 'power pack: width'),
+                        ('PP Lenght (m)', 'PP Width (m)'))
+
+# lift capacity [ton] of the port cranes, the largest one is used
+PORT_CRANES = ('Max Gantry crane lift capacity (ton)',
+               'Max Tower crane lift capacity (ton)')
+
+
+def _column(panda, column):
+    """Returns a column of a panda table as a float array, NaN if missing"""
+    if column not in panda.columns:
+        return np.full(len(panda), np.nan)
+    return pd.to_numeric(panda[column], errors='coerce').values.astype(float)
+
+
+def _first_column(panda, columns):
+    """Returns the first of columns found in panda as a float array, NaN if
+    none is found"""
+    for column in columns:
+        if column in panda.columns:
+            return _column(panda, column)
+    return np.full(len(panda), np.nan)
+
+
+def _not_above(values, limits):
+    """Broadcasts values (rows) against limits (columns), True where the value
+    does not exceed the limit or either of them is missing"""
+    values = values[:, np.newaxis]
+    limits = limits[np.newaxis, :]
+    with np.errstate(invalid='ignore'):
+        return np.isnan(values) | np.isnan(limits) | (values <= limits)
+
+
+def equipment_weight(equipments):
+    """Returns the weight [ton] of the rows of an equipment table"""
+    return _first_column(equipments, EQUIPMENT_WEIGHTS)
+
+
+def equipment_footprint(equipments):
+    """Returns the deck footprint [m2] of the rows of an equipment table"""
+    for length, width in EQUIPMENT_FOOTPRINTS:
+        if length in equipments.columns and width in equipments.columns:
+            return _column(equipments, length) * _column(equipments, width)
+    return np.full(len(equipments), np.nan)
+
+
+def port_crane_capacity(ports):
+    """Returns the largest crane lift capacity [ton] of each port"""
+    capacities = np.column_stack([_column(ports, col) for col in PORT_CRANES])
+    with np.errstate(invalid='ignore'):
+        capacity = np.fmax.reduce(capacities, axis=1)
+    return capacity
+
+
+def port_vessel_compatibility(ports, vessels):
+    """port_vessel_compatibility checks every port against every vessel
+
+    Parameters
+    ----------
+    ports : DataFrame
+     Panda table of the feasible ports
+    vessels : DataFrame
+     Panda table of the feasible vessels
+
+    Returns
+    -------
+    compatible : ndarray
+     boolean matrix of shape (len(ports), len(vessels))
+    """
+    length = _not_above(_column(vessels, 'Length [m]'),
+                        _column(ports, 'Terminal Length [m]'))
+    draft = _not_above(_column(vessels, 'Max. draft [m]'),
+                       _column(ports, 'Terminal Draught [m]'))
+    return (length & draft).T
+
+
+def port_equipment_compatibility(ports, equipments):
+    """port_equipment_compatibility checks every port against every equipment
+
+    Parameters
+    ----------
+    ports : DataFrame
+     Panda table of the feasible ports
+    equipments : DataFrame
+     Panda table of the feasible equipments
+
+    Returns
+    -------
+    compatible : ndarray
+     boolean matrix of shape (len(ports), len(equipments))
+    """
+    return _not_above(equipment_weight(equipments),
+                      port_crane_capacity(ports)).T
+
+
+def vessel_equipment_compatibility(vessels, equipments):
+    """vessel_equipment_compatibility checks every vessel against every
+    equipment
+
+    Parameters
+    ----------
+    vessels : DataFrame
+     Panda table of the feasible vessels
+    equipments : DataFrame
+     Panda table of the feasible equipments
+
+    Returns
+    -------
+    compatible : ndarray
+     boolean matrix of shape (len(vessels), len(equipments))
+    """
+    weight = _not_above(equipment_weight(equipments),
+                        _column(vessels, 'Crane weight [t]'))
+    footprint = _not_above(equipment_footprint(equipments),
+                           _column(vessels, 'Deck space [m2]'))
+    return (weight & footprint).T
+
+
+def feasible_triples(ports, vessels, equipments):
+    """feasible_triples combines the port/vessel, port/equipment and
+    vessel/equipment checks into the list of compatible triples
+
+    Parameters
+    ----------
+    ports : DataFrame
+     Panda table of the feasible ports
+    vessels : DataFrame
+     Panda table of the feasible vessels
+    equipments : DataFrame
+     Panda table of the feasible equipments
+
+    Returns
+    -------
+    triples : ndarray
+     array of shape (nb_triples, 3) with the positions (port, vessel,
+     equipment) of the compatible triples in the three tables, sorted
+    """
+    port_vessel = port_vessel_compatibility(ports, vessels)
+    port_equipment = port_equipment_compatibility(ports, equipments)
+    vessel_equipment = vessel_equipment_compatibility(vessels, equipments)
+
+    pairs = compatible_pairs(port_vessel)
+    # equipments compatible with both the port and the vessel of each pair
+    compatible = port_equipment[pairs[:, 0]] & vessel_equipment[pairs[:, 1]]
+    nr_pair, nr_eq = np.nonzero(compatible)
+    return np.column_stack([pairs[nr_pair], nr_eq]).astype(np.intp)
+
+
+def tow_compatibility(barges, tugs, ratio, transit_hs=None):
+    """tow_compatibility checks every barge against every towing vessel
+
+    Parameters
+    ----------
+    barges : DataFrame
+     Panda table of the feasible barges
+    tugs : DataFrame
+     Panda table of the feasible towing vessels
+    ratio : float
+     bollard pull [ton] required per ton of gross tonnage of the barge, not
+     checked if None
+    transit_hs : float
+     significant wave height [m] the pair has to be able to transit in, not
+     checked if None
+
+    Returns
+    -------
+    compatible : ndarray
+     boolean matrix of shape (len(barges), len(tugs))
+    """
+    barge_speed = _column(barges, 'Transit speed [m/s]')[:, np.newaxis]
+    tug_speed = _column(tugs, 'Transit speed [m/s]')[np.newaxis, :]
+
+    with np.errstate(invalid='ignore'):
+        compatible = np.isnan(barge_speed) | np.isnan(tug_speed) | \
+            (tug_speed >= barge_speed)
+        if ratio is not None:
+            tonnage = _column(barges, 'Gross tonnage [ton]')[:, np.newaxis]
+            pull = _column(tugs, 'Bollard pull ')[np.newaxis, :]
+            compatible &= np.isnan(tonnage) | (pull >= ratio * tonnage)
+        if transit_hs is not None:
+            barge_hs = _column(barges, 'OLC: Transit maxHs')[:, np.newaxis]
+            tug_hs = _column(tugs, 'OLC: Transit maxHs')[np.newaxis, :]
+            pair_hs = np.fmin(barge_hs, tug_hs)
+            compatible &= np.isnan(pair_hs) | (pair_hs >= transit_hs)
+
+    return compatible
+
+
+def compatible_pairs(compatible):
+    """Returns the (row, column) index pairs of the True entries of a
+    compatibility matrix as an array of shape (nb_pairs, 2), sorted by row
+    then column"""
+    return np.argwhere(compatible).astype(np.intp)
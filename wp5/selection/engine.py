@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module contains the selection engine used by select_e and select_v. The
+feasible rows of each (vessel/equipment type, requirement set) pair are
+computed once and memoized; every vessel and equipment combination referring
+to that pair receives the same read-only TypeView, and the vessel and
+equipment types of the catalogue are never modified.
+
+BETA VERSION NOTES: the memoized results are keyed by the version number of
+the panda table of each type, so replacing the table of a type, or modifying
+in place one of the columns of a requirement set, makes its previous results
+unreachable. The engine keeps the max_views most recently used views, the
+least recently used ones being dropped first, and clear() releases them all.
+The engine can be shared by threads evaluating logistic phases concurrently.
+"""
+
+import threading
+from collections import OrderedDict
+
+from .requirement import compile_requirements
+
+# number of views memoized by the default engine
+MAX_VIEWS = 4096
+
+
+class TypeView(object):
+    """
+    TypeView is a read-only view of a vessel or equipment type restricted to
+    the rows at the given positions of its panda table.
+
+    """
+
+    def __init__(self, parent, positions):
+        positions.flags.writeable = False
+        self.parent = parent
+        self.id = parent.id
+        self.positions = positions
+        self._panda = None
+
+    @property
+    def panda(self):
+        if self._panda is None:
+            self._panda = self.parent.panda.iloc[self.positions]
+        return self._panda
+
+    @property
+    def empty(self):
+        return len(self.positions) == 0
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class SelectionEngine(object):
+    """
+    SelectionEngine filters vessel and equipment types by requirement sets and
+    memoizes the resulting TypeView objects.
+
+    Parameters
+    ----------
+    max_views : int
+     maximum number of memoized views, unbounded if None
+    """
+
+    def __init__(self, max_views=MAX_VIEWS):
+        self.max_views = max_views
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def select(self, table, requirements):
+        """Returns the TypeView of the rows of table satisfying the
+        requirements
+
+        Parameters
+        ----------
+        table : VesselType, EquipmentType or TypeView
+         the type to be filtered, the requirements of a TypeView are applied
+         to its parent type
+        requirements : list or Requirement
+         requirements computed by the feasibility functions
+
+        Returns
+        -------
+        view : TypeView
+         read-only view containing the feasible rows
+        """
+        if isinstance(table, TypeView):
+            table = table.parent
+        requirement = compile_requirements(requirements)
+        key = (table.validate(requirement.columns()), requirement)
+        with self._lock:
+            view = self._views.pop(key, None)
+            if view is not None:
+                # most recently used views last
+                self._views[key] = view
+                self.hits += 1
+                return view
+        view = TypeView(table, table.feasible_positions(requirement))
+        with self._lock:
+            # keep the first view if another thread computed it meanwhile
+            view = self._views.setdefault(key, view)
+            self.misses += 1
+            while (self.max_views is not None and
+                   len(self._views) > self.max_views):
+                self._views.popitem(last=False)
+        return view
+
+    def clear(self):
+        """Forgets all memoized views"""
+        with self._lock:
+            self._views.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+default_engine = SelectionEngine()
@@ -9,157 +9,456 @@ of port/vessel, port/equipment and vessel/equipment, returning only the feasible
 and compatible solutions of vessels and equipments to perform the operations
 sequence of the logistic phase.
 
-BETA VERSION DETAILS: up to date, the functionalities explained previously have
-not been implemented, this module should suffer major changes for the beta version
+The solutions are enumerated from the Cartesian product of the feasible vessels
+and equipments of every vessel and equipment combination, and the k most
+promising solutions of each operation sequence are kept. The candidates of
+each vessel or equipment are sorted by day rate and the solutions are ranked
+by their lower bound cost, i.e. the cost computed by the economic step for a
+schedule without waiting time: the day rate of the first vessel during the
+minimum sea time of the operation sequence given by the duration model, if
+any, then by the day rate of all their vessels and equipments. Vessels and
+equipments without day rate are ranked last. A branch is pruned as soon as its rank exceeds the
+k-th best solution already found for its operation sequence. The waiting
+times are only known once the solutions are scheduled, the selection is
+therefore a top-k preselection on the lower bound cost. Barges towed
+by a towing vessel are only combined with the compatible towing vessels, the
+equipments with the compatible main vessel of the combination, and vessels
+and equipments not compatible with the selected port are discarded, see the
+compatibility module.
+
+BETA VERSION DETAILS: the main vessel of a combination, carrying the
+equipments, is its first vessel that is not a towing vessel. With a selected
+port, the equipments are combined with the main vessels through the feasible
+(port, vessel, equipment) triples, both having to be compatible with the same
+port.
 """
 
+import heapq
+import itertools
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
 from ..logistics.phase import VE_solutions
+from .compatibility import TOWING_VESSELS, TOW_RATIO
+from .compatibility import tow_compatibility, compatible_pairs
+from .compatibility import feasible_triples
+from .compatibility import port_vessel_compatibility
+from .compatibility import port_equipment_compatibility
+from .compatibility import vessel_equipment_compatibility
+
+# Operational day rates of the vessels, the mean of both is used
+VESSEL_RATES = ('Op min Day Rate', 'Op max Day Rate')
+
+
+def day_rates(panda):
+    """Returns the day rates [€/day] of the rows of a vessel or equipment
+    table: the mean operational day rate of vessels, or the sum of all the
+    day rate columns of equipments (e.g. hammer, supervisor and technician).
+    The missing columns of a row are ignored, a row without any day rate gets
+    an infinite day rate so that its solutions are ranked last.
+    """
+    if VESSEL_RATES[0] in panda.columns:
+        columns = list(VESSEL_RATES)
+    else:
+        columns = [col for col in panda.columns if 'day rate' in col.lower()]
+    if not columns:
+        return np.zeros(len(panda))
+    rates = np.column_stack([pd.to_numeric(panda[col], errors='coerce').values
+                             for col in columns])
+    known = ~np.isnan(rates)
+    total = np.where(known, rates, 0.).sum(axis=1)
+    nb_known = known.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if columns == list(VESSEL_RATES):
+            total = total / nb_known
+    return np.where(nb_known > 0, total, np.inf)
+
+
+class _Slot(object):
+    # one vessel or equipment of a combination with its candidate rows sorted
+    # by increasing day rate
+
+    def __init__(self, kind, nr, quantity, e_type):
+        rates = quantity * day_rates(e_type.panda)
+        self.kind = kind
+        self.nr = nr
+        self.quantity = quantity
+        self.id = e_type.id
+        self.panda = e_type.panda
+        self.order = np.argsort(rates, kind='mergesort')
+        self.rates = rates[self.order]
+        # (depth, allowed) of the slots this one is paired with, allowed
+        # giving for each sorted row of that slot the compatible sorted rows
+        # of this one
+        self.pairs = []
+
+    def restrict(self, compatible):
+        """Keeps only the rows where compatible, a boolean array over the rows
+        of panda, is True"""
+        keep = compatible[self.order]
+        self.order = self.order[keep]
+        self.rates = self.rates[keep]
+
+    def pair(self, parent, depth, compatible):
+        """Restricts the rows of this slot to the ones compatible with the
+        row chosen for the slot at depth, compatible being the boolean matrix
+        over the sorted rows of both. A slot paired with several slots keeps
+        the rows compatible with all of them"""
+        pairs = compatible_pairs(compatible)
+        bounds = np.searchsorted(pairs[:, 0], np.arange(len(parent.rates) + 1))
+        self.pairs.append((depth, [pairs[first:last, 1]
+                                   for first, last in zip(bounds[:-1],
+                                                          bounds[1:])]))
+
+    def candidates(self, chosen):
+        if not self.pairs:
+            return range(len(self.rates))
+        # the allowed rows are sorted, so is their intersection
+        return reduce(np.intersect1d, [allowed[chosen[depth]]
+                                       for depth, allowed in self.pairs])
 
 
-def compatibility_ve(install, log_phase):
-    """This function is currently limited to the selection of the first two
-    feasible solutions for the installation logistic phase in analisys.
+def _main_vessel(slots):
+    """Returns the depth of the main vessel of a combination, its first vessel
+    that is not a towing vessel, None if it has no vessel"""
+    vessels = [depth for depth, slot in enumerate(slots)
+               if slot.kind == 'vessel']
+    for depth in vessels:
+        if slots[depth].id not in TOWING_VESSELS:
+            return depth
+    return vessels[0] if vessels else None
+
+
+def _slots(combination, port=None, tow_ratio=None, transit_hs=None):
+    slots = []
+    for kind in ('vessel', 'equipment'):
+        for nr, entry in enumerate(combination.get(kind, [])):
+            quantity, e_type = entry[0], entry[1]
+            # (0, 0, 0) stands for no equipment
+            if not quantity or not hasattr(e_type, 'panda'):
+                continue
+            slots.append(_Slot(kind, nr, quantity, e_type))
+
+    if port is not None:
+        for slot in slots:
+            if slot.kind == 'vessel':
+                compatible = port_vessel_compatibility(port, slot.panda)
+            else:
+                compatible = port_equipment_compatibility(port, slot.panda)
+            slot.restrict(compatible.any(axis=0))
+
+    # the equipments are carried by the main vessel of the combination, and
+    # have to be compatible with it and with one of the ports it can use
+    main = _main_vessel(slots)
+    if main is not None:
+        vessel = slots[main]
+        for slot in slots:
+            if slot.kind != 'equipment':
+                continue
+            if port is None:
+                compatible = vessel_equipment_compatibility(vessel.panda,
+                                                            slot.panda)
+            else:
+                triples = feasible_triples(port, vessel.panda, slot.panda)
+                compatible = np.zeros((len(vessel.panda), len(slot.panda)),
+                                      dtype=bool)
+                compatible[triples[:, 1], triples[:, 2]] = True
+            slot.pair(vessel, main,
+                      compatible[np.ix_(vessel.order, slot.order)])
+
+    # a barge is towed by the towing vessels of the combination
+    barges = [depth for depth, slot in enumerate(slots)
+              if slot.kind == 'vessel' and 'Barge' in slot.id]
+    if barges:
+        barge = slots[barges[0]]
+        for depth, slot in enumerate(slots):
+            if slot.kind != 'vessel' or slot.id not in TOWING_VESSELS:
+                continue
+            compatible = tow_compatibility(barge.panda, slot.panda,
+                                           tow_ratio, transit_hs)
+            compatible = compatible[np.ix_(barge.order, slot.order)]
+            if depth > barges[0]:
+                slot.pair(barge, barges[0], compatible)
+            else:
+                barge.pair(slot, depth, compatible.T)
+    return slots
+
+
+def _primary(slots):
+    """Returns the depth of the slot of the first vessel of the solutions,
+    i.e. sol_ves[0] billed by the economic step, None if it has no slot"""
+    for depth, slot in enumerate(slots):
+        if slot.kind == 'vessel' and slot.nr == 0:
+            return depth
+    return None
+
+
+def enumerate_solutions(log_phase, k=None, min_sea_time=None, port=None,
+                        duration_model=None, context=None, tow_ratio=None):
+    """enumerate_solutions walks the Cartesian product of the feasible vessels
+    and equipments of every operation sequence and vessel and equipment
+    combination of the logistic phase, and yields the solutions lazily.
 
     Parameters
     ----------
-    install : dict
-     not used
     log_phase : class
-     class of the logistic phase under consideration for assessment, contains 
-     data refered to the feasible vessel and equipment combinations specific of
-     each operation sequence of the logistic phase
+     class of the logistic phase under consideration for assessment, after
+     the selection of the feasible vessels and equipments
+    k : int
+     number of solutions to be kept per operation sequence, the branches
+     ranked after the k best solutions found for their operation sequence
+     are pruned. All solutions are enumerated if None
+    min_sea_time : dict
+     dictionnary with the minimum sea time [h] of each operation sequence,
+     by default the lower bound given by the duration model, 0 without
+     duration model
+    port : DataFrame
+     Panda table of the selected port(s), the vessels and equipments have to
+     be compatible with at least one of them. Not checked if None
+    duration_model : object
+     durations of the logistic operations, giving the minimum sea time
+     (min_sea_time(op_sequence, context)) and the transit limits
+     (transit_limits(op_sequence, context)) of an operation sequence, e.g. a
+     DurationModel. Optional
+    context : dict
+     project data used by the duration model
+    tow_ratio : float
+     bollard pull [ton] required per ton of gross tonnage of the towed
+     barges, see tow_compatibility. Not checked if None
 
-    Returns
-    -------
-    sol : dict
-     A dict of panda dataframes with unique feasible solutions
-    log_phase : class
-     An updated version of the log_phase argument containing only the feasible
-     equipments within each vessel and equipment combinations dataframes
+    Yields
+    ------
+    seq : int
+     key of the operation sequence in log_phase.op_ve
+    solution : VE_solutions
+     solution with the vessel and equipment rows in sol_ves and sol_eq, the
+     key of its combination in combination, its lower bound cost [€] in
+     lower_bound and the day rate [€/day] of all its vessels and equipments
+     in day_rate
     """
+    if min_sea_time is None:
+        min_sea_time = {}
+    counter = itertools.count()
 
-    log_phase.op_ve[1].sol[0] = VE_solutions(0)
-    log_phase.op_ve[1].sol[1] = VE_solutions(1)
+    for seq in sorted(log_phase.op_ve):
+        op_ve = log_phase.op_ve[seq]
+        hours = min_sea_time.get(seq)
+        transit_hs = None
+        if duration_model is not None:
+            if hours is None:
+                hours = duration_model.min_sea_time(op_ve.op_sequence,
+                                                    context)
+            # the towed barges have to transit within the limits of the phase
+            transit_hs = duration_model.transit_limits(
+                op_ve.op_sequence, context).get('maxHs') or None
+        if hours is None:
+            hours = 0.
 
-    pd_ves0 = log_phase.op_ve[1].ve_combination[0]['vessel'][0][1].panda
-    pd_ves0_index = pd_ves0.index
+        def rank(slots, primary, remaining, depth, rate, chosen):
+            """returns the lowest (lower bound cost, day rate) of the
+            solutions starting with the chosen rows of the depth first
+            slots"""
+            if primary is None or not hours:
+                cost = 0.
+            else:
+                slot = slots[primary]
+                nr_row = chosen[primary] if primary < depth else 0
+                cost = slot.rates[nr_row] / slot.quantity * hours / 24.
+            return cost, rate + remaining[depth]
 
-    pd_ves1 = log_phase.op_ve[1].ve_combination[0]['vessel'][1][1].panda
-    pd_ves1_index = pd_ves1.index
+        # order the combinations by their cheapest solution, so the k best
+        # solutions are found early
+        branches = []
+        for combi in sorted(op_ve.ve_combination):
+            slots = _slots(op_ve.ve_combination[combi], port, tow_ratio,
+                           transit_hs)
+            if not slots or any(len(slot.rates) == 0 for slot in slots):
+                continue
+            primary = _primary(slots)
+            # remaining[d] is the cheapest day rate of slots d, d+1, ...
+            remaining = np.cumsum([slot.rates[0] for slot in slots][::-1])
+            remaining = list(remaining[::-1]) + [0.]
+            branches.append((rank(slots, primary, remaining, 0, 0., []),
+                             combi, slots, primary, remaining))
+        branches.sort(key=lambda branch: branch[:2])
 
-    pd_eq = log_phase.op_ve[1].ve_combination[0]['equipment'][0][1].panda
-    pd_eq_index = pd_eq.index
+        best = []   # max-heap of the k best ranks of the sequence
 
-    log_phase.op_ve[1].sol[0].sol_ves[0] = pd_ves0.ix[pd_ves0_index[0]]
-    log_phase.op_ve[1].sol[0].sol_ves[1] = pd_ves1.ix[pd_ves1_index[0]]
-    log_phase.op_ve[1].sol[0].sol_eq[0] = pd_eq.ix[pd_eq_index[0]]
+        def threshold():
+            if k is not None and len(best) >= k:
+                return tuple(-value for value in best[0])
+            return None
 
-    log_phase.op_ve[1].sol[1].sol_ves[0] = pd_ves0.ix[pd_ves0_index[1]]
-    log_phase.op_ve[1].sol[1].sol_ves[1] = pd_ves1.ix[pd_ves1_index[1]]
-    log_phase.op_ve[1].sol[1].sol_eq[0] = pd_eq.ix[pd_eq_index[0]]
+        def search(slots, primary, remaining, depth, rate, chosen):
+            if depth == len(slots):
+                yield rank(slots, primary, remaining, depth, rate, chosen), \
+                    list(chosen)
+                return
+            slot = slots[depth]
+            # the candidates are sorted by day rate, so is their rank
+            for nr_row in slot.candidates(chosen):
+                slot_rate = slot.rates[nr_row]
+                chosen.append(nr_row)
+                bound = rank(slots, primary, remaining, depth + 1,
+                             rate + slot_rate, chosen)
+                limit = threshold()
+                if limit is not None and bound >= limit:
+                    chosen.pop()
+                    break
+                for item in search(slots, primary, remaining, depth + 1,
+                                   rate + slot_rate, chosen):
+                    yield item
+                chosen.pop()
 
-    sol = {}
-    sol[0] = log_phase.op_ve[1].sol[0]
-    sol[1] = log_phase.op_ve[1].sol[1]
+        for bound, combi, slots, primary, remaining in branches:
+            limit = threshold()
+            if limit is not None and bound >= limit:
+                break
+            for (lower_bound, day_rate), chosen in search(slots, primary,
+                                                          remaining, 0, 0.,
+                                                          []):
+                if k is not None:
+                    heapq.heappush(best, (-lower_bound, -day_rate))
+                    if len(best) > k:
+                        heapq.heappop(best)
+                solution = VE_solutions(next(counter))
+                solution.combination = combi
+                solution.lower_bound = lower_bound
+                solution.day_rate = day_rate
+                for slot, nr_row in zip(slots, chosen):
+                    row = slot.panda.iloc[slot.order[nr_row]]
+                    if slot.kind == 'vessel':
+                        solution.sol_ves[slot.nr] = row
+                    else:
+                        solution.sol_eq[slot.nr] = row
+                yield seq, solution
 
-    return sol, log_phase
 
+def _base_port(install):
+    """Returns the selected port of install['port'] as a one-row panda table,
+    None if no port was selected"""
+    try:
+        port = install['port']['Selected base port for installation']
+    except (KeyError, TypeError):
+        return None
+    if isinstance(port, pd.Series):
+        return port.to_frame().T
+    if isinstance(port, pd.DataFrame):
+        return port
+    return None
 
-def compatibility_ve_om(install, log_phase):
-    """This function is currently limited to the selection of the first two
-    feasible solutions for the O&M logistic phase in analisys.
+
+def _compatibility(install, log_phase, k, min_sea_time, duration_model,
+                   context, tow_ratio):
+    """Stores the k best solutions of enumerate_solutions of each operation
+    sequence in its sol dict, in increasing order of lower bound cost"""
+    solutions = enumerate_solutions(log_phase, k, min_sea_time,
+                                    _base_port(install), duration_model,
+                                    context, tow_ratio)
+    by_seq = dict((seq, []) for seq in log_phase.op_ve)
+    for seq, solution in solutions:
+        by_seq[seq].append(solution)
+    sol = {}
+    for seq in sorted(by_seq):
+        ranked = sorted(by_seq[seq], key=lambda solution: (
+            solution.lower_bound, solution.day_rate, solution.id))
+        if k is not None:
+            ranked = ranked[:k]
+        op_sol = log_phase.op_ve[seq].sol = {}
+        for solution in ranked:
+            solution.id = len(op_sol)
+            op_sol[solution.id] = solution
+            sol[len(sol)] = solution
+    return sol
+
+
+def compatibility_ve(install, log_phase, k=10, min_sea_time=None,
+                     duration_model=None, context=None,
+                     tow_ratio=TOW_RATIO):
+    """This function selects the solutions of the installation logistic phase
+    in analisys, i.e. the k vessel and equipment solutions with the lowest
+    lower bound cost among all feasible vessels and equipments.
 
     Parameters
     ----------
     install : dict
-     not used
+     among other data contains the selected port in install['port'], the
+     vessels and equipments have to be compatible with it
     log_phase : class
      class of the logistic phase under consideration for assessment, contains 
      data refered to the feasible vessel and equipment combinations specific of
      each operation sequence of the logistic phase
+    k : int
+     maximum number of solutions per operation sequence, all the solutions
+     are kept if None
+    min_sea_time : dict
+     minimum sea time [h] of each operation sequence, see
+     enumerate_solutions
+    duration_model : DurationModel
+     durations of the logistic operations bounding the sea time and giving
+     the transit limits, see enumerate_solutions. Optional
+    context : dict
+     project data used by the duration model
+    tow_ratio : float
+     bollard pull [ton] required per ton of gross tonnage of the towed
+     barges, TOW_RATIO by default, not checked if None
 
     Returns
     -------
     sol : dict
-     A dict of panda dataframes with unique feasible solutions
+     A dict of VE_solutions with unique feasible solutions
     log_phase : class
-     An updated version of the log_phase argument containing only the feasible
-     equipments within each vessel and equipment combinations dataframes
+     An updated version of the log_phase argument with the solutions of each
+     operation sequence in log_phase.op_ve[seq].sol
     """
+    sol = _compatibility(install, log_phase, k, min_sea_time,
+                         duration_model, context, tow_ratio)
 
-    log_phase.op_ve[0].sol[0] = VE_solutions(0)
-    log_phase.op_ve[0].sol[1] = VE_solutions(1)
-
-    pd_ves0 = log_phase.op_ve[0].ve_combination[0]['vessel'][0][1].panda
-    pd_ves0_index = pd_ves0.index
+    return sol, log_phase
 
-    pd_ves1 = log_phase.op_ve[0].ve_combination[1]['vessel'][0][1].panda
-    pd_ves1_index = pd_ves1.index
 
-    log_phase.op_ve[0].sol[0].sol_ves[0] = pd_ves0.ix[pd_ves0_index[0]]
+def compatibility_ve_om(install, log_phase, k=10, min_sea_time=None,
+                        duration_model=None, context=None,
+                        tow_ratio=TOW_RATIO):
+    """This function selects the solutions of the O&M logistic phase in
+    analisys, i.e. the k vessel and equipment solutions with the lowest lower
+    bound cost among all feasible vessels and equipments.
 
-    log_phase.op_ve[0].sol[1].sol_ves[0] = pd_ves1.ix[pd_ves1_index[1]]
+    Parameters
+    ----------
+    install : dict
+     among other data contains the selected port in install['port'], the
+     vessels and equipments have to be compatible with it
+    log_phase : class
+     class of the logistic phase under consideration for assessment, contains 
+     data refered to the feasible vessel and equipment combinations specific of
+     each operation sequence of the logistic phase
+    k : int
+     maximum number of solutions per operation sequence, all the solutions
+     are kept if None
+    min_sea_time : dict
+     minimum sea time [h] of each operation sequence, see
+     enumerate_solutions
+    duration_model : DurationModel
+     durations of the logistic operations bounding the sea time and giving
+     the transit limits, see enumerate_solutions. Optional
+    context : dict
+     project data used by the duration model
+    tow_ratio : float
+     bollard pull [ton] required per ton of gross tonnage of the towed
+     barges, TOW_RATIO by default, not checked if None
 
-    sol = {}
-    sol[0] = log_phase.op_ve[0].sol[0]
-    sol[1] = log_phase.op_ve[0].sol[1]
+    Returns
+    -------
+    sol : dict
+     A dict of VE_solutions with unique feasible solutions
+    log_phase : class
+     An updated version of the log_phase argument with the solutions of each
+     operation sequence in log_phase.op_ve[seq].sol
+    """
+    sol = _compatibility(install, log_phase, k, min_sea_time,
+                         duration_model, context, tow_ratio)
 
     return sol, log_phase
-
-#    for seq in log_phase.op_ve.keys():
-#        for combi in log_phase.op_ve[seq].ve_combination.keys():
-#
-# log_phase.op_ve[seq].ve_combination[combi]['vessel']
-           # log_phase.op_ve[seq].ve_combination[combi]['equipment']
-#
-#            for nr_ves in range(len(log_phase.op_ve[seq].ve_combination[combi]['vessel'])):
-#                pd_ves = log_phase.op_ve[seq].ve_combination[combi]['vessel'][nr_ves][1].panda
-#                pd_ves_index = pd_ves.index
-#
-#                for nr_ves in range(len(pd_ves_index))
-#
-#                log_phase.op_ve[seq].sol[0] =
-#
-#            for nr_eq in log_phase.op_ve[seq].ve_combination[combi]['equipment'].keys():
-#                pd_eq = log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].panda
-#                pd_eq_index = pd_eq.index
-#
-##                for ves in len(pd_index):
-##
-##                    sol[0] =
-##
-##                    log_phase.op_ve[seq].ve_combination[combi].sol[ves] = VE_solutions(ves)
-##
-##                    log_phase.op_ve[seq].ve_combination[combi].sol[ves].sol_ve[ = pd.ix[pd_index[ves]]
-##
-##                    sol[0] = {'sol_ve': 0: panda
-##                                        1: panda
-##                              'sol_eq': 0: panda}
-##
-#                pass
-
-
-
-#    def compatibility_ve (install, log_phase):
-#
-#    req_e = install['requirement'][0]
-#    for typ in range(len(req_e)):
-#        e_key_req = req_e.keys()[typ]
-#
-#        for seq in range(len(log_phase.op_ve)):
-#            for combi in range(len(log_phase.op_ve[seq].ve_combination)):
-#                for nr_eq in range(len(log_phase.op_ve[seq].ve_combination[combi]['equipment'])):
-#
-#                    e_key_phase = log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].id
-#
-#                    if e_key_phase == e_key_req:
-#
-#                        for req in range(len(req_e[e_key_req][nr_eq])/3):
-#                            e_para = req_e[e_key_req][nr_eq][0]
-#                            e_meth = req_e[e_key_req][nr_eq][1]
-#                            e_val = req_e[e_key_req][nr_eq][2]
-#
-#                            if e_meth == 'sup':
-#                                pd = log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].panda
-#                                eq = pd[pd[e_para] >= e_val]
-#    return eq
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+@author: WavEC Offshore Renewables
+email: boris.teillant@wavec.org; paulo@wavec.org
+
+This module defines the requirement objects used in the selection step of the
+WP5 methodology. The feasibility functions express the logistic requirements
+as lists [column, method, value]; compile_requirements translates a set of
+them into a single requirement that is evaluated as one numpy mask over a
+vessel, equipment or port table, or translated into a SQL WHERE clause.
+
+The methods available are:
+    'sup': column >= value
+    'inf': column <= value
+    'eq': column == value
+    'range': value[0] <= column <= value[1]
+    'in': column in the set value
+Requirements can be combined with the operators & (and), | (or) and ~ (not).
+Threshold conditions evaluated on a vessel or equipment type are answered by
+binary search in the sorted indexes of the type, and compositions become
+intersections or unions of the resulting positions.
+
+BETA VERSION NOTES: missing values (NaN) never satisfy a condition, as it was
+the case with the former panda filters, hence they always satisfy its negation.
+"""
+
+import numbers
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('sup', 'inf', 'eq', 'range', 'in')
+
+
+class Requirement(object):
+    """
+    Requirement is the base class of all requirements. A requirement evaluates
+    into a boolean mask over the rows of a panda table.
+
+    """
+
+    def mask(self, panda):
+        """Returns a boolean array, True for the rows satisfying the requirement"""
+        raise NotImplementedError
+
+    def sql(self):
+        """Returns the SQL condition of the requirement and its parameters"""
+        raise NotImplementedError
+
+    def key(self):
+        """Returns a hashable key identifying the requirement"""
+        raise NotImplementedError
+
+    def columns(self):
+        """Returns the names of the columns the requirement depends on"""
+        return ()
+
+    def positions(self, panda):
+        """Returns the positions of the rows satisfying the requirement"""
+        return np.flatnonzero(self.mask(panda))
+
+    def indexed_positions(self, table):
+        """Returns the sorted positions of the rows of a vessel or equipment
+        type satisfying the requirement, making use of its sorted indexes"""
+        return self.positions(table.panda)
+
+    def __and__(self, other):
+        return AllOf([self, other])
+
+    def __or__(self, other):
+        return AnyOf([self, other])
+
+    def __invert__(self):
+        return Not(self)
+
+    def __eq__(self, other):
+        return isinstance(other, Requirement) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def _params(values):
+    # sqlite3 does not accept numpy scalars as parameters
+    return [value.item() if isinstance(value, np.generic) else value
+            for value in values]
+
+
+class Condition(Requirement):
+    """
+    Condition is a requirement on a single column of the table.
+
+    """
+
+    def __init__(self, column, method, value):
+        method = method.lower()
+        if method not in METHODS:
+            raise ValueError("unknown requirement method '%s'" % method)
+        if method == 'range':
+            value = (value[0], value[1])
+        elif method == 'in':
+            value = tuple(sorted(set(value), key=repr))
+        self.column = column
+        self.method = method
+        self.value = value
+
+    def key(self):
+        return (self.column, self.method, self.value)
+
+    def columns(self):
+        return (self.column,)
+
+    def __repr__(self):
+        return 'Condition(%r, %r, %r)' % self.key()
+
+    def _values(self, panda):
+        values = np.asarray(panda[self.column].values)
+        numeric = self.method in ('sup', 'inf', 'range') or \
+            (self.method == 'eq' and isinstance(self.value, numbers.Number))
+        if numeric and values.dtype == object:
+            values = pd.to_numeric(panda[self.column], errors='coerce').values
+        return values
+
+    def mask(self, panda):
+        values = self._values(panda)
+        with np.errstate(invalid='ignore'):
+            if self.method == 'sup':
+                return values >= self.value
+            elif self.method == 'inf':
+                return values <= self.value
+            elif self.method == 'eq':
+                return values == self.value
+            elif self.method == 'range':
+                return (values >= self.value[0]) & (values <= self.value[1])
+            return np.isin(values, self.value)
+
+    def indexed_positions(self, table):
+        if self.method == 'in' or (self.method == 'eq' and not
+                                   isinstance(self.value, numbers.Number)):
+            return self.positions(table.panda)
+        index = table.sorted_index(self.column)
+        if self.method == 'range':
+            positions = index.range(*self.value)
+        else:
+            positions = getattr(index, self.method)(self.value)
+        return np.sort(positions)
+
+    def sql(self):
+        column = _quote(self.column)
+        # text never satisfies a numeric condition, as it is NaN once coerced
+        # in the numpy mask, whereas SQLite sorts text after the numbers
+        numeric = " AND typeof(%s) IN ('integer', 'real')" % column
+        if self.method == 'sup':
+            return '%s >= ?%s' % (column, numeric), _params([self.value])
+        elif self.method == 'inf':
+            return '%s <= ?%s' % (column, numeric), _params([self.value])
+        elif self.method == 'eq':
+            if isinstance(self.value, numbers.Number):
+                return '%s = ?%s' % (column, numeric), _params([self.value])
+            return '%s = ?' % column, _params([self.value])
+        elif self.method == 'range':
+            return ('%s BETWEEN ? AND ?%s' % (column, numeric),
+                    _params(self.value))
+        if not self.value:
+            return '0', []
+        return ('%s IN (%s)' % (column, ', '.join('?' * len(self.value))),
+                _params(self.value))
+
+
+class AllOf(Requirement):
+    """
+    AllOf is satisfied by the rows satisfying all of its requirements.
+
+    """
+
+    _operator = 'AND'
+    _empty = '1'
+
+    def __init__(self, requirements):
+        self.requirements = []
+        for req in requirements:
+            # flatten nested compositions of the same kind
+            if type(req) is type(self):
+                self.requirements.extend(req.requirements)
+            else:
+                self.requirements.append(req)
+
+    def key(self):
+        return (self._operator,) + tuple(req.key() for req in self.requirements)
+
+    def columns(self):
+        columns = []
+        for req in self.requirements:
+            columns.extend(column for column in req.columns()
+                           if column not in columns)
+        return tuple(columns)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.requirements)
+
+    def _reduce(self, masks):
+        return np.logical_and.reduce(masks)
+
+    def mask(self, panda):
+        if not self.requirements:
+            return np.ones(len(panda), dtype=bool)
+        return self._reduce([req.mask(panda) for req in self.requirements])
+
+    def _combine(self, positions):
+        return reduce(np.intersect1d, positions)
+
+    def indexed_positions(self, table):
+        if not self.requirements:
+            return self.positions(table.panda)
+        return self._combine([req.indexed_positions(table)
+                              for req in self.requirements])
+
+    def sql(self):
+        if not self.requirements:
+            return self._empty, []
+        clauses = []
+        params = []
+        for req in self.requirements:
+            clause, req_params = req.sql()
+            clauses.append('(%s)' % clause)
+            params.extend(req_params)
+        return (' %s ' % self._operator).join(clauses), params
+
+
+class AnyOf(AllOf):
+    """
+    AnyOf is satisfied by the rows satisfying at least one of its requirements.
+
+    """
+
+    _operator = 'OR'
+    _empty = '0'
+
+    def _reduce(self, masks):
+        return np.logical_or.reduce(masks)
+
+    def _combine(self, positions):
+        return reduce(np.union1d, positions)
+
+    def mask(self, panda):
+        if not self.requirements:
+            return np.zeros(len(panda), dtype=bool)
+        return self._reduce([req.mask(panda) for req in self.requirements])
+
+
+class Not(Requirement):
+    """
+    Not is satisfied by the rows not satisfying its requirement.
+
+    """
+
+    def __init__(self, requirement):
+        self.requirement = requirement
+
+    def key(self):
+        return ('NOT', self.requirement.key())
+
+    def columns(self):
+        return self.requirement.columns()
+
+    def __repr__(self):
+        return 'Not(%r)' % self.requirement
+
+    def mask(self, panda):
+        return ~self.requirement.mask(panda)
+
+    def indexed_positions(self, table):
+        return np.setdiff1d(np.arange(len(table.panda)),
+                            self.requirement.indexed_positions(table),
+                            assume_unique=True)
+
+    def sql(self):
+        clause, params = self.requirement.sql()
+        # a NULL comparison is false, as NaN in the numpy mask
+        return 'NOT COALESCE(%s, 0)' % clause, params
+
+
+def compile_requirements(requirements):
+    """compile_requirements translates the requirements of a vessel, equipment
+    or port type into a single requirement object
+
+    Parameters
+    ----------
+    requirements : list or Requirement
+     list of requirements [column, method, value] and/or Requirement objects,
+     all of which have to be satisfied
+
+    Returns
+    -------
+    requirement : Requirement
+     the compiled requirement
+    """
+    if isinstance(requirements, Requirement):
+        return requirements
+    compiled = []
+    for req in requirements:
+        if isinstance(req, Requirement):
+            compiled.append(req)
+        else:
+            compiled.append(Condition(*req))
+    if len(compiled) == 1:
+        return compiled[0]
+    return AllOf(compiled)
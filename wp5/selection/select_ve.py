@@ -9,14 +9,54 @@ feasibility functions, with the parameters of vessels and equipments imported
 in the load functions.
 
 BETA VERSION NOTES: These functions are mature and should not suffer many
-changes from the current version to the following beta version.
+changes from the current version to the following beta version. The filtering
+itself is delegated to a SelectionEngine, which filters each vessel or
+equipment type once per requirement set and hands read-only views to the
+vessel and equipment combinations, so the vessel and equipment types of the
+catalogue are never modified. A logistic phase template given by the init
+functions is cloned before the combinations are pruned, the template remains
+available for further evaluations.
 """
 
-def select_e (install, log_phase):
+from .engine import default_engine
+
+
+def _select(entry_key, requirements, log_phase, engine):
+    """Replaces the vessel or equipment types of all ve_combinations of
+    log_phase by the views of their feasible rows, deleting the combinations
+    where no row is feasible, and returns the views by type name, without
+    building their panda tables"""
+    selected = dict.fromkeys(requirements.keys())
+
+    for key_req, req in requirements.items():
+        for seq in log_phase.op_ve:
+            ve_combination = log_phase.op_ve[seq].ve_combination
+            for combi in list(ve_combination):
+                combination = ve_combination[combi]
+                entries = list(combination[entry_key])
+                for nr, entry in enumerate(entries):
+                    if entry[1].id != key_req:
+                        continue
+                    view = engine.select(entry[1], req)
+                    # Check if nothing is feasible within the req for this particular ve_combination
+                    if view.empty:
+                        del ve_combination[combi]   # If so, force the combination to be 0
+                        break
+                    selected[key_req] = view
+                    entries[nr] = (entry[0], view) + tuple(entry[2:])
+                else:
+                    new_combination = dict(combination)
+                    new_combination[entry_key] = entries
+                    ve_combination[combi] = new_combination
+
+    return selected
+
+
+def select_e (install, log_phase, engine=None):
     """select_e function selects the equipments that satisfy the minimum 
-    requirements calculated in the feasibility functions. The current method to 
-    achieve this is erasing the unfeasible equipments from the panda dataframes 
-    included in the ve_combination objects.
+    requirements calculated in the feasibility functions. The equipment types
+    of the ve_combination objects are replaced by read-only views of their
+    feasible equipments, the equipment types themselves are left unchanged.
 
     Parameters
     ----------
@@ -26,56 +66,34 @@ def select_e (install, log_phase):
      class of the logistic phase under consideration for assessment, contains 
      data refered to the vessel and equipment combinations specific of
      each operation sequence of the logistic phase
+    engine : SelectionEngine
+     engine memoizing the feasible equipments of each type and requirement
+     set, by default the engine shared by all logistic phases
 
     Returns
     -------
     eq : dict
-     A dict of panda dataframes with all the feasibile equipments
+     A dict of TypeView objects with all the feasibile equipments, the panda
+     table of a view is only built when its panda attribute is used
     log_phase : class
-     An updated version of the log_phase argument containing only the feasible
+     An updated clone of the log_phase argument containing only the feasible
      equipments within each vessel and equipment combinations dataframes
     """
+    if engine is None:
+        engine = default_engine
+    if log_phase.template is None:
+        log_phase = log_phase.clone()
 
-    req_e = install['requirement'][0]
-    #Initialize an empty dic with the name of the equip to be evaluated
-    eq = dict.fromkeys(req_e.keys())
-
-    for typ in range(len(req_e)):
-        e_key_req = req_e.keys()[typ]
-
-        for seq in range(len(log_phase.op_ve)):
-            for combi in range(len(log_phase.op_ve[seq].ve_combination)):
-                for nr_eq in range(len(log_phase.op_ve[seq].ve_combination[combi]['equipment'])):
-
-                    e_key_phase = log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].id
-                    e_pd = log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].panda
-
-                    if e_key_phase == e_key_req:
-
-                        for req in range(len(req_e[e_key_req])):
-                            e_para = req_e[e_key_req][req][0]
-                            e_meth = req_e[e_key_req][req][1]
-                            e_val = req_e[e_key_req][req][2]
-
-                            if e_meth == 'sup':
-                                e_pd = e_pd[e_pd[e_para] >= e_val]
-
-                        # Check if no vessel is feasible within the req for this particular ve_combination
-                        if e_pd.empty:
-                            del log_phase.op_ve[seq].ve_combination[combi]   # If so, force the combination to be 0
-                            break
-                        else:
-                            eq[e_key_req] = e_pd
-                            log_phase.op_ve[seq].ve_combination[combi]['equipment'][nr_eq][1].panda = e_pd
+    eq = _select('equipment', install['requirement'][0], log_phase, engine)
 
     return eq, log_phase
 
 
-def select_v (install, log_phase):
+def select_v (install, log_phase, engine=None):
     """select_v function selects the vessels that satisfy the minimum requirements
-    calculated in the feasibility functions. The current method to do this is
-    erasing the unfeasible vessels from the panda dataframes included in the
-    ve_combination objects
+    calculated in the feasibility functions. The vessel types of the
+    ve_combination objects are replaced by read-only views of their feasible
+    vessels, the vessel types themselves are left unchanged.
 
     Parameters
     ----------
@@ -84,46 +102,24 @@ def select_v (install, log_phase):
     log_phase : class
      contains data refered to the vessel and equipment combinations specific of
      each operation sequence of the logistic phase
+    engine : SelectionEngine
+     engine memoizing the feasible vessels of each type and requirement set,
+     by default the engine shared by all logistic phases
 
     Returns
     -------
     eq : dict
-     A dict of panda dataframes with all the feasibile vessels
+     A dict of TypeView objects with all the feasibile vessels, the panda
+     table of a view is only built when its panda attribute is used
     log_phase : class
-     An updated version of the log_phase argument containing only the feasible
+     An updated clone of the log_phase argument containing only the feasible
      vessels within each vessel and equipment combinations dataframes
     """
+    if engine is None:
+        engine = default_engine
+    if log_phase.template is None:
+        log_phase = log_phase.clone()
 
-    req_v = install['requirement'][1]
-    #Initialize an empty dic with the name of the vessels to be evaluated
-    ves = dict.fromkeys(req_v.keys())
-
-    for typ in range(len(req_v)):
-        v_key_req = req_v.keys()[typ]
-
-        for seq in range(len(log_phase.op_ve)):
-            for combi in range(len(log_phase.op_ve[seq].ve_combination)):
-                for nr_ves in range(len(log_phase.op_ve[seq].ve_combination[combi]['vessel'])):
-
-                    v_key_phase = log_phase.op_ve[seq].ve_combination[combi]['vessel'][nr_ves][1].id
-                    v_pd = log_phase.op_ve[seq].ve_combination[combi]['vessel'][nr_ves][1].panda
-
-                    if v_key_phase == v_key_req:
-
-                       for req in range(len(req_v[v_key_req])):
-                           v_para = req_v[v_key_req][req][0]
-                           v_meth = req_v[v_key_req][req][1]
-                           v_val = req_v[v_key_req][req][2]
-
-                           if v_meth == 'sup':
-                               v_pd = v_pd[v_pd[v_para] >= v_val]
-
-                       # Check if no vessel is feasible within the req for this particular ve_combination
-                       if v_pd.empty:
-                           del log_phase.op_ve[seq].ve_combination[combi]   # If so, force the combination to be 0
-                           break
-                       else:
-                           ves[v_key_req] = v_pd
-                           log_phase.op_ve[seq].ve_combination[combi]['vessel'][nr_ves][1].panda = v_pd
+    ves = _select('vessel', install['requirement'][1], log_phase, engine)
 
-    return ves, log_phase
\ No newline at end of file
+    return ves, log_phase